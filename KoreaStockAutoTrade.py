@@ -1,8 +1,19 @@
 import requests
 import json
+import logging
 import datetime
 import time
+import os
 import yaml
+from market_calendar import kr_calendar, KR_TZ
+from scheduler import EventScheduler
+from notifier import DiscordNotifier
+from structured_log import flush_logs, setup_logging
+from trading_config import TradingConfig, KR_DEFAULTS
+from api_guard import ApiGuard, CircuitOpenError, parse_budgets
+
+setup_logging()
+logger = logging.getLogger('korea_autotrade')
 
 with open('config.yaml', encoding='UTF-8') as f:
     _cfg = yaml.load(f, Loader=yaml.FullLoader)
@@ -14,13 +25,41 @@ ACNT_PRDT_CD = _cfg['ACNT_PRDT_CD']
 DISCORD_WEBHOOK_URL = _cfg['DISCORD_WEBHOOK_URL']
 URL_BASE = _cfg['URL_BASE']
 
-def send_message(msg):
-    """디스코드 메세지 전송"""
-    now = datetime.datetime.now()
-    message = {"content": f"[{now.strftime('%Y-%m-%d %H:%M:%S')}] {str(msg)}"}
-    if DISCORD_WEBHOOK_URL:
-        requests.post(DISCORD_WEBHOOK_URL, data=message)
-    print(message)
+# 요청별 timeout (초), 응답 없는 API 하나가 매매 루프 전체를 멈추지 않도록 제한
+QUOTE_TIMEOUT = float(os.getenv('QUOTE_TIMEOUT', 3))  # 시세 조회
+API_TIMEOUT = float(os.getenv('API_TIMEOUT', 10))  # 토큰/잔고/주문
+
+# 연결을 재사용하는 HTTP 세션 (요청마다 TLS 연결을 새로 맺지 않음)
+session = requests.Session()
+WARMUP_MINUTES = float(os.getenv('WARMUP_MINUTES', 10))  # 장 시작 N분 전부터 실행 가능
+KEEPALIVE_INTERVAL = float(os.getenv('KEEPALIVE_INTERVAL', 30))  # 장 시작 전 연결 유지 조회 주기 (초)
+target_prices = {}  # {종목코드: 당일 목표가} (당일 일봉 기준으로만 캐시)
+# 시세/목표가 조회 시간 예산과 서킷 브레이커 (연속 실패한 조회 API 는 일정 시간 호출하지 않고 직전 시세 사용)
+API_BUDGETS = {'price': QUOTE_TIMEOUT, 'dailyprice': QUOTE_TIMEOUT}
+API_BUDGETS.update(parse_budgets(os.getenv('API_BUDGETS')))
+api_guard = ApiGuard(
+    API_BUDGETS,
+    default_budget=API_TIMEOUT,
+    failure_threshold=int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 3)),
+    reset_timeout=float(os.getenv('CIRCUIT_RESET_TIMEOUT', 30)),
+)
+QUOTE_FALLBACK_MAX_AGE = float(os.getenv('QUOTE_FALLBACK_MAX_AGE', 30))  # 시세 조회 실패 시 대신 쓸 직전 시세의 최대 경과 시간 (초)
+last_prices = {}  # {종목코드: (현재가, 조회 시각)}
+# 시세/목표가 조회 실패로 보는 예외 (요청 오류 + 초당 호출 제한 등 output 이 없는 오류 응답 + 호출 차단)
+API_ERRORS = (requests.RequestException, KeyError, IndexError, ValueError, TypeError, CircuitOpenError)
+
+# Discord 전송은 별도 스레드에서 순서대로 처리 (매매 루프가 웹훅 응답을 기다리지 않도록)
+notifier = DiscordNotifier(DISCORD_WEBHOOK_URL, session)
+
+def send_message(msg, force_discord=False, level=logging.INFO, **fields):
+    """로그 기록 및 디스코드 메세지 전송
+
+    fields 는 구조화 로그 필드 (symbol, order_id, event 등), force_discord=True 인 메시지(체결/중단/종료)만 Discord로 전송
+    """
+    exc_info = fields.pop('exc_info', None)
+    logger.log(level, msg, exc_info=exc_info, extra=fields)
+    if force_discord:
+        notifier.send(msg)
 
 def get_access_token():
     """토큰 발급"""
@@ -30,7 +69,7 @@ def get_access_token():
     "appsecret":APP_SECRET}
     PATH = "oauth2/tokenP"
     URL = f"{URL_BASE}/{PATH}"
-    res = requests.post(URL, headers=headers, data=json.dumps(body))
+    res = session.post(URL, headers=headers, data=json.dumps(body), timeout=API_TIMEOUT)
     ACCESS_TOKEN = res.json()["access_token"]
     return ACCESS_TOKEN
     
@@ -43,28 +82,59 @@ def hashkey(datas):
     'appKey' : APP_KEY,
     'appSecret' : APP_SECRET,
     }
-    res = requests.post(URL, headers=headers, data=json.dumps(datas))
+    res = session.post(URL, headers=headers, data=json.dumps(datas), timeout=API_TIMEOUT)
     hashkey = res.json()["HASH"]
     return hashkey
 
-def get_current_price(code="005930"):
-    """현재가 조회"""
-    PATH = "uapi/domestic-stock/v1/quotations/inquire-price"
+MULTI_PRICE_BATCH = 30  # 복수종목 현재가 조회 1회당 최대 종목 수
+
+def get_current_prices(codes):
+    """복수종목 현재가 조회 (30종목씩 묶어서 요청), {종목코드: 현재가} 반환 (응답에 없는 종목은 제외)
+
+    조회 실패/차단 시 QUOTE_FALLBACK_MAX_AGE 이내의 직전 시세 사용
+    """
+    PATH = "uapi/domestic-stock/v1/quotations/intstock-multprice"
     URL = f"{URL_BASE}/{PATH}"
     headers = {"Content-Type":"application/json", 
             "authorization": f"Bearer {ACCESS_TOKEN}",
             "appKey":APP_KEY,
             "appSecret":APP_SECRET,
-            "tr_id":"FHKST01010100"}
-    params = {
-    "fid_cond_mrkt_div_code":"J",
-    "fid_input_iscd":code,
-    }
-    res = requests.get(URL, headers=headers, params=params)
-    return int(res.json()['output']['stck_prpr'])
+            "tr_id":"FHKST11300006",
+            "custtype":"P"}
+    codes = list(dict.fromkeys(codes))
+    prices = {}
+    for start in range(0, len(codes), MULTI_PRICE_BATCH):
+        batch = codes[start:start + MULTI_PRICE_BATCH]
+        params = {}
+        for n, code in enumerate(batch, 1):
+            params[f"FID_COND_MRKT_DIV_CODE_{n}"] = "J"
+            params[f"FID_INPUT_ISCD_{n}"] = code
+
+        def request(timeout):
+            result = session.get(URL, headers=headers, params=params, timeout=timeout).json()
+            if result.get('rt_cd', '0') != '0':
+                raise ValueError(f"현재가 조회 실패: {result.get('msg1', '')}")
+            fetched = {}
+            for item in result.get('output') or []:
+                price = int(item.get('inter2_prpr') or 0)
+                if price > 0:
+                    fetched[item['inter_shrn_iscd']] = price
+                    last_prices[item['inter_shrn_iscd']] = (price, time.monotonic())
+            return fetched
+
+        def cached_prices():
+            now = time.monotonic()
+            cached = {code: last_prices[code][0] for code in batch
+                      if code in last_prices and now - last_prices[code][1] <= QUOTE_FALLBACK_MAX_AGE}
+            return cached or None
+
+        prices.update(api_guard.call('price', request, fallback=cached_prices))
+    return prices
 
 def get_target_price(code="005930"):
-    """변동성 돌파 전략으로 매수 목표가 조회"""
+    """변동성 돌파 전략으로 매수 목표가 조회 (당일 시가가 반영된 목표가는 캐시)"""
+    if code in target_prices:
+        return target_prices[code]
     PATH = "uapi/domestic-stock/v1/quotations/inquire-daily-price"
     URL = f"{URL_BASE}/{PATH}"
     headers = {"Content-Type":"application/json", 
@@ -78,11 +148,16 @@ def get_target_price(code="005930"):
     "fid_org_adj_prc":"1",
     "fid_period_div_code":"D"
     }
-    res = requests.get(URL, headers=headers, params=params)
-    stck_oprc = int(res.json()['output'][0]['stck_oprc']) #오늘 시가
-    stck_hgpr = int(res.json()['output'][1]['stck_hgpr']) #전일 고가
-    stck_lwpr = int(res.json()['output'][1]['stck_lwpr']) #전일 저가
+    output = api_guard.call(
+        'dailyprice',
+        lambda timeout: session.get(URL, headers=headers, params=params, timeout=timeout).json()['output'],
+    )
+    stck_oprc = int(output[0]['stck_oprc']) #오늘 시가
+    stck_hgpr = int(output[1]['stck_hgpr']) #전일 고가
+    stck_lwpr = int(output[1]['stck_lwpr']) #전일 저가
     target_price = stck_oprc + (stck_hgpr - stck_lwpr) * 0.5
+    if output[0].get('stck_bsop_date') == datetime.datetime.now(KR_TZ).strftime('%Y%m%d'):
+        target_prices[code] = target_price
     return target_price
 
 def get_stock_balance():
@@ -109,7 +184,7 @@ def get_stock_balance():
         "CTX_AREA_FK100": "",
         "CTX_AREA_NK100": ""
     }
-    res = requests.get(URL, headers=headers, params=params)
+    res = session.get(URL, headers=headers, params=params, timeout=API_TIMEOUT)
     stock_list = res.json()['output1']
     evaluation = res.json()['output2']
     stock_dict = {}
@@ -148,7 +223,7 @@ def get_balance():
         "CMA_EVLU_AMT_ICLD_YN": "Y",
         "OVRS_ICLD_YN": "Y"
     }
-    res = requests.get(URL, headers=headers, params=params)
+    res = session.get(URL, headers=headers, params=params, timeout=API_TIMEOUT)
     cash = res.json()['output']['ord_psbl_cash']
     send_message(f"주문 가능 현금 잔고: {cash}원")
     return int(cash)
@@ -173,12 +248,12 @@ def buy(code="005930", qty="1"):
         "custtype":"P",
         "hashkey" : hashkey(data)
     }
-    res = requests.post(URL, headers=headers, data=json.dumps(data))
+    res = session.post(URL, headers=headers, data=json.dumps(data), timeout=API_TIMEOUT)
     if res.json()['rt_cd'] == '0':
-        send_message(f"[매수 성공]{str(res.json())}")
+        send_message(f"[매수 성공]{str(res.json())}", force_discord=True, event='order_filled', side='buy', symbol=code, order_id=res.json().get('output', {}).get('ODNO'))
         return True
     else:
-        send_message(f"[매수 실패]{str(res.json())}")
+        send_message(f"[매수 실패]{str(res.json())}", level=logging.ERROR, symbol=code, side='buy')
         return False
 
 def sell(code="005930", qty="1"):
@@ -201,79 +276,152 @@ def sell(code="005930", qty="1"):
         "custtype":"P",
         "hashkey" : hashkey(data)
     }
-    res = requests.post(URL, headers=headers, data=json.dumps(data))
+    res = session.post(URL, headers=headers, data=json.dumps(data), timeout=API_TIMEOUT)
     if res.json()['rt_cd'] == '0':
-        send_message(f"[매도 성공]{str(res.json())}")
+        send_message(f"[매도 성공]{str(res.json())}", force_discord=True, event='order_filled', side='sell', symbol=code, order_id=res.json().get('output', {}).get('ODNO'))
         return True
     else:
-        send_message(f"[매도 실패]{str(res.json())}")
+        send_message(f"[매도 실패]{str(res.json())}", level=logging.ERROR, symbol=code, side='sell')
         return False
 
 # 자동매매 시작
 try:
+    # 휴장일이면 토큰 발급 전에 종료 (주말/공휴일/연말 휴장일)
+    trading_session = kr_calendar.today_session()
+    if trading_session is None:
+        send_message("휴장일이므로 프로그램을 종료합니다.", force_discord=True, event='shutdown')
+        exit()
+    # 장 시작 WARMUP_MINUTES 분 전부터만 토큰/잔고를 미리 준비하고 장 시작을 기다림 (그 전이나 장 마감 후에는 종료)
+    t_warmup = trading_session.open - datetime.timedelta(minutes=WARMUP_MINUTES)
+    t_now = datetime.datetime.now(KR_TZ)
+    if not kr_calendar.is_open() and not (t_warmup <= t_now < trading_session.open):
+        send_message("현재 장시간이 아닙니다. 프로그램을 종료합니다.", force_discord=True, event='shutdown')
+        exit()
     ACCESS_TOKEN = get_access_token()
 
-    symbol_list = ["005930","035720","000660","069500"] # 매수 희망 종목 리스트
+    # 관심 종목/매수 비율 설정 (config.yaml 수정 시 매수 틱 사이에 다시 읽음)
+    trading_config = TradingConfig(KR_DEFAULTS)
+    symbol_list = list(trading_config['KR_SYMBOLS']) # 매수 희망 종목 리스트
     bought_list = [] # 매수 완료된 종목 리스트
     total_cash = get_balance() # 보유 현금 조회
     stock_dict = get_stock_balance() # 보유 주식 조회
     for sym in stock_dict.keys():
         bought_list.append(sym)
-    target_buy_count = 3 # 매수할 종목 수
-    buy_percent = 0.33 # 종목당 매수 금액 비율
+    target_buy_count = trading_config['KR_TARGET_BUY_COUNT'] # 매수할 종목 수
+    buy_percent = trading_config['KR_BUY_PERCENT'] # 종목당 매수 금액 비율
     buy_amount = total_cash * buy_percent  # 종목별 주문 금액 계산
     soldout = False
 
     send_message("===국내 주식 자동매매 프로그램을 시작합니다===")
-    while True:
-        t_now = datetime.datetime.now()
-        t_9 = t_now.replace(hour=9, minute=0, second=0, microsecond=0)
-        t_start = t_now.replace(hour=9, minute=5, second=0, microsecond=0)
-        t_sell = t_now.replace(hour=15, minute=15, second=0, microsecond=0)
-        t_exit = t_now.replace(hour=15, minute=20, second=0,microsecond=0)
-        today = datetime.datetime.today().weekday()
-        if today == 5 or today == 6:  # 토요일이나 일요일이면 자동 종료
-            send_message("주말이므로 프로그램을 종료합니다.")
-            break
-        if t_9 < t_now < t_start and soldout == False: # 잔여 수량 매도
+    # 거래 일정은 캘린더에서 미리 계산 (연초 개장일/수능일 등 시간 변경 반영)
+    t_9 = trading_session.open
+    t_start = trading_session.start
+    t_sell = trading_session.sell
+    t_exit = trading_session.exit
+    t_now = datetime.datetime.now(KR_TZ)
+    scheduler = EventScheduler()
+
+    def sell_leftovers():
+        """AM 09:00 ~ 09:05 : 잔여 수량 매도"""
+        global soldout, bought_list, stock_dict
+        if soldout == False:
             for sym, qty in stock_dict.items():
                 sell(sym, qty)
             soldout = True
             bought_list = []
             stock_dict = get_stock_balance()
-        if t_start < t_now < t_sell :  # AM 09:05 ~ PM 03:15 : 매수
-            for sym in symbol_list:
-                if len(bought_list) < target_buy_count:
-                    if sym in bought_list:
-                        continue
+
+    def keep_alive():
+        """장 시작 전 : 시세 API 연결 유지"""
+        try:
+            get_current_prices(symbol_list)
+        except API_ERRORS as e:
+            logger.warning(f"연결 유지 조회 실패: {e}")
+
+    def prefetch_targets():
+        """장 시작 직후 : 목표가 미리 계산 (첫 매수 틱은 캐시된 목표가 사용)"""
+        for sym in symbol_list:
+            try:
+                get_target_price(sym)
+            except API_ERRORS as e:
+                send_message(f"[목표가 계산 오류] {sym}: {e}", level=logging.WARNING, symbol=sym)
+
+    def reload_config():
+        """설정 파일이 바뀌었으면 관심 종목/매수 종목 수/매수 비율 반영"""
+        global target_buy_count, buy_percent, buy_amount
+        changed = trading_config.reload()
+        if changed:
+            symbol_list[:] = trading_config['KR_SYMBOLS']
+            target_buy_count = trading_config['KR_TARGET_BUY_COUNT']
+            buy_percent = trading_config['KR_BUY_PERCENT']
+            buy_amount = total_cash * buy_percent
+            send_message(f"설정 변경: {', '.join(sorted(changed))} (관심 종목 {len(symbol_list)}개)", event='config_reloaded')
+
+    def trade_tick():
+        """AM 09:05 ~ PM 03:15 : 매수"""
+        global soldout
+        reload_config()
+        if len(bought_list) >= target_buy_count:
+            return
+        # 미보유 관심 종목 현재가를 한 번에 조회 (종목별 조회 + 1초 대기 대신 30종목당 요청 1회)
+        candidates = [sym for sym in symbol_list if sym not in bought_list]
+        try:
+            prices = get_current_prices(candidates)
+        except API_ERRORS as e:
+            # 시세 조회 지연/오류(초당 호출 제한 응답 포함)는 이번 틱만 건너뜀
+            send_message(f"[시세 조회 오류] {e}", level=logging.WARNING)
+            return
+        for sym in candidates:
+            if len(bought_list) < target_buy_count:
+                if sym not in prices:
+                    continue
+                try:
                     target_price = get_target_price(sym)
-                    current_price = get_current_price(sym)
-                    if target_price < current_price:
-                        buy_qty = 0  # 매수할 수량 초기화
-                        buy_qty = int(buy_amount // current_price)
-                        if buy_qty > 0:
-                            send_message(f"{sym} 목표가 달성({target_price} < {current_price}) 매수를 시도합니다.")
-                            result = buy(sym, buy_qty)
-                            if result:
-                                soldout = False
-                                bought_list.append(sym)
-                                get_stock_balance()
-                    time.sleep(1)
-            time.sleep(1)
-            if t_now.minute == 30 and t_now.second <= 5: 
-                get_stock_balance()
-                time.sleep(5)
-        if t_sell < t_now < t_exit:  # PM 03:15 ~ PM 03:20 : 일괄 매도
-            if soldout == False:
-                stock_dict = get_stock_balance()
-                for sym, qty in stock_dict.items():
-                    sell(sym, qty)
-                soldout = True
-                bought_list = []
-                time.sleep(1)
-        if t_exit < t_now:  # PM 03:20 ~ :프로그램 종료
-            send_message("프로그램을 종료합니다.")
-            break
+                except API_ERRORS as e:
+                    send_message(f"[목표가 조회 오류] {sym}: {e}", level=logging.WARNING, symbol=sym)
+                    continue
+                current_price = prices[sym]
+                if target_price < current_price:
+                    buy_qty = 0  # 매수할 수량 초기화
+                    buy_qty = int(buy_amount // current_price)
+                    if buy_qty > 0:
+                        send_message(f"{sym} 목표가 달성({target_price} < {current_price}) 매수를 시도합니다.")
+                        result = buy(sym, buy_qty)
+                        if result:
+                            soldout = False
+                            bought_list.append(sym)
+                            get_stock_balance()
+
+    def sell_all():
+        """PM 03:15 ~ PM 03:20 : 일괄 매도"""
+        global soldout, bought_list, stock_dict
+        if soldout == False:
+            stock_dict = get_stock_balance()
+            for sym, qty in stock_dict.items():
+                sell(sym, qty)
+            soldout = True
+            bought_list = []
+
+    def finish():
+        """PM 03:20 ~ :프로그램 종료"""
+        send_message("프로그램을 종료합니다.", force_discord=True, event='shutdown')
+        scheduler.stop()
+
+    # 일정 등록 (이미 지난 구간의 일정은 등록하지 않음)
+    if t_now < t_start:
+        scheduler.at(t_9, sell_leftovers)
+    if t_now < t_9:
+        scheduler.every(KEEPALIVE_INTERVAL, keep_alive, start=t_warmup, until=t_9)
+        scheduler.at(min(t_9 + datetime.timedelta(minutes=1), t_start), prefetch_targets)
+    scheduler.every(1, trade_tick, start=t_start, until=t_sell)
+    scheduler.every(60 * 60, get_stock_balance, start=t_start, until=t_sell, align=True, offset=30 * 60) # 매시 30분 잔고 확인
+    if t_now < t_exit:
+        scheduler.at(t_sell, sell_all)
+    scheduler.at(t_exit, finish)
+    scheduler.run()
 except Exception as e:
-    send_message(f"[오류 발생]{e}")
-    time.sleep(1)
\ No newline at end of file
+    send_message(f"[오류 발생]{e}", force_discord=True, level=logging.ERROR, exc_info=True)
+    time.sleep(1)
+finally:
+    notifier.flush()
+    flush_logs()
\ No newline at end of file
@@ -1,18 +1,54 @@
 import requests
 import json
+import logging
 import datetime
 from pytz import timezone
 import time
 import yaml
-import statistics
 import math
+import numpy as np
 import os
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import subprocess
+import hashlib
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from startup_profile import profiler
+from state_store import StateStore, PersistentDict, PersistentSet, PersistentList
+from bar_store import BarStore, make_bars
+from intraday_bars import MinuteBarAggregator
+from market_calendar import us_calendar
+from notifier import DiscordNotifier
+from scheduler import EventScheduler
+from account_cache import AccountCache
+from execution import ExecutionLog, ExecutionReport, OrderExecutor
+from position_sizing import VolatilityParitySizer
+from sampling_profiler import install_signal_handler
+from signals import MarketSnapshot, SignalCombiner, parse_signals, stack_series
+from structured_log import flush_logs, sampled, setup_logging
+from trading_config import TradingConfig, US_DEFAULTS
+from api_guard import ApiGuard, CircuitOpenError, DeadlineExceeded, parse_budgets
+from polling import AdaptivePoller
+from shadow import ShadowRunner, parse_grid
+from session_report import build_report, format_summary, load_executions, save_report
+from portfolio_risk import FLATTEN, PortfolioRisk
+from replication import LeaderLease, LeaseLost, ReplicationLog
+
+# JSON 구조화 로그 (백그라운드 스레드에서 모아서 출력)
+setup_logging()
+logger = logging.getLogger('usa_autotrade')
+DEBUG_LOG_SAMPLE = int(os.getenv('DEBUG_LOG_SAMPLE', 20))  # DEBUG 시세 로그는 N회에 한 번만 기록
 
 def get_version_info():
     """버전 정보와 배포 날짜 가져오기"""
+    # 이미지 빌드 시 주입된 버전 정보 우선 사용 (git 호출 생략)
+    app_version = os.getenv('APP_VERSION')
+    if app_version:
+        build_date = os.getenv('APP_BUILD_DATE', '')
+        if build_date:
+            return f"🚀 버전: {app_version} | 배포일: {build_date}"
+        return f"🚀 버전: {app_version}"
     try:
         # Git 커밋 해시와 날짜 가져오기
         commit_hash = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], 
@@ -44,7 +80,7 @@ def get_stock_balance_quiet():
         "CTX_AREA_FK200": "",
         "CTX_AREA_NK200": ""
     }
-    res = session.get(URL, headers=headers, params=params, timeout=30)
+    res = session.get(URL, headers=headers, params=params, timeout=api_guard.timeout('balance'))
     stock_list = res.json()['output1']
     evaluation = res.json()['output2']
     stock_dict = {}
@@ -56,12 +92,14 @@ def get_stock_balance_quiet():
             }
     return stock_dict, evaluation
 
-def send_balance_info():
-    """잔고 정보를 Discord로 전송"""
+def send_balance_info(cash_balance=None, exchange_rate=None):
+    """잔고 정보를 Discord로 전송 (이미 조회한 현금/환율이 있으면 재사용)"""
     try:
         # 현금 잔고 정보
-        cash_balance = get_balance()
-        exchange_rate = get_exchange_rate()
+        if cash_balance is None:
+            cash_balance = get_balance()
+        if exchange_rate is None:
+            exchange_rate = get_exchange_rate()
         usd_balance = cash_balance / exchange_rate
         
         send_message("💰 ===== 계좌 정보 =====", force_discord=True)
@@ -80,7 +118,7 @@ def send_balance_info():
         
         send_message("========================", force_discord=True)
     except Exception as e:
-        send_message(f"❌ 잔고 정보 조회 오류: {str(e)}", force_discord=True)
+        send_message(f"❌ 잔고 정보 조회 오류: {str(e)}", force_discord=True, level=logging.ERROR)
 
 # 환경변수 우선, config.yaml 파일을 백업으로 사용
 def validate_config_value(key, value, expected_type=str, min_length=None, max_length=None):
@@ -97,7 +135,7 @@ def validate_config_value(key, value, expected_type=str, min_length=None, max_le
     if max_length and len(str(value)) > max_length:
         raise ValueError(f"❌ {key}의 길이가 너무 깁니다. 최대 {max_length}자, 현재: {len(str(value))}자")
     
-    print(f"✅ {key}: 검증 완료 (길이: {len(str(value))}자)")
+    logger.info(f"✅ {key}: 검증 완료 (길이: {len(str(value))}자)")
 
 def load_config():
     """환경변수나 config.yaml에서 설정 로드 및 검증"""
@@ -106,7 +144,7 @@ def load_config():
     
     # 환경변수에서 우선 로드
     if os.getenv('APP_KEY'):
-        print("🔍 환경변수에서 설정을 로드하는 중...")
+        logger.info("🔍 환경변수에서 설정을 로드하는 중...")
         config['APP_KEY'] = os.getenv('APP_KEY')
         config['APP_SECRET'] = os.getenv('APP_SECRET')
         config['CANO'] = os.getenv('CANO')
@@ -117,16 +155,16 @@ def load_config():
     else:
         # config.yaml 파일에서 로드 (로컬 개발용)
         try:
-            print("🔍 config.yaml 파일에서 설정을 로드하는 중...")
+            logger.info("🔍 config.yaml 파일에서 설정을 로드하는 중...")
             with open('config.yaml', encoding='UTF-8') as f:
                 config = yaml.load(f, Loader=yaml.FullLoader)
             config_source = "config.yaml 파일"
         except FileNotFoundError:
-            print("❌ config.yaml 파일이 없고 환경변수도 설정되지 않았습니다.")
+            logger.error("❌ config.yaml 파일이 없고 환경변수도 설정되지 않았습니다.")
             raise Exception("설정 파일이나 환경변수가 필요합니다.")
     
     # 설정값 검증
-    print(f"🔑 {config_source}에서 로드한 설정을 검증하는 중...")
+    logger.info(f"🔑 {config_source}에서 로드한 설정을 검증하는 중...")
     try:
         validate_config_value('APP_KEY', config.get('APP_KEY'), str, 20, 50)
         validate_config_value('APP_SECRET', config.get('APP_SECRET'), str, 30, 200)
@@ -137,23 +175,26 @@ def load_config():
         # DISCORD_WEBHOOK_URL은 선택사항
         if config.get('DISCORD_WEBHOOK_URL'):
             validate_config_value('DISCORD_WEBHOOK_URL', config.get('DISCORD_WEBHOOK_URL'), str, 50, 200)
-            print("✅ DISCORD_WEBHOOK_URL: 설정됨")
+            logger.info("✅ DISCORD_WEBHOOK_URL: 설정됨")
         else:
-            print("⚠️  DISCORD_WEBHOOK_URL: 설정되지 않음 (Discord 알림 비활성화)")
+            logger.warning("⚠️  DISCORD_WEBHOOK_URL: 설정되지 않음 (Discord 알림 비활성화)")
         
-        print(f"✅ 모든 설정이 {config_source}에서 성공적으로 로드되고 검증되었습니다.")
+        logger.info(f"✅ 모든 설정이 {config_source}에서 성공적으로 로드되고 검증되었습니다.")
         
     except ValueError as e:
-        print(f"❌ 설정 검증 실패: {e}")
-        print("\n🔧 설정 문제 해결 방법:")
-        print("1. GitHub Secrets (리포지토리 > Settings > Secrets and variables > Actions)에서 값 확인")
-        print("2. 로컬 개발 시 config.yaml 파일의 값 확인")
-        print("3. 한국투자증권 API 키/시크릿이 올바른지 확인")
+        logger.error(
+            f"❌ 설정 검증 실패: {e}\n"
+            "🔧 설정 문제 해결 방법:\n"
+            "1. GitHub Secrets (리포지토리 > Settings > Secrets and variables > Actions)에서 값 확인\n"
+            "2. 로컬 개발 시 config.yaml 파일의 값 확인\n"
+            "3. 한국투자증권 API 키/시크릿이 올바른지 확인"
+        )
         raise Exception(f"설정 검증 실패: {e}")
     
     return config
 
-_cfg = load_config()
+with profiler.phase('load_config'):
+    _cfg = load_config()
 APP_KEY = _cfg['APP_KEY']
 APP_SECRET = _cfg['APP_SECRET']
 ACCESS_TOKEN = ""
@@ -169,32 +210,148 @@ retry_strategy = Retry(
     status_forcelist=[429, 500, 502, 503, 504],
     allowed_methods=["HEAD", "GET", "PUT", "DELETE", "OPTIONS", "TRACE", "POST"]
 )
-adapter = HTTPAdapter(max_retries=retry_strategy)
+# 시작 시 병렬 조회를 위해 연결 풀 크기 확장
+adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=4, pool_maxsize=16)
 session.mount("http://", adapter)
 session.mount("https://", adapter)
+# 시세 조회는 다음 틱에 다시 조회하므로 재시도하지 않음 (재시도 시 시간 예산/틱 마감을 넘길 수 있음)
+quote_adapter = HTTPAdapter(
+    max_retries=Retry(total=int(os.getenv('QUOTE_RETRIES', 0)), status_forcelist=[429, 500, 502, 503, 504]),
+    pool_connections=4, pool_maxsize=16,
+)
+session.mount(f"{URL_BASE}/uapi/overseas-price/", quote_adapter)
+
+# 엔드포인트별 시간 예산 (초, 요청 1회 기준, API_BUDGETS="price=2,dailyprice=4" 형식으로 조정)
+API_BUDGETS = {
+    'token': 10, 'hashkey': 5, 'price': 3, 'dailyprice': 5, 'balance': 5,
+    'cash': 5, 'exchange_rate': 5, 'order': 10, 'revise': 10, 'fill': 5,
+}
+API_BUDGETS.update(parse_budgets(os.getenv('API_BUDGETS')))
+# 연속 실패한 조회 API 는 일정 시간 호출하지 않고 캐시된 값 사용 (주문 API 는 차단하지 않음)
+api_guard = ApiGuard(
+    API_BUDGETS,
+    failure_threshold=int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 3)),
+    reset_timeout=float(os.getenv('CIRCUIT_RESET_TIMEOUT', 30)),
+)
+QUOTE_FALLBACK_MAX_AGE = float(os.getenv('QUOTE_FALLBACK_MAX_AGE', 30))  # 시세 조회 실패 시 대신 쓸 직전 시세의 최대 경과 시간 (초)
+last_quotes = {}  # {종목코드: (현재가, 조회 시각)}
+last_stock_balance = None  # 마지막으로 조회한 보유 종목 (잔고 조회 실패 시 사용)
 
 # 매수 가격 및 트레일링 스탑 추적용 딕셔너리
 buy_prices = {}  # {종목코드: 매수가격}
 trailing_stops = {}  # {종목코드: 최고가}
+target_price_message_sent = set()  # 목표가 메시지를 보냈는지 기록하는 용도
+target_prices = {}  # {종목코드: 당일 목표가} (당일 일봉 기준으로만 캐시)
+volatilities = {}  # {종목코드: 연환산 변동성} (포지션 사이징용)
+breakout_inputs = {}  # {종목코드: (당일 시가, 전일 변동폭, 승수)} (그림자 전략 목표가 계산용)
+pending_orders = {}  # {종목코드: 집행 중이거나 체결 수량을 확정하지 못한 주문} (확인 전에는 같은 종목 주문 안 함)
+blocked_symbols = set()  # 주문 접수 여부를 알 수 없어 당일 신규 매수에서 제외한 종목
 
-def send_message(msg, force_discord=False):
-    """디스코드 메세지 전송"""
-    now = datetime.datetime.now()
-    message = {"content": f"[{now.strftime('%Y-%m-%d %H:%M:%S')}] {str(msg)}"}
-    
-    # 매수/매도 관련 메시지만 Discord로 전송 (force_discord=True인 경우 예외)
-    is_trading_message = any(keyword in str(msg) for keyword in 
-                           ["매수 성공", "매도 성공", "손절매 신호", "이익실현 신호", "트레일링스탑"])
-    
-    if DISCORD_WEBHOOK_URL and (is_trading_message or force_discord):
-        try:
-            session.post(DISCORD_WEBHOOK_URL, data=message, timeout=10)
-        except Exception as e:
-            print(f"Discord 메시지 전송 실패: {e}")
-    print(message)
+# 일봉 저장소 (목표가/변동성 계산은 저장된 일봉 기준)
+bar_store = BarStore()
+
+# 장중 1분봉 (시세 조회 결과로 집계, 장 종료 시 저장소에 저장)
+minute_bars = MinuteBarAggregator()
+
+# 매수/위험관리 주기 (초), 매 틱에는 조회 시각이 된 종목만 조회
+TICK_INTERVAL = 1
+# 적응형 시세 조회 (기준가까지 거리/변동성에 따라 종목별로 1초~60초 간격)
+POLL_BUDGET = float(os.getenv('POLL_BUDGET', 2))  # 초당 최대 시세 조회 수 (기존 10초마다 전 종목 조회와 비슷한 수준)
+POLL_MIN_INTERVAL = float(os.getenv('POLL_MIN_INTERVAL', 1))
+POLL_MAX_INTERVAL = float(os.getenv('POLL_MAX_INTERVAL', 60))
+POLL_SIGMA = float(os.getenv('POLL_SIGMA', 3))  # 조회 간격 동안 기준가에 닿으려면 필요한 움직임 (표준편차 배수)
+# 매 틱 마감 시간 (초), 위험관리를 먼저 하고 남은 시간 안에서만 신규 매수 탐색
+TICK_DEADLINE = float(os.getenv('TICK_DEADLINE', 8))
+
+# 그림자 전략 (위험관리/돌파 파라미터 변형을 같은 시세로 모의 실행, 비어 있으면 사용 안 함)
+SHADOW_GRID = os.getenv('SHADOW_GRID', '')  # 예: "STOP_LOSS_PCT=0.01,0.02,0.03;MULTIPLIER_SCALE=0.8,1,1.2"
+SHADOW_SLIPPAGE_BPS = float(os.getenv('SHADOW_SLIPPAGE_BPS', 5))  # 모의 체결 시 가정하는 슬리피지
+
+# 장 시작 전 준비 (토큰/잔고/환율/일봉을 미리 조회하고, 장 시작까지 시세 API 연결 유지)
+WARMUP_MINUTES = float(os.getenv('WARMUP_MINUTES', 10))  # 장 시작 N분 전부터 실행 가능
+WARMUP_CONNECTIONS = int(os.getenv('WARMUP_CONNECTIONS', 4))  # 유지할 시세 API 연결 수
+KEEPALIVE_INTERVAL = float(os.getenv('KEEPALIVE_INTERVAL', 30))  # 연결 유지 조회 주기 (초)
+
+# 주문 집행 방식 ('marketable': 시장성 지정가, 'limit': 지정가) 및 정정 조건
+ORDER_MODE = os.getenv('ORDER_MODE', 'marketable')
+ORDER_OFFSET_BPS = float(os.getenv('ORDER_OFFSET_BPS', 20))  # 기준가 대비 지정가 offset (bp)
+ORDER_TIMEOUT = float(os.getenv('ORDER_TIMEOUT', 2))  # 정정 전 체결 대기 시간 (초)
+ORDER_MAX_REPRICES = int(os.getenv('ORDER_MAX_REPRICES', 2))  # 최대 정정 횟수
+ORDER_POLL_INTERVAL = float(os.getenv('ORDER_POLL_INTERVAL', 0.5))  # 체결 조회 주기 (초)
+ORDER_MAX_TIME = float(os.getenv('ORDER_MAX_TIME', 6))  # 주문 하나의 최대 집행 시간 (초, 이후 잔량 취소)
+QUOTE_EXCHANGE_CODES = {"NASD": "NAS", "NYSE": "NYS", "AMEX": "AMS"}  # 주문 거래소 코드 -> 시세 거래소 코드
+execution_log = ExecutionLog()
+portfolio_risk = None  # 계좌 전체 손실/노출 한도 (main 에서 장 시작 자본으로 생성, 체결 시 갱신)
+
+# 상태 저장소 (국내 주식 프로그램, 같은 디렉터리의 이중화 대기 프로세스와 겹치지 않도록 시장/인스턴스별 파일)
+INSTANCE_ID = os.getenv('INSTANCE_ID') or socket.gethostname()
+STATE_DB_PATH = os.getenv('STATE_DB_PATH', f'trading_state_us_{INSTANCE_ID}.db')
+
+# 이중화 (같은 공유 디렉터리를 쓰는 두 프로세스 중 리더 임대를 가진 쪽만 주문, 비어 있으면 사용 안 함)
+HA_DIR = os.getenv('HA_DIR', '')
+HA_LEASE_TTL = float(os.getenv('HA_LEASE_TTL', 5))  # 리더 갱신이 끊긴 뒤 대기 프로세스가 승격하기까지 (초)
+HA_POLL_INTERVAL = float(os.getenv('HA_POLL_INTERVAL', 0.5))  # 대기 프로세스의 복제 로그 반영/임대 확인 주기 (초)
+leader_lease = None
 
-def get_access_token():
-    """토큰 발급"""
+# 토큰 캐시 파일 (재시작 시 토큰 재발급 생략)
+TOKEN_CACHE_PATH = os.getenv('TOKEN_CACHE_PATH', '.token_cache.json')
+
+# Discord 전송은 별도 스레드에서 순서대로 처리 (매매 루프가 웹훅 응답을 기다리지 않도록)
+notifier = DiscordNotifier(DISCORD_WEBHOOK_URL, session)
+
+def flush_messages(timeout=10):
+    """대기 중인 Discord 메시지를 모두 전송할 때까지 대기 (프로그램 종료 전 호출)"""
+    notifier.flush(timeout)
+
+def send_message(msg, force_discord=False, level=logging.INFO, **fields):
+    """로그 기록 및 디스코드 메세지 전송
+
+    fields 는 구조화 로그 필드 (symbol, order_id, event 등), force_discord=True 인 메시지만 Discord로 전송
+    """
+    exc_info = fields.pop('exc_info', None)
+    logger.log(level, msg, exc_info=exc_info, extra=fields)
+    if force_discord:
+        notifier.send(msg)
+
+def _token_cache_key():
+    """토큰 캐시 구분용 키 (앱키 원문은 저장하지 않음)"""
+    return hashlib.sha256(f"{APP_KEY}:{URL_BASE}".encode()).hexdigest()[:16]
+
+def load_cached_token(min_valid_seconds=600):
+    """캐시된 토큰 조회 (만료 임박/불일치 시 None)"""
+    try:
+        with open(TOKEN_CACHE_PATH, encoding='UTF-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get('key') != _token_cache_key():
+        return None
+    if cached.get('expires_at', 0) - time.time() < min_valid_seconds:
+        return None
+    return cached.get('access_token')
+
+def save_cached_token(access_token, expires_in):
+    """토큰을 캐시 파일에 저장"""
+    cached = {
+        "key": _token_cache_key(),
+        "access_token": access_token,
+        "expires_at": time.time() + int(expires_in),
+    }
+    try:
+        tmp_path = f"{TOKEN_CACHE_PATH}.tmp"
+        with open(tmp_path, 'w', encoding='UTF-8') as f:
+            json.dump(cached, f)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, TOKEN_CACHE_PATH)
+    except OSError as e:
+        logger.warning(f"⚠️ 토큰 캐시 저장 실패: {e}")
+
+def get_access_token(use_cache=True, min_valid_seconds=600):
+    """토큰 발급 (min_valid_seconds 이상 유효한 캐시 토큰이 있으면 재사용)"""
+    if use_cache:
+        cached_token = load_cached_token(min_valid_seconds)
+        if cached_token:
+            return cached_token
     headers = {"content-type":"application/json"}
     body = {"grant_type":"client_credentials",
     "appkey":APP_KEY, 
@@ -202,17 +359,18 @@ def get_access_token():
     PATH = "oauth2/tokenP"
     URL = f"{URL_BASE}/{PATH}"
     try:
-        res = session.post(URL, headers=headers, data=json.dumps(body), timeout=30)
+        res = session.post(URL, headers=headers, data=json.dumps(body), timeout=api_guard.timeout('token'))
         result = res.json()
         
         if 'access_token' in result:
+            save_cached_token(result["access_token"], result.get("expires_in", 86400))
             return result["access_token"]
         else:
-            send_message(f"❌ 토큰 발급 실패: access_token 없음 - {result}", force_discord=True)
+            send_message(f"❌ 토큰 발급 실패: access_token 없음 - {result}", force_discord=True, level=logging.ERROR, endpoint=PATH)
             raise Exception(f"토큰 응답에 access_token 없음: {result}")
             
     except Exception as e:
-        send_message(f"❌ API 토큰 발급 오류: {str(e)}", force_discord=True)
+        send_message(f"❌ API 토큰 발급 오류: {str(e)}", force_discord=True, level=logging.ERROR, endpoint=PATH)
         raise
     
 def hashkey(datas):
@@ -224,7 +382,7 @@ def hashkey(datas):
     'appKey' : APP_KEY,
     'appSecret' : APP_SECRET,
     }
-    res = session.post(URL, headers=headers, data=json.dumps(datas), timeout=30)
+    res = session.post(URL, headers=headers, data=json.dumps(datas), timeout=api_guard.timeout('hashkey'))
     hashkey = res.json()["HASH"]
     return hashkey
 
@@ -242,11 +400,33 @@ def get_current_price(market="NAS", code="AAPL"):
         "EXCD":market,
         "SYMB":code,
     }
-    res = session.get(URL, headers=headers, params=params, timeout=30)
-    return float(res.json()['output']['last'])
 
-def calculate_volatility(market="NAS", code="AAPL", days=20):
-    """최근 N일간의 변동성 계산 (수정된 최종 버전)"""
+    def request(timeout):
+        started = time.perf_counter()
+        res = session.get(URL, headers=headers, params=params, timeout=timeout)
+        output = res.json()['output']
+        price = float(output['last'])
+        if logger.isEnabledFor(logging.DEBUG) and sampled('quote', DEBUG_LOG_SAMPLE):
+            logger.debug("현재가 조회", extra={'symbol': code, 'endpoint': PATH, 'price': price,
+                                           'latency_ms': (time.perf_counter() - started) * 1000})
+        last_quotes[code] = (price, time.monotonic())
+        minute_bars.update(code, price, cum_volume=float(output.get('tvol') or 0) or None)
+        return price
+
+    def cached_quote():
+        # 조회 실패/차단 시 QUOTE_FALLBACK_MAX_AGE 이내의 직전 시세 사용
+        price, fetched_at = last_quotes.get(code, (None, 0))
+        if price is not None and time.monotonic() - fetched_at <= QUOTE_FALLBACK_MAX_AGE:
+            return price
+        return None
+
+    price = api_guard.call('price', request, fallback=cached_quote)
+    if profiler.mark('first_price_check'):
+        profiler.save()
+    return price
+
+def get_daily_prices(market="NAS", code="AAPL", bymd=""):
+    """수정주가 일봉 데이터 조회 (기준일자 이전 최근일 순)"""
     PATH = "uapi/overseas-price/v1/quotations/dailyprice"
     URL = f"{URL_BASE}/{PATH}"
     headers = {
@@ -261,69 +441,69 @@ def calculate_volatility(market="NAS", code="AAPL", days=20):
         "EXCD": market,
         "SYMB": code,
         "GUBN": "0",
-        "BYMD": "",
-        "MODP": "0"
+        "BYMD": bymd,
+        "MODP": "1" # 수정주가 (분할/병합 이전 일봉도 현재 주가 기준)
     }
-    
-    res = session.get(URL, headers=headers, params=params, timeout=30)
-    prices = res.json().get('output2', [])
-
-    if not prices:
-        send_message(f"[{code}] 일봉 데이터 조회 실패. 변동성 계산을 건너뜁니다.")
-        return 0.2
+    return api_guard.call(
+        'dailyprice',
+        lambda timeout: session.get(URL, headers=headers, params=params, timeout=timeout).json().get('output2', []),
+    )
 
-    daily_returns = []
-    for i in range(min(days, len(prices)-1)):
+def fetch_daily_bars(market="NAS", code="AAPL", bymd=""):
+    """일봉 조회 결과를 일봉 저장소 형식으로 변환"""
+    rows = []
+    for bar in get_daily_prices(market, code, bymd):
         try:
-            today_price_data = prices[i]
-            yesterday_price_data = prices[i+1]
+            rows.append((int(bar['xymd']), float(bar['open']), float(bar['high']),
+                         float(bar['low']), float(bar['clos']), float(bar.get('tvol') or 0)))
+        except (KeyError, ValueError) as e:
+            send_message(f"[{code}] 일봉 데이터 일부 오류: {e}", level=logging.WARNING, symbol=code)
+    return make_bars(rows)
 
-            # 'clos', 'last', 'base', 'close' 순서로 종가를 찾도록 수정
-            # 진단 결과 'clos'가 정확한 키 이름임을 확인했습니다.
-            today_close = float(today_price_data.get('clos', today_price_data.get('last', today_price_data.get('base', today_price_data.get('close', 0)))))
-            yesterday_close = float(yesterday_price_data.get('clos', yesterday_price_data.get('last', yesterday_price_data.get('base', yesterday_price_data.get('close', 0)))))
-            
-            if today_close == 0 or yesterday_close == 0:
-                continue
-
-            daily_return = (today_close - yesterday_close) / yesterday_close
-            daily_returns.append(daily_return)
-        except Exception as e:
-            send_message(f"[{code}] 변동성 계산 중 일부 데이터 오류: {e}")
-            continue
+def load_daily_bars(market="NAS", code="AAPL"):
+    """당일까지의 수정주가 일봉 조회 (저장소에 없는 일봉만 API로 받아서 병합, 이후 분할/병합은 조회 시 반영)"""
+    today = int(datetime.datetime.now(timezone('America/New_York')).strftime('%Y%m%d'))
+    # 장 시작 전에 받은 결과에는 당일 일봉이 없으므로 장 시작 후에는 다시 받음
+    trading_session = us_calendar.today_session()
+    refresh_after = trading_session.open.timestamp() if trading_session else None
+    bar_store.sync(market, code, lambda bymd: fetch_daily_bars(market, code, bymd), today, refresh_after=refresh_after)
+    return bar_store.load(market, code)
+
+def calculate_volatility(market="NAS", code="AAPL", days=20, bars=None):
+    """최근 N일간의 변동성 계산 (일봉 저장소 기준)"""
+    if bars is None:
+        bars = load_daily_bars(market, code)
+
+    if len(bars) == 0:
+        send_message(f"[{code}] 일봉 데이터 조회 실패. 변동성 계산을 건너뜁니다.", level=logging.WARNING, symbol=code)
+        return 0.2
+
+    closes = np.asarray(bars['close'][-(days + 1):], dtype=float)
+    today_close, yesterday_close = closes[1:], closes[:-1]
+    valid = (today_close > 0) & (yesterday_close > 0)
+    daily_returns = (today_close[valid] - yesterday_close[valid]) / yesterday_close[valid]
     
     if len(daily_returns) > 1:
-        volatility = statistics.stdev(daily_returns) * math.sqrt(252)
+        volatility = float(np.std(daily_returns, ddof=1)) * math.sqrt(252)
         return volatility
     
     # 계산에 실패한 경우 기본값 반환
-    send_message(f"[{code}] 유효한 데이터 부족으로 변동성 계산 실패. 기본값을 사용합니다.")
+    send_message(f"[{code}] 유효한 데이터 부족으로 변동성 계산 실패. 기본값을 사용합니다.", level=logging.WARNING, symbol=code)
     return 0.2
 
 def get_target_price(market="NAS", code="AAPL"):
     """동적 승수를 적용한 변동성 돌파 전략으로 매수 목표가 조회"""
-    PATH = "uapi/overseas-price/v1/quotations/dailyprice"
-    URL = f"{URL_BASE}/{PATH}"
-    headers = {"Content-Type":"application/json", 
-        "authorization": f"Bearer {ACCESS_TOKEN}",
-        "appKey":APP_KEY,
-        "appSecret":APP_SECRET,
-        "tr_id":"HHDFS76240000"}
-    params = {
-        "AUTH":"",
-        "EXCD":market,
-        "SYMB":code,
-        "GUBN":"0",
-        "BYMD":"",
-        "MODP":"0"
-    }
-    res = session.get(URL, headers=headers, params=params, timeout=30)
-    stck_oprc = float(res.json()['output2'][0]['open']) #오늘 시가
-    stck_hgpr = float(res.json()['output2'][1]['high']) #전일 고가
-    stck_lwpr = float(res.json()['output2'][1]['low']) #전일 저가
+    # 당일 시가가 반영된 목표가는 장중 변하지 않으므로 캐시 사용
+    if code in target_prices:
+        return target_prices[code]
+
+    bars = load_daily_bars(market, code)
+    stck_oprc = float(bars[-1]['open']) #오늘 시가
+    stck_hgpr = float(bars[-2]['high']) #전일 고가
+    stck_lwpr = float(bars[-2]['low']) #전일 저가
     
-    # 변동성 기반 동적 승수 계산
-    volatility = calculate_volatility(market, code, days=20)
+    # 변동성 기반 동적 승수 계산 (같은 일봉 데이터 재사용)
+    volatility = calculate_volatility(market, code, days=20, bars=bars)
     
     # 변동성에 따른 승수 조정
     if volatility > 0.4:
@@ -334,6 +514,13 @@ def get_target_price(market="NAS", code="AAPL"):
         multiplier = 0.7
     
     target_price = stck_oprc + (stck_hgpr - stck_lwpr) * multiplier
+    volatilities[code] = volatility
+
+    # 당일 일봉이 생성된 경우에만 캐시 (장 시작 직후에는 전일 일봉이 마지막 행일 수 있음)
+    today = int(datetime.datetime.now(timezone('America/New_York')).strftime('%Y%m%d'))
+    if int(bars[-1]['date']) == today:
+        target_prices[code] = target_price
+        breakout_inputs[code] = (stck_oprc, stck_hgpr - stck_lwpr, multiplier)
     
     # <<< [수정] 아래 로직으로 변경 >>>
     # 아직 이 종목의 목표가를 보낸 적이 없다면 메시지를 보내고 기록
@@ -362,9 +549,16 @@ def get_stock_balance():
         "CTX_AREA_FK200": "",
         "CTX_AREA_NK200": ""
     }
-    res = session.get(URL, headers=headers, params=params, timeout=30)
-    stock_list = res.json()['output1']
-    evaluation = res.json()['output2']
+    global last_stock_balance
+    try:
+        result = api_guard.call('balance', lambda timeout: session.get(URL, headers=headers, params=params, timeout=timeout).json())
+        stock_list = result['output1']
+        evaluation = result['output2']
+    except Exception as e:
+        if last_stock_balance is None:
+            raise
+        send_message(f"⚠️ 잔고 조회 실패, 마지막 조회 결과 사용: {e}", level=logging.WARNING, endpoint=PATH)
+        return dict(last_stock_balance)
     stock_dict = {}
     send_message(f"====주식 보유잔고====")
     for stock in stock_list:
@@ -377,9 +571,10 @@ def get_stock_balance():
     send_message(f"평가 손익 합계: ${evaluation['ovrs_tot_pfls']}")
     time.sleep(0.1)
     send_message(f"=================")
+    last_stock_balance = dict(stock_dict)
     return stock_dict
 
-def get_balance():
+def get_balance(quiet=False):
     """현금 잔고조회"""
     PATH = "uapi/domestic-stock/v1/trading/inquire-psbl-order"
     URL = f"{URL_BASE}/{PATH}"
@@ -399,13 +594,16 @@ def get_balance():
         "CMA_EVLU_AMT_ICLD_YN": "Y",
         "OVRS_ICLD_YN": "Y"
     }
-    res = session.get(URL, headers=headers, params=params, timeout=30)
-    cash = res.json()['output']['ord_psbl_cash']
-    send_message(f"주문 가능 현금 잔고: {cash}원")
+    cash = api_guard.call(
+        'cash',
+        lambda timeout: session.get(URL, headers=headers, params=params, timeout=timeout).json()['output']['ord_psbl_cash'],
+    )
+    if not quiet:
+        send_message(f"주문 가능 현금 잔고: {cash}원")
     return int(cash)
 
-def buy(market="NASD", code="AAPL", qty="1", price="0"):
-    """미국 주식 시장가 매수"""
+def place_order(side, market, code, qty, price):
+    """미국 주식 지정가 주문, 주문번호 반환 (실패 시 None)"""
     PATH = "uapi/overseas-stock/v1/trading/order"
     URL = f"{URL_BASE}/{PATH}"
     data = {
@@ -413,65 +611,185 @@ def buy(market="NASD", code="AAPL", qty="1", price="0"):
         "ACNT_PRDT_CD": ACNT_PRDT_CD,
         "OVRS_EXCG_CD": market,
         "PDNO": code,
-        "ORD_DVSN": "00", # 해외주식 주문 구분 '00'이 지정가와 시장가 모두 포함 가능
+        "ORD_DVSN": "00", # 지정가
         "ORD_QTY": str(int(qty)),
-        "OVRS_ORD_UNPR": str(float(price)), # 시장가 주문이지만 현재가 입력
+        "OVRS_ORD_UNPR": f"{price:.4f}" if price < 1 else f"{price:.2f}",
         "ORD_SVR_DVSN_CD": "0"
     }
     headers = {"Content-Type":"application/json", 
         "authorization":f"Bearer {ACCESS_TOKEN}",
         "appKey":APP_KEY,
         "appSecret":APP_SECRET,
-        "tr_id":"TTTT1002U",
+        "tr_id":"TTTT1002U" if side == 'buy' else "TTTT1006U",
         "custtype":"P",
         "hashkey" : hashkey(data)
     }
-    res = session.post(URL, headers=headers, data=json.dumps(data), timeout=30)
+    if leader_lease and not leader_lease.held():
+        raise LeaseLost(f"리더 임대가 없어 주문하지 않습니다: {code}")
+    res = session.post(URL, headers=headers, data=json.dumps(data), timeout=api_guard.timeout('order'))
     if res.json()['rt_cd'] == '0':
-        # 매수 성공 시 매수 가격 저장 (실제 체결가는 아니지만 로직상 기록)
-        # 실제 체결가는 별도로 조회해야 가장 정확함
-        buy_prices[code] = price
-        trailing_stops[code] = price  # 트레일링 스탑 초기화
-        send_message(f"[매수 성공] {code}: 시장가 주문, 수량: {qty}, 기준가: ${price:.2f}")
-        return True
-    else:
-        send_message(f"[매수 실패]{str(res.json())}")
-        return False
+        return res.json()['output']['ODNO']
+    send_message(f"[{'매수' if side == 'buy' else '매도'} 실패]{str(res.json())}", level=logging.ERROR, symbol=code, endpoint=PATH, side=side)
+    return None
 
-def sell(market="NASD", code="AAPL", qty="1", price="0"):
-    """미국 주식 시장가 매도"""
-    PATH = "uapi/overseas-stock/v1/trading/order"
+def revise_order(market, code, order_no, qty, price=0, cancel=False):
+    """미국 주식 정정/취소 주문, 정정 주문번호 반환 (실패 시 None)"""
+    PATH = "uapi/overseas-stock/v1/trading/order-rvsecncl"
     URL = f"{URL_BASE}/{PATH}"
     data = {
         "CANO": CANO,
         "ACNT_PRDT_CD": ACNT_PRDT_CD,
         "OVRS_EXCG_CD": market,
         "PDNO": code,
-        "ORD_DVSN": "00",
+        "ORGN_ODNO": order_no,
+        "RVSE_CNCL_DVSN_CD": "02" if cancel else "01", # 01: 정정, 02: 취소
         "ORD_QTY": str(int(qty)),
-        "OVRS_ORD_UNPR": str(float(price)), # 시장가 주문이지만 현재가 입력
+        "OVRS_ORD_UNPR": "0" if cancel else (f"{price:.4f}" if price < 1 else f"{price:.2f}"),
         "ORD_SVR_DVSN_CD": "0"
     }
     headers = {"Content-Type":"application/json", 
         "authorization":f"Bearer {ACCESS_TOKEN}",
         "appKey":APP_KEY,
         "appSecret":APP_SECRET,
-        "tr_id":"TTTT1006U",
+        "tr_id":"TTTT1004U",
         "custtype":"P",
         "hashkey" : hashkey(data)
     }
-    res = session.post(URL, headers=headers, data=json.dumps(data), timeout=30)
+    if not cancel and leader_lease and not leader_lease.held():
+        # 정정만 막고 취소는 허용 (미체결 잔량을 남기지 않도록)
+        send_message(f"[정정 중단] {code}: 리더 임대가 없습니다.", level=logging.WARNING, symbol=code, order_id=order_no, event='lease_lost')
+        return None
+    res = session.post(URL, headers=headers, data=json.dumps(data), timeout=api_guard.timeout('revise'))
     if res.json()['rt_cd'] == '0':
-        # 매도 성공 시 해당 종목의 기록 삭제
-        if code in buy_prices:
-            del buy_prices[code]
-        if code in trailing_stops:
-            del trailing_stops[code]
-        send_message(f"[매도 성공] {code}: 시장가 주문, 수량: {qty}, 기준가: ${price:.2f}")
-        return True
-    else:
-        send_message(f"[매도 실패]{str(res.json())}")
+        return res.json()['output']['ODNO']
+    send_message(f"[{'취소' if cancel else '정정'} 실패] {code}: {res.json().get('msg1', '')}", level=logging.ERROR, symbol=code, endpoint=PATH, order_id=order_no)
+    return None
+
+def get_order_fill(market, code, order_no):
+    """주문번호별 체결 수량/평균 체결가 조회"""
+    PATH = "uapi/overseas-stock/v1/trading/inquire-ccnl"
+    URL = f"{URL_BASE}/{PATH}"
+    headers = {"Content-Type":"application/json", 
+        "authorization":f"Bearer {ACCESS_TOKEN}",
+        "appKey":APP_KEY,
+        "appSecret":APP_SECRET,
+        "tr_id":"TTTS3035R",
+        "custtype":"P"
+    }
+    today = datetime.datetime.now(timezone('America/New_York')).strftime('%Y%m%d')
+    params = {
+        "CANO": CANO,
+        "ACNT_PRDT_CD": ACNT_PRDT_CD,
+        "PDNO": code,
+        "ORD_STRT_DT": today,
+        "ORD_END_DT": today,
+        "SLL_BUY_DVSN": "00",
+        "CCLD_NCCS_DVSN": "00",
+        "OVRS_EXCG_CD": market,
+        "SORT_SQN": "DS",
+        "ORD_DT": "",
+        "ORD_GNO_BRNO": "",
+        "ODNO": "",
+        "CTX_AREA_NK200": "",
+        "CTX_AREA_FK200": ""
+    }
+    result = api_guard.call('fill', lambda timeout: session.get(URL, headers=headers, params=params, timeout=timeout).json())
+    if result.get('rt_cd') != '0':
+        # 오류 응답을 미체결(0주)로 보면 체결분을 놓치므로 예외로 전달 (집행기가 잔량 취소 후 다시 조회)
+        raise RuntimeError(f"체결 조회 실패: {result.get('msg1', '')}")
+    for order in result.get('output', []):
+        if order['odno'] == order_no:
+            return int(float(order['ft_ccld_qty'] or 0)), float(order['ft_ccld_unpr3'] or 0)
+    return 0, 0.0
+
+def make_executor(market):
+    """거래소별 주문 집행기 (주문 방식/offset/대기 시간은 환경변수로 조정)"""
+    return OrderExecutor(
+        place=lambda side, code, qty, price: place_order(side, market, code, qty, price),
+        replace=lambda order_no, code, qty, price: revise_order(market, code, order_no, qty, price),
+        cancel=lambda order_no, code, qty: revise_order(market, code, order_no, qty, cancel=True) is not None,
+        query_fill=lambda order_no, code: get_order_fill(market, code, order_no),
+        quote=lambda code: get_current_price(QUOTE_EXCHANGE_CODES[market], code),
+        mode=ORDER_MODE,
+        offset_bps=ORDER_OFFSET_BPS,
+        timeout=ORDER_TIMEOUT,
+        max_reprices=ORDER_MAX_REPRICES,
+        poll_interval=ORDER_POLL_INTERVAL,
+        max_time=ORDER_MAX_TIME,
+    )
+
+def buy(market="NASD", code="AAPL", qty="1", price="0", reason='', trigger_price=0.0):
+    """미국 주식 매수 (price 는 매수 판단 시점 가격, 시장성 지정가 + 정정 주문으로 집행)"""
+    if code in pending_orders:
+        send_message(f"[매수 보류] {code}: 이전 주문의 체결 수량을 아직 확인하지 못했습니다.", level=logging.WARNING, symbol=code)
         return False
+    # 집행 중 프로세스가 종료되면 재시작/승격한 프로세스가 미체결 주문이 남았을 수 있음을 알 수 있도록 기록
+    pending_orders[code] = {'side': 'buy', 'market': market, 'qty': int(qty), 'time': time.time()}
+    try:
+        report = make_executor(market).execute('buy', code, qty, price, reason=reason, trigger_price=trigger_price)
+    except Exception:
+        # 주문 전송 중 오류: 주문이 접수되었는지 알 수 없으므로 당일 신규 매수에서 제외
+        pending_orders.pop(code, None)
+        blocked_symbols.add(code)
+        raise
+    return settle_order(market, report)
+
+def sell(market="NASD", code="AAPL", qty="1", price="0", reason='', trigger_price=0.0, holdings=None):
+    """미국 주식 매도 (price 는 매도 판단 시점 가격, 시장성 지정가 + 정정 주문으로 집행)
+
+    holdings({종목코드: 보유 수량})를 주면 일부만 체결된 경우 체결 수량만큼 차감 (다음 매도는 남은 수량만)
+    """
+    if code in pending_orders:
+        send_message(f"[매도 보류] {code}: 이전 주문의 체결 수량을 아직 확인하지 못했습니다.", level=logging.WARNING, symbol=code)
+        return False
+    pending_orders[code] = {'side': 'sell', 'market': market, 'qty': int(qty), 'time': time.time()}
+    try:
+        report = make_executor(market).execute('sell', code, qty, price, reason=reason, trigger_price=trigger_price)
+    except Exception:
+        pending_orders.pop(code, None)
+        raise
+    return settle_order(market, report, holdings)
+
+def settle_order(market, report, holdings=None):
+    """집행 결과 반영, 매수는 체결 여부, 매도는 전량 체결 여부 반환
+
+    체결 수량을 확정하지 못한 주문은 pending_orders 에 남겨 같은 종목 주문을 막고 resolve_orders 에서 다시 확인
+    """
+    code = report.code
+    if not report.resolved:
+        pending_orders[code] = {'side': report.side, 'market': market, 'qty': report.qty, 'time': time.time(), 'report': report.to_dict()}
+        send_message(f"[주문 확인 필요] {code}: {report.error} (체결 수량을 확인할 때까지 이 종목은 주문하지 않습니다)", force_discord=True,
+                     level=logging.ERROR, event='order_unresolved', side=report.side, symbol=code, order_id=report.order_no)
+        return False
+    pending_orders.pop(code, None)
+    execution_log.record(report)
+    side = '매수' if report.side == 'buy' else '매도'
+    if report.filled:
+        account_cache.on_order_filled()
+        if portfolio_risk:
+            portfolio_risk.on_fill(code, report.side, report.filled_qty, report.avg_price)
+        if report.side == 'buy':
+            # 실제 평균 체결가를 매수가로 기록
+            buy_prices[code] = report.avg_price
+            trailing_stops[code] = report.avg_price  # 트레일링 스탑 초기화
+        send_message(f"[{side} 성공] {code}: 수량: {report.filled_qty}/{report.qty}, 체결가: ${report.avg_price:.2f}, 판단가: ${report.decision_price:.2f}, 슬리피지: {report.slippage_bps:+.1f}bp, 주문 {report.orders}회",
+                     force_discord=True, event='order_filled', side=report.side, symbol=code, order_id=report.order_no,
+                     qty=report.filled_qty, price=report.avg_price, slippage_bps=report.slippage_bps, latency_ms=report.elapsed * 1000)
+    elif report.orders:
+        send_message(f"[{side} 미체결] {code}: 주문 {report.orders}회 후 잔량 취소", level=logging.WARNING,
+                     event='order_unfilled', side=report.side, symbol=code, order_id=report.order_no)
+    if report.side == 'buy':
+        return report.filled
+    if report.filled_qty < report.qty:
+        if holdings is not None and code in holdings:
+            holdings[code] = int(holdings[code]) - report.filled_qty
+        return False  # 잔량이 남으면 다음 주기에 다시 매도
+    # 전량 매도 시 해당 종목의 기록 삭제
+    if code in buy_prices:
+        del buy_prices[code]
+    if code in trailing_stops:
+        del trailing_stops[code]
+    return True
 
 def check_stop_loss(code, current_price, stop_loss_pct=0.05):
     """손절매 조건 확인"""
@@ -483,7 +801,7 @@ def check_stop_loss(code, current_price, stop_loss_pct=0.05):
     
     if current_price <= stop_loss_price:
         loss_pct = (current_price - buy_price) / buy_price
-        send_message(f"[손절매 신호] {code}: 매수가 ${buy_price:.2f} → 현재가 ${current_price:.2f} (손실 {loss_pct:.2%})")
+        send_message(f"[손절매 신호] {code}: 매수가 ${buy_price:.2f} → 현재가 ${current_price:.2f} (손실 {loss_pct:.2%})", force_discord=True, event='stop_loss', symbol=code)
         return True
     return False
 
@@ -497,7 +815,7 @@ def check_take_profit(code, current_price, profit_pct=0.1):
     
     if current_price >= take_profit_price:
         profit_pct_actual = (current_price - buy_price) / buy_price
-        send_message(f"[이익실현 신호] {code}: 매수가 ${buy_price:.2f} → 현재가 ${current_price:.2f} (수익 {profit_pct_actual:.2%})")
+        send_message(f"[이익실현 신호] {code}: 매수가 ${buy_price:.2f} → 현재가 ${current_price:.2f} (수익 {profit_pct_actual:.2%})", force_discord=True, event='take_profit', symbol=code)
         return True
     return False
 
@@ -510,7 +828,7 @@ def update_trailing_stop(code, current_price):
         if current_price > trailing_stops[code]:
             trailing_stops[code] = current_price
 
-def check_trailing_stop(code, current_price, trailing_pct=0.02):
+def check_trailing_stop(code, current_price, trailing_pct=0.02, activation_pct=0.02):
     """트레일링 스탑 조건 확인"""
     if code not in trailing_stops or code not in buy_prices:
         return False
@@ -518,20 +836,38 @@ def check_trailing_stop(code, current_price, trailing_pct=0.02):
     highest_price = trailing_stops[code]
     buy_price = buy_prices[code]
     
-    # 매수가 대비 최소 2% 이상 수익이 있을 때만 트레일링 스탑 적용
-    if highest_price > buy_price * 1.02:
+    # 매수가 대비 최소 activation_pct(기본 2%) 이상 수익이 있을 때만 트레일링 스탑 적용
+    if highest_price > buy_price * (1 + activation_pct):
         trailing_stop_price = highest_price * (1 - trailing_pct)
         
         if current_price <= trailing_stop_price:
             profit_pct = (current_price - buy_price) / buy_price
-            send_message(f"[트레일링스탑] {code}: 최고가 ${highest_price:.2f} → 현재가 ${current_price:.2f} (수익 {profit_pct:.2%})")
+            send_message(f"[트레일링스탑] {code}: 최고가 ${highest_price:.2f} → 현재가 ${current_price:.2f} (수익 {profit_pct:.2%})", force_discord=True, event='trailing_stop', symbol=code)
             return True
     
     return False
 
-def check_positions_for_risk_management(stock_dict, bought_list, nasd_symbol_list, nyse_symbol_list, amex_symbol_list):
-    """보유 종목들의 손절매/이익실현/트레일링스탑 조건 검사 (수정된 로직)"""
-    for code in list(bought_list):  # list()로 복사해서 순회 중 수정 방지
+def exit_triggers(code, stop_loss_pct=0.02, take_profit_pct=0.03, trailing_pct=0.02, trailing_activation_pct=0.02):
+    """보유 종목의 매도 판단 기준가 [손절가, 익절가, 트레일링스탑 가격 또는 활성화 가격] (해당 없으면 nan)
+
+    - 트레일링스탑이 활성화된 뒤에도 익절 조건은 그대로 검사하므로 익절가는 항상 포함
+    """
+    if code not in buy_prices:
+        return [math.nan] * 3
+    buy_price = buy_prices[code]
+    highest_price = trailing_stops.get(code, buy_price)
+    if highest_price > buy_price * (1 + trailing_activation_pct):
+        trailing = highest_price * (1 - trailing_pct)
+    else:
+        trailing = buy_price * (1 + trailing_activation_pct)
+    return [buy_price * (1 - stop_loss_pct), buy_price * (1 + take_profit_pct), trailing]
+
+def check_positions_for_risk_management(stock_dict, bought_list, nasd_symbol_list, nyse_symbol_list, amex_symbol_list,
+                                        stop_loss_pct=0.02, take_profit_pct=0.03, trailing_pct=0.02, trailing_activation_pct=0.02,
+                                        codes=None):
+    """보유 종목들의 손절매/이익실현/트레일링스탑 조건 검사 (codes 를 주면 해당 종목만)"""
+    targets = list(bought_list) if codes is None else [code for code in codes if code in bought_list]
+    for code in targets:  # 복사본으로 순회해서 순회 중 수정 방지
         if code in buy_prices:
             # 해당 종목의 시장 구분
             market1 = "NASD"
@@ -552,30 +888,33 @@ def check_positions_for_risk_management(stock_dict, bought_list, nasd_symbol_lis
                 update_trailing_stop(code, current_price)
                 
                 # 2. 손절매는 최우선으로, 다른 조건보다 먼저 확인
-                if check_stop_loss(code, current_price, stop_loss_pct=0.02):
+                if check_stop_loss(code, current_price, stop_loss_pct=stop_loss_pct):
                     if code in stock_dict:
                         qty = stock_dict[code]
-                        if sell(market=market1, code=code, qty=qty, price=current_price):
+                        if sell(market=market1, code=code, qty=qty, price=current_price,
+                                reason='stop_loss', trigger_price=buy_prices[code] * (1 - stop_loss_pct), holdings=stock_dict):
                             bought_list.remove(code)
                             if code in stock_dict:
                                 del stock_dict[code]
                         continue # 매도 후 다음 종목으로 넘어감
                 
-                # 3. 트레일링 스탑이 활성화된 경우 (2% 이상 수익), 트레일링 스탑으로만 매도 판단
-                if check_trailing_stop(code, current_price, trailing_pct=0.02):
+                # 3. 트레일링 스탑이 활성화된 경우 (기본 2% 이상 수익), 트레일링 스탑으로만 매도 판단
+                if check_trailing_stop(code, current_price, trailing_pct=trailing_pct, activation_pct=trailing_activation_pct):
                     if code in stock_dict:
                         qty = stock_dict[code]
-                        if sell(market=market1, code=code, qty=qty, price=current_price):
+                        if sell(market=market1, code=code, qty=qty, price=current_price,
+                                reason='trailing_stop', trigger_price=trailing_stops[code] * (1 - trailing_pct), holdings=stock_dict):
                             bought_list.remove(code)
                             if code in stock_dict:
                                 del stock_dict[code]
                         continue # 매도 후 다음 종목으로 넘어감
                 
                 # 4. 트레일링 스탑이 활성화되지 않은 초기 수익 구간에서만 고정 익절 실행
-                elif check_take_profit(code, current_price, profit_pct=0.03):
+                elif check_take_profit(code, current_price, profit_pct=take_profit_pct):
                     if code in stock_dict:
                         qty = stock_dict[code]
-                        if sell(market=market1, code=code, qty=qty, price=current_price):
+                        if sell(market=market1, code=code, qty=qty, price=current_price,
+                                reason='take_profit', trigger_price=buy_prices[code] * (1 + take_profit_pct), holdings=stock_dict):
                             bought_list.remove(code)
                             if code in stock_dict:
                                 del stock_dict[code]
@@ -583,8 +922,11 @@ def check_positions_for_risk_management(stock_dict, bought_list, nasd_symbol_lis
                 
                 # <<<< 로직 수정 종료 >>>>
                             
+            except CircuitOpenError as e:
+                # 시세 API 차단 중이고 쓸 수 있는 직전 시세도 없음 (대기 없이 다음 종목 확인)
+                send_message(f"[위험관리 보류] {code}: {str(e)}", level=logging.WARNING, symbol=code)
             except Exception as e:
-                send_message(f"[위험관리 오류] {code}: {str(e)}")
+                send_message(f"[위험관리 오류] {code}: {str(e)}", level=logging.ERROR, symbol=code)
                 time.sleep(1)
 
 def get_exchange_rate():
@@ -605,98 +947,302 @@ def get_exchange_rate():
         "TR_MKET_CD": "01",
         "INQR_DVSN_CD": "00"
     }
-    res = session.get(URL, headers=headers, params=params, timeout=30)
+    output2 = api_guard.call(
+        'exchange_rate',
+        lambda timeout: session.get(URL, headers=headers, params=params, timeout=timeout).json()['output2'],
+    )
     exchange_rate = 1270.0
-    if len(res.json()['output2']) > 0:
-        exchange_rate = float(res.json()['output2'][0]['frst_bltn_exrt'])
+    if len(output2) > 0:
+        exchange_rate = float(output2[0]['frst_bltn_exrt'])
     return exchange_rate
 
+# 주문가능금액/환율 캐시 (백그라운드 갱신, 주문 체결 시 재조회)
+account_cache = AccountCache(
+    lambda: get_balance(quiet=True),
+    get_exchange_rate,
+    cash_ttl=int(os.getenv('CASH_CACHE_TTL', 60)),
+    exchange_rate_ttl=int(os.getenv('EXCHANGE_RATE_CACHE_TTL', 600)),
+)
+
+def load_daily_close_matrix(symbol_list, nyse_symbol_list, amex_symbol_list, days):
+    """관심 종목의 완료된 일봉 종가 행렬 (종목 수, days) (당일 일봉 제외, 저장소에서 조회)"""
+    today = int(datetime.datetime.now(timezone('America/New_York')).strftime('%Y%m%d'))
+    closes = []
+    for sym in symbol_list:
+        market2 = "NAS"
+        if sym in nyse_symbol_list:
+            market2 = "NYS"
+        if sym in amex_symbol_list:
+            market2 = "AMS"
+        bars = bar_store.load(market2, sym, end=today - 1)
+        closes.append(bars['close'])
+    return stack_series(closes, days)
+
+def flush_minute_bars(nyse_symbol_list, amex_symbol_list):
+    """장중 분봉을 일봉 저장소에 저장"""
+    session_date = datetime.datetime.now(timezone('America/New_York')).strftime('%Y%m%d')
+    for sym in minute_bars.symbols():
+        market2 = "NAS"
+        if sym in nyse_symbol_list:
+            market2 = "NYS"
+        if sym in amex_symbol_list:
+            market2 = "AMS"
+        try:
+            bar_store.save_minute_bars(market2, sym, session_date, minute_bars.bars(sym))
+        except OSError as e:
+            send_message(f"[분봉 저장 오류] {sym}: {str(e)}", level=logging.ERROR, symbol=sym)
+
+def restore_state(store):
+    """저장된 당일 매매 상태 복원 (변경 시 저장소에 즉시 기록되는 컨테이너로 교체)"""
+    global buy_prices, trailing_stops, target_price_message_sent, target_prices, volatilities, breakout_inputs, pending_orders, blocked_symbols
+    store.purge_other_sessions()
+    buy_prices = PersistentDict(store, 'buy_prices')
+    trailing_stops = PersistentDict(store, 'trailing_stops')
+    target_price_message_sent = PersistentSet(store, 'target_price_message_sent')
+    target_prices = PersistentDict(store, 'target_prices')
+    volatilities = PersistentDict(store, 'volatilities')
+    breakout_inputs = PersistentDict(store, 'breakout_inputs')
+    pending_orders = PersistentDict(store, 'pending_orders')
+    blocked_symbols = PersistentSet(store, 'blocked_symbols')
+    return PersistentList(store, 'bought_list')
+
 # 장시간 체크 함수
 def is_market_open():
-    """미국 주식 시장 개장 시간 체크"""
-    t_now = datetime.datetime.now(timezone('America/New_York'))
-    today = t_now.weekday()
-    
-    # 주말이면 휴장
-    if today == 5 or today == 6:  # 토요일, 일요일
-        return False
-    
-    # 평일 9:30 ~ 16:00 (EST) 개장
-    market_open = t_now.replace(hour=9, minute=30, second=0, microsecond=0)
-    market_close = t_now.replace(hour=16, minute=0, second=0, microsecond=0)
-    
-    return market_open <= t_now <= market_close
+    """미국 주식 시장 개장 시간 체크 (주말/휴장일/조기폐장 반영)"""
+    return us_calendar.is_open()
 
-# 자동매매 시작
-try:
-    ACCESS_TOKEN = get_access_token()
+def keep_alive_connections(symbol_markets, count=WARMUP_CONNECTIONS):
+    """시세 API 연결 count 개를 동시에 사용해 연결 풀에 열어두고 유지 (결과는 사용하지 않음)"""
+    with ThreadPoolExecutor(max_workers=max(count, 1)) as executor:
+        futures = [executor.submit(get_daily_prices, market2, sym) for sym, market2 in symbol_markets[:count]]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                logger.warning(f"⚠️ 연결 유지 조회 실패: {e}", extra={'endpoint': 'dailyprice'})
 
-    nasd_symbol_list = ['TSLA', 'QCOM', 'SBUX', 'MSFT', 'INTC', 'LRCX', 'TXN', 'AVGO', 'AAPL', 'LYFT', 'MU', 'CSCO', 'MRVL', 'NVDA', 'AMZN'] # 매수 희망 종목 리스트 (NASD)
-    nyse_symbol_list = [] 
-    amex_symbol_list = [] 
-    symbol_list = nasd_symbol_list + nyse_symbol_list + amex_symbol_list
-    
-    bought_list = [] # 매수 완료된 종목 리스트
-    target_price_message_sent = set() # <<< [추가] 목표가 메시지를 보냈는지 기록하는 용도
-    daily_message_sent = False  # 일일 초기 메시지 전송 여부
-
-    # 장시간이 아니면 프로그램 종료
-    if not is_market_open():
-        send_message("현재 장시간이 아닙니다. 프로그램을 종료합니다.", force_discord=True)
-        exit()
-
-    total_cash = get_balance() # 보유 현금 조회
-    exchange_rate = get_exchange_rate() # 환율 조회
-    stock_dict = get_stock_balance() # 보유 주식 조회
-    for sym in stock_dict.keys():
-        bought_list.append(sym)
-    target_buy_count = 4 # 매수할 종목 수
-    buy_percent = 0.25 # 종목당 매수 금액 비율
-    buy_amount = total_cash * buy_percent / exchange_rate # 종목별 주문 금액 계산 (달러)
-    soldout = False
-
-    # 초기 메시지는 한 번만 전송 (Discord에도 전송)
-    if not daily_message_sent:
-        # 버전 정보 가져오기
-        version_info = get_version_info()
-        
-        send_message("===해외 주식 자동매매 프로그램을 시작합니다===", force_discord=True)
-        send_message(version_info, force_discord=True)
-        send_message(f"목표 매수 종목 수: {target_buy_count}, 종목당 투자 비율: {buy_percent:.0%}", force_discord=True)
-        send_message(f"위험관리: 손절매 -5%, 이익실현 +10%, 트레일링스탑 -2%", force_discord=True)
-        
-        # 현재 잔고 및 보유 종목 정보 전송
-        send_balance_info()
-        
-        # 모든 종목의 목표가를 한 번에 계산하고 메시지 전송
-        for sym in symbol_list:
-            market2 = "NAS"
-            if sym in nyse_symbol_list:
-                market2 = "NYS"
-            if sym in amex_symbol_list:
-                market2 = "AMS"
+def standby(state, replication, symbol_markets, until):
+    """대기 프로세스: 토큰/일봉을 미리 준비하고 리더 임대가 만료될 때까지 리더의 상태 변경을 반영, 승격 여부 반환"""
+    global ACCESS_TOKEN
+    holder = (leader_lease.current() or {}).get('owner')
+    send_message(f"🕒 대기 모드로 시작합니다. (리더: {holder}, 리더 응답이 {leader_lease.ttl:g}초 끊기면 승격)", force_discord=True, event='standby', holder=holder)
+    # 승격 직후 바로 매매할 수 있도록 토큰/일봉을 미리 준비 (목표가는 리더가 계산한 값을 복제로 받음)
+    ACCESS_TOKEN = get_access_token(min_valid_seconds=until - time.time() + 600)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = {sym: executor.submit(load_daily_bars, market2, sym) for sym, market2 in symbol_markets}
+        for sym, future in futures.items():
             try:
-                target_price = get_target_price(market2, sym)
-                # get_target_price 내부에서 목표가 메시지가 전송됨
+                future.result()
             except Exception as e:
-                send_message(f"[목표가 계산 오류] {sym}: {str(e)}")
-        
-        daily_message_sent = True
-    
-    while True:
-        t_now = datetime.datetime.now(timezone('America/New_York')) # 뉴욕 기준 현재 시간
-        t_9 = t_now.replace(hour=9, minute=30, second=0, microsecond=0)
-        t_start = t_now.replace(hour=9, minute=35, second=0, microsecond=0)
-        t_sell = t_now.replace(hour=15, minute=45, second=0, microsecond=0)
-        t_exit = t_now.replace(hour=15, minute=50, second=0,microsecond=0)
-        today = t_now.weekday()
+                logger.warning(f"⚠️ 일봉 준비 실패 {sym}: {e}", extra={'symbol': sym})
+    if not leader_lease.wait(lambda: replication.apply(state), interval=HA_POLL_INTERVAL, until=until):
+        return False
+    if not replication.apply(state):
+        return False  # 리더가 장 마감 처리 후 임대를 반납한 경우
+    send_message(f"👑 리더 응답이 끊겨 대기 프로세스가 매매를 이어받습니다. (epoch {leader_lease.epoch})", force_discord=True, event='leader_takeover', epoch=leader_lease.epoch)
+    return True
+
+def main():
+    """자동매매 시작"""
+    global ACCESS_TOKEN, portfolio_risk, leader_lease
+    install_signal_handler() # start.py /profile 요청 시 샘플링 프로파일 기록
+    # 관심 종목/위험관리/사이징 설정 (config.yaml 수정 시 매매 틱 사이에 다시 읽음)
+    trading_config = TradingConfig(US_DEFAULTS)
+    nasd_symbol_list = list(trading_config['NASD_SYMBOLS']) # 매수 희망 종목 리스트 (NASD)
+    nyse_symbol_list = list(trading_config['NYSE_SYMBOLS'])
+    amex_symbol_list = list(trading_config['AMEX_SYMBOLS'])
+    try:
+        symbol_list = nasd_symbol_list + nyse_symbol_list + amex_symbol_list
         
-        # 장시간이 아니면 프로그램 종료
-        if not is_market_open():
-            send_message("장시간이 종료되어 프로그램을 종료합니다.", force_discord=True)
-            break
+        # 휴장일이거나 장시간이 아니면 토큰 발급 전에 프로그램 종료
+        trading_session = us_calendar.today_session()
+        if trading_session is None:
+            send_message("오늘은 미국 증시 휴장일입니다. 프로그램을 종료합니다.", force_discord=True, event='shutdown')
+            return
+        # 장 시작 WARMUP_MINUTES 분 전부터는 토큰/잔고/일봉을 미리 준비하고 장 시작을 기다림
+        t_now = datetime.datetime.now(timezone('America/New_York'))
+        pre_open = t_now < trading_session.open
+        if not is_market_open() and not (pre_open and trading_session.open - t_now <= datetime.timedelta(minutes=WARMUP_MINUTES)):
+            send_message("현재 장시간이 아닙니다. 프로그램을 종료합니다.", force_discord=True, event='shutdown')
+            return
+        if trading_session.early_close:
+            send_message(f"⏰ 오늘은 조기폐장일입니다. (장 마감 {trading_session.close.strftime('%H:%M')} ET)", force_discord=True)
+
+        state = StateStore(datetime.datetime.now(timezone('America/New_York')).strftime('%Y%m%d'), STATE_DB_PATH)
+        execution_log.session = state.session  # 집행 기록은 거래일별 파일에
+        # 이중화: 리더 임대를 얻은 프로세스만 매매, 얻지 못하면 리더의 상태 변경을 따라 반영하며 대기
+        replication = None
+        if HA_DIR:
+            leader_lease = LeaderLease(os.path.join(HA_DIR, 'leader_us.lease'), ttl=HA_LEASE_TTL)
+            replication = ReplicationLog(HA_DIR, state.session, name='state_us')
+            if not leader_lease.acquire():
+                markets = [(sym, "AMS" if sym in amex_symbol_list else "NYS" if sym in nyse_symbol_list else "NAS") for sym in symbol_list]
+                if not standby(state, replication, markets, trading_session.exit.timestamp()):
+                    send_message("리더가 장을 마감했습니다. 대기 프로세스를 종료합니다.", event='shutdown')
+                    return
+                t_now = datetime.datetime.now(timezone('America/New_York'))
+                pre_open = t_now < trading_session.open
+            # 이전 리더가 남긴 변경을 모두 반영한 뒤부터 이 프로세스의 변경을 기록
+            if not replication.apply(state):
+                send_message("당일 장 마감 처리가 이미 끝났습니다. 프로그램을 종료합니다.", event='shutdown')
+                return
+            replication.epoch = leader_lease.epoch
+            state.listeners.append(replication.publish)
+            leader_lease.start()
+
+        # 당일 매매 상태 복원 (재시작 시 목표가/최고가 등을 다시 계산하지 않음)
+        with profiler.phase('restore_state'):
+            bought_list = restore_state(state) # 매수 완료된 종목 리스트
+            # 이전 프로세스가 매수 주문 집행 중 종료된 종목은 미체결 주문이 남았을 수 있으므로 당일 신규 매수에서 제외
+            # (주문번호를 아는 미확정 주문은 남겨 두고 매매 틱에서 다시 확인)
+            for sym, order in list(pending_orders.items()):
+                if 'report' in order:
+                    continue
+                if order['side'] == 'buy':
+                    blocked_symbols.add(sym)
+                del pending_orders[sym]
+            if blocked_symbols:
+                send_message(f"⚠️ 이전 프로세스가 주문 집행 중 종료된 종목은 당일 신규 매수에서 제외합니다: {', '.join(sorted(blocked_symbols))} (미체결 주문 확인 필요)",
+                             force_discord=True, level=logging.WARNING, event='orphaned_orders', symbols=sorted(blocked_symbols))
+            soldout = state.get('flags', 'soldout', False)
+            daily_message_sent = state.get('flags', 'daily_message_sent', False)  # 일일 초기 메시지 전송 여부
+
+        with profiler.phase('auth'):
+            # 장 종료까지 만료되지 않는 토큰만 재사용 (장중 재발급 방지)
+            ACCESS_TOKEN = get_access_token(min_valid_seconds=(trading_session.exit - t_now).total_seconds() + 600)
+        profiler.mark('auth_done')
+
+        # 잔고/환율/보유종목/목표가를 병렬로 조회 (장 시작 전에는 당일 시가가 없으므로 전일까지의 일봉만 저장)
+        with profiler.phase('warmup'):
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                cash_future = executor.submit(account_cache.cash.refresh) # 보유 현금 조회
+                rate_future = executor.submit(account_cache.exchange_rate.refresh) # 환율 조회
+                stock_future = executor.submit(get_stock_balance) # 보유 주식 조회
+                target_futures = {}
+                for sym in symbol_list:
+                    market2 = "NAS"
+                    if sym in nyse_symbol_list:
+                        market2 = "NYS"
+                    if sym in amex_symbol_list:
+                        market2 = "AMS"
+                    target_futures[sym] = executor.submit(load_daily_bars if pre_open else get_target_price, market2, sym)
+                total_cash = cash_future.result()
+                exchange_rate = rate_future.result()
+                stock_dict = stock_future.result()
+                for sym, future in target_futures.items():
+                    try:
+                        future.result() # get_target_price 내부에서 목표가 메시지가 전송됨
+                    except Exception as e:
+                        send_message(f"[{'일봉 조회' if pre_open else '목표가 계산'} 오류] {sym}: {str(e)}", level=logging.ERROR, symbol=sym)
+
+        # 보유 종목 기준으로 매수 완료 목록 정리
+        for sym in list(bought_list):
+            if sym not in stock_dict:
+                bought_list.remove(sym)
+        for sym in stock_dict.keys():
+            if sym not in bought_list:
+                bought_list.append(sym)
+        target_buy_count = trading_config['TARGET_BUY_COUNT'] # 매수할 종목 수
+        # 종목별 변동성으로 매수 금액 배분 (종목당 위험 = 위험 예산 / 매수할 종목 수)
+        sizer = VolatilityParitySizer(
+            symbol_list,
+            target_buy_count,
+            risk_budget=trading_config['POSITION_RISK_BUDGET'],
+            max_weight=trading_config['MAX_POSITION_WEIGHT'],
+        )
+        # 매수 신호 (기본: 변동성 돌파), 일봉 기반 신호용 종가 행렬은 장중 변하지 않으므로 한 번만 생성
+        combiner = SignalCombiner(
+            parse_signals(os.getenv('ENTRY_SIGNALS', 'breakout')),
+            policy=os.getenv('SIGNAL_POLICY', 'all'),
+            threshold=float(os.getenv('SIGNAL_THRESHOLD', 0)),
+        )
+        daily_close = load_daily_close_matrix(symbol_list, nyse_symbol_list, amex_symbol_list, combiner.daily_lookback)
+        # 기준가 근처 종목은 자주, 먼 종목은 드물게 시세 조회
+        poller = AdaptivePoller(POLL_BUDGET, min_interval=POLL_MIN_INTERVAL, max_interval=POLL_MAX_INTERVAL, sigma=POLL_SIGMA)
+        # 파라미터 변형 전략을 실제 매매와 같은 시세로 모의 실행 (첫 번째 변형은 현재 설정)
+        shadow = None
+        if SHADOW_GRID:
+            shadow = ShadowRunner(
+                parse_grid(SHADOW_GRID, dict(trading_config.values, MULTIPLIER_SCALE=1.0)),
+                target_buy_count,
+                slippage_bps=SHADOW_SLIPPAGE_BPS,
+            )
+            send_message(f"👥 그림자 전략 {len(shadow.variants)}개 변형 모의 실행", force_discord=True)
+        # 계좌 전체 손익/노출은 체결과 시세 조회 결과로만 갱신 (장 시작 자본은 저장소에 기록되어 재시작 후에도 유지)
+        portfolio_risk = PortfolioRisk(
+            account_cache.buying_power_usd() + sum(int(qty) * buy_prices[sym] for sym, qty in stock_dict.items() if sym in buy_prices),
+            max_daily_loss=trading_config['MAX_DAILY_LOSS_PCT'],
+            flatten_loss=trading_config['FLATTEN_LOSS_PCT'],
+            max_gross_exposure=trading_config['MAX_GROSS_EXPOSURE'],
+            max_concentration=trading_config['MAX_CONCENTRATION'],
+            ledger=PersistentDict(state, 'portfolio'),
+        )
+        for sym, qty in stock_dict.items():
+            if sym in buy_prices:
+                portfolio_risk.set_position(sym, qty, buy_prices[sym], last_quotes.get(sym, (None,))[0])
+        risk_action = portfolio_risk.check()
+        account_cache.start() # 이후 현금/환율은 백그라운드에서 갱신
+
+        # 초기 메시지는 한 번만 전송 (Discord에도 전송)
+        if not daily_message_sent:
+            # 버전 정보 가져오기
+            version_info = get_version_info()
+            
+            send_message("===해외 주식 자동매매 프로그램을 시작합니다===", force_discord=True)
+            send_message(version_info, force_discord=True)
+            send_message(f"목표 매수 종목 수: {target_buy_count}, 변동성 예산: {sizer.risk_budget:.0%}, 종목당 최대 비중: {sizer.max_weight:.0%}", force_discord=True)
+            send_message(f"매수 신호: {os.getenv('ENTRY_SIGNALS', 'breakout')} (조합: {combiner.policy})", force_discord=True)
+            send_message(f"위험관리: 손절매 -{trading_config['STOP_LOSS_PCT']:.1%}, 이익실현 +{trading_config['TAKE_PROFIT_PCT']:.1%}, 트레일링스탑 -{trading_config['TRAILING_STOP_PCT']:.1%}", force_discord=True)
+            send_message(f"계좌 한도: 일일 손실 -{portfolio_risk.max_daily_loss:.1%} 매수 중단, -{portfolio_risk.flatten_loss:.1%} 전 종목 청산, 총 노출 {portfolio_risk.max_gross_exposure:.0%}, 종목 집중도 {portfolio_risk.max_concentration:.0%} (자본 ${portfolio_risk.capital:,.2f})", force_discord=True)
+            
+            # 현재 잔고 및 보유 종목 정보 전송 (시작 시 조회한 값 재사용)
+            send_balance_info(cash_balance=total_cash, exchange_rate=exchange_rate)
             
-        if t_9 < t_now < t_start and soldout == False: # 잔여 수량 매도
+            daily_message_sent = True
+            state.set('flags', 'daily_message_sent', True)
+        else:
+            send_message(f"♻️ 저장된 상태를 복원하여 재시작합니다. (보유: {len(bought_list)}종목, 트레일링스탑: {len(trailing_stops)}종목, 목표가: {len(target_prices)}종목)", force_discord=True)
+        profiler.save()
+        
+        # 거래 일정은 캘린더에서 미리 계산 (조기폐장일은 일괄 매도/종료 시각도 앞당겨짐)
+        t_9 = trading_session.open
+        t_start = trading_session.start
+        t_sell = trading_session.sell
+        t_exit = trading_session.exit
+        t_now = datetime.datetime.now(timezone('America/New_York')) # 뉴욕 기준 현재 시간
+        scheduler = EventScheduler(on_idle=profiler.add_idle)  # 일정 대기 시간은 시작 소요 시간에서 제외
+
+        def symbol_markets():
+            """관심 종목별 시세 거래소 코드 [(종목코드, 거래소)]"""
+            markets = []
+            for sym in symbol_list:
+                market2 = "NAS"
+                if sym in nyse_symbol_list:
+                    market2 = "NYS"
+                if sym in amex_symbol_list:
+                    market2 = "AMS"
+                markets.append((sym, market2))
+            return markets
+
+        def keep_alive():
+            """장 시작 전 : 시세 API 연결 유지"""
+            keep_alive_connections(symbol_markets())
+
+        def prefetch_targets():
+            """장 시작 직후 : 당일 시가 기준 목표가를 병렬로 미리 계산 (첫 매수 틱은 캐시된 목표가 사용)"""
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                futures = {sym: executor.submit(get_target_price, market2, sym) for sym, market2 in symbol_markets()}
+                for sym, future in futures.items():
+                    try:
+                        sizer.set_target(sym, future.result(), volatilities.get(sym))
+                    except Exception as e:
+                        send_message(f"[목표가 계산 오류] {sym}: {str(e)}", level=logging.ERROR, symbol=sym)
+
+        def sell_leftovers():
+            """AM 09:30 ~ 09:35 : 잔여 수량 매도"""
+            nonlocal soldout, stock_dict
+            if soldout:
+                return
             for sym, qty in stock_dict.items():
                 market1 = "NASD"
                 market2 = "NAS"
@@ -706,85 +1252,361 @@ try:
                 if sym in amex_symbol_list:
                     market1 = "AMEX"
                     market2 = "AMS"
-                sell(market=market1, code=sym, qty=qty, price=get_current_price(market=market2, code=sym))
+                sell(market=market1, code=sym, qty=qty, price=get_current_price(market=market2, code=sym), reason='leftover', holdings=stock_dict)
             soldout = True
-            bought_list = []
+            state.set('flags', 'soldout', soldout)
+            bought_list.clear()
             time.sleep(1)
             stock_dict = get_stock_balance()
-            
-        if t_start < t_now < t_sell:  # AM 09:35 ~ PM 03:45 : 매수 및 위험관리
-            # 1. 기존 포지션 위험관리 (손절/익절/트레일링스탑)
-            check_positions_for_risk_management(stock_dict, bought_list, nasd_symbol_list, nyse_symbol_list, amex_symbol_list)
-            
-            # 2. 새로운 매수 기회 탐색
-            for sym in symbol_list:
-                if len(bought_list) < target_buy_count:
-                    if sym in bought_list:
-                        continue
-                    market1 = "NASD"
-                    market2 = "NAS"
-                    if sym in nyse_symbol_list:
-                        market1 = "NYSE"
-                        market2 = "NYS"
-                    if sym in amex_symbol_list:
-                        market1 = "AMEX"
-                        market2 = "AMS"
-                    
-                    try:
-                        # 동적 목표가 계산 적용
-                        target_price = get_target_price(market2, sym)
-                        current_price = get_current_price(market2, sym)
-                        
-                        if target_price < current_price:
-                            buy_qty = 0  # 매수할 수량 초기화
-                            buy_qty = int(buy_amount // current_price)
-                            if buy_qty > 0:
-                                send_message(f"{sym} 목표가 달성({target_price:.2f} < {current_price:.2f}) 매수를 시도합니다.")
-                                # 시장가 매수를 위해 price 에는 체결 기준용 현재가를 넘겨줌
-                                result = buy(market=market1, code=sym, qty=buy_qty, price=current_price) 
-                                time.sleep(1)
-                                if result:
-                                    soldout = False
-                                    bought_list.append(sym)
-                                    get_stock_balance()
-                    except Exception as e:
-                        send_message(f"[매수 시도 오류] {sym}: {str(e)}")
-                        time.sleep(5)  # 오류 시 더 긴 대기시간
-                        
-            time.sleep(10)  # 10초마다 체크
-            
-            # 30분마다 잔고 확인
-            if t_now.minute == 30 and t_now.second <= 10: 
-                get_stock_balance()
-                time.sleep(5)
-                
-        if t_sell < t_now < t_exit:  # PM 03:45 ~ PM 03:50 : 일괄 매도
-            if soldout == False:
-                stock_dict = get_stock_balance()
-                for sym, qty in stock_dict.items():
-                    market1 = "NASD"
-                    market2 = "NAS"
-                    if sym in nyse_symbol_list:
-                        market1 = "NYSE"
-                        market2 = "NYS"
-                    if sym in amex_symbol_list:
-                        market1 = "AMEX"
-                        market2 = "AMS"
-                    # 시장가 매도를 위해 price 에는 참고용 현재가를 넘겨줌
-                    sell(market=market1, code=sym, qty=qty, price=get_current_price(market=market2, code=sym))
+
+        def reload_config():
+            """설정 파일이 바뀌었으면 반영 (관심 종목은 추가된 종목의 목표가/일봉만 새로 준비)"""
+            nonlocal target_buy_count, daily_close
+            changed = trading_config.reload()
+            if not changed:
+                return
+            send_message(f"⚙️ 설정 변경: {', '.join(sorted(changed))}", force_discord=True, event='config_reloaded')
+            if 'TARGET_BUY_COUNT' in changed:
+                target_buy_count = sizer.max_positions = trading_config['TARGET_BUY_COUNT']
+            sizer.risk_budget = trading_config['POSITION_RISK_BUDGET']
+            sizer.max_weight = trading_config['MAX_POSITION_WEIGHT']
+            portfolio_risk.max_daily_loss = trading_config['MAX_DAILY_LOSS_PCT']
+            portfolio_risk.flatten_loss = trading_config['FLATTEN_LOSS_PCT']
+            portfolio_risk.max_gross_exposure = trading_config['MAX_GROSS_EXPOSURE']
+            portfolio_risk.max_concentration = trading_config['MAX_CONCENTRATION']
+            if not changed.keys() & {'NASD_SYMBOLS', 'NYSE_SYMBOLS', 'AMEX_SYMBOLS'}:
+                return
+
+            # 보유 중인 종목은 관심 종목에서 빠져도 매도 시 거래소 구분이 필요하므로 거래소 목록에 남겨 둠
+            new_lists = (trading_config['NASD_SYMBOLS'], trading_config['NYSE_SYMBOLS'], trading_config['AMEX_SYMBOLS'])
+            watched = set().union(*new_lists)
+            for exchange_list, new_list in zip((nasd_symbol_list, nyse_symbol_list, amex_symbol_list), new_lists):
+                exchange_list[:] = list(new_list) + [sym for sym in exchange_list if sym in bought_list and sym not in watched]
+            old_symbols = list(symbol_list)
+            symbol_list[:] = [sym for new_list in new_lists for sym in new_list]
+
+            # 유지되는 종목의 목표가/변동성/종가 행렬은 그대로 두고, 추가된 종목만 조회
+            added = sizer.set_symbols(symbol_list)
+            removed = [sym for sym in old_symbols if sym not in sizer.index]
+            close_rows = dict(zip(old_symbols, daily_close))
+            if added:
+                close_rows.update(zip(added, load_daily_close_matrix(added, nyse_symbol_list, amex_symbol_list, combiner.daily_lookback)))
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    futures = {}
+                    for sym in added:
+                        market2 = "NAS"
+                        if sym in nyse_symbol_list:
+                            market2 = "NYS"
+                        if sym in amex_symbol_list:
+                            market2 = "AMS"
+                        futures[sym] = executor.submit(get_target_price, market2, sym)
+                    for sym, future in futures.items():
+                        try:
+                            sizer.set_target(sym, future.result(), volatilities.get(sym))
+                        except Exception as e:
+                            send_message(f"[목표가 계산 오류] {sym}: {str(e)}", level=logging.ERROR, symbol=sym)
+            daily_close = np.array([close_rows[sym] for sym in symbol_list]).reshape(len(symbol_list), combiner.daily_lookback)
+            send_message(f"📋 관심 종목 변경: 추가 {added or '-'}, 제외 {removed or '-'} (총 {len(symbol_list)}종목)", force_discord=True)
+
+        def risk_params():
+            return dict(
+                stop_loss_pct=trading_config['STOP_LOSS_PCT'],
+                take_profit_pct=trading_config['TAKE_PROFIT_PCT'],
+                trailing_pct=trading_config['TRAILING_STOP_PCT'],
+                trailing_activation_pct=trading_config['TRAILING_ACTIVATION_PCT'],
+            )
+
+        def reschedule(polled, skipped):
+            """조회한 종목은 기준가까지 거리/변동성으로 다음 조회 시각 예약, 조회하지 못한 종목은 다음 틱에 조회"""
+            for sym in skipped:
+                poller.schedule(sym)
+            if not polled:
+                return
+            prices = np.array([last_quotes.get(sym, (math.nan,))[0] for sym in polled])
+            triggers = np.full((len(polled), 4), np.nan)
+            vols = np.full(len(polled), sizer.default_volatility)
+            for row, sym in enumerate(polled):
+                if sym in bought_list:
+                    triggers[row, :3] = exit_triggers(sym, **risk_params())
+                    triggers[row, 3] = portfolio_risk.loss_trigger(sym)  # 계좌 일일 손실 한도
+                    vols[row] = volatilities.get(sym) or sizer.default_volatility
+                elif sym in sizer.index:
+                    i = sizer.index[sym]
+                    triggers[row, 0] = sizer.targets[i]
+                    vols[row] = sizer.volatility()[i]
+            for sym, interval in zip(polled, poller.intervals(prices, triggers, vols)):
+                poller.schedule(sym, interval)
+
+        def feed_shadow(polled):
+            """이번 틱에 조회한 시세를 그림자 전략에 전달 (추가 조회 없음)"""
+            symbols = []
+            for sym in polled:
+                if sym not in last_quotes:
+                    continue
+                if not shadow.has_target(sym) and sym in breakout_inputs:
+                    shadow.set_target(sym, *breakout_inputs[sym], volatilities.get(sym) or sizer.default_volatility)
+                symbols.append(sym)
+            if symbols:
+                shadow.update(symbols, [last_quotes[sym][0] for sym in symbols])
+
+        def flatten_positions():
+            """일일 손실 청산 기준 초과 : 보유 종목 전량 매도 (잔고를 다시 조회하지 않고 보유 목록 기준, 실패한 종목은 다음 틱에 다시 매도)"""
+            nonlocal soldout
+            for sym in list(bought_list):
+                if sym not in stock_dict:
+                    continue
+                market1 = "NASD"
+                market2 = "NAS"
+                if sym in nyse_symbol_list:
+                    market1 = "NYSE"
+                    market2 = "NYS"
+                if sym in amex_symbol_list:
+                    market1 = "AMEX"
+                    market2 = "AMS"
+                try:
+                    if sell(market=market1, code=sym, qty=stock_dict[sym], price=get_current_price(market2, sym), reason='risk_flatten', holdings=stock_dict):
+                        bought_list.remove(sym)
+                        del stock_dict[sym]
+                except Exception as e:
+                    send_message(f"[청산 오류] {sym}: {str(e)}", level=logging.ERROR, symbol=sym)
+            if not bought_list:
                 soldout = True
-                bought_list = []
-                time.sleep(1)
-                
-        if t_exit < t_now:  # PM 03:50 ~ :프로그램 종료
+                state.set('flags', 'soldout', soldout)
+
+        def resolve_orders():
+            """체결 수량을 확정하지 못한 주문을 다시 확인 (잔량 취소 후 체결 조회), 확정되면 보유 목록에 반영"""
+            nonlocal soldout
+            for sym, order in list(pending_orders.items()):
+                if 'report' not in order:
+                    continue
+                report = ExecutionReport.from_dict(order['report'])
+                try:
+                    resolved = make_executor(order['market']).resolve(report)
+                except Exception as e:
+                    send_message(f"[주문 확인 오류] {sym}: {str(e)}", level=logging.ERROR, symbol=sym)
+                    continue
+                if not resolved:
+                    continue  # 다음 틱에 다시 확인
+                if report.side == 'sell':
+                    if settle_order(order['market'], report, holdings=stock_dict) and sym in bought_list:
+                        bought_list.remove(sym)
+                        stock_dict.pop(sym, None)
+                elif settle_order(order['market'], report):
+                    stock_dict[sym] = int(stock_dict.get(sym, 0)) + report.filled_qty
+                    if sym not in bought_list:
+                        bought_list.append(sym)
+                    soldout = False
+                    state.set('flags', 'soldout', soldout)
+                    poller.schedule(sym)
+
+        def trade_tick():
+            """AM 09:35 ~ PM 03:45 : 매수 및 위험관리"""
+            nonlocal soldout, stock_dict, risk_action
+            tick_started = time.monotonic()
+            if leader_lease and not leader_lease.held():
+                # 임대를 잃으면 다른 프로세스가 매매를 이어받으므로 즉시 중단 (주문도 place_order 에서 차단)
+                send_message("🛑 리더 임대를 잃어 매매를 중단합니다.", force_discord=True, level=logging.ERROR, event='lease_lost')
+                scheduler.stop()
+                return
+            # 0. 설정 변경 반영 (재시작 없이 관심 종목/위험관리 기준 조정), 미확정 주문 재확인
+            reload_config()
+            if any('report' in order for order in pending_orders.values()):
+                resolve_orders()
+
+            # 계좌 전체 한도 확인 (직전 틱까지 반영된 체결/시세 기준, 잔고 조회 없음)
+            action = portfolio_risk.check()
+            if action != risk_action:
+                risk = portfolio_risk.status()
+                message = {FLATTEN: "🛑 일일 손실 청산 기준 초과, 전 종목을 청산합니다.", None: "✅ 계좌 한도 정상, 신규 매수를 재개합니다."}.get(action, "⏸️ 계좌 한도 초과, 신규 매수를 중단합니다.")
+                send_message(f"{message} (손익 ${risk['realized'] + risk['unrealized']:+,.2f}, 총 노출 ${risk['gross']:,.2f}, 집중 종목 {risk['concentrated'] or '-'})",
+                             force_discord=True, level=logging.INFO if action is None else logging.WARNING, event=f"risk_{action or 'ok'}", **risk)
+                risk_action = action
+            if action == FLATTEN:
+                if bought_list:
+                    flatten_positions()
+                return
+
+            # 조회 대상: 위험관리할 보유 종목 + 매수 여유가 있으면 미보유 관심 종목 (보유 종목을 한도 안에서 먼저 조회)
+            held = [sym for sym in bought_list if sym in buy_prices]
+            # 체결 수량을 확인하지 못한 매수 주문도 매수할 종목 수에 포함
+            occupied = len(set(bought_list) | {sym for sym, order in pending_orders.items() if order['side'] == 'buy'})
+            scanning = occupied < target_buy_count and action is None
+            poller.sync(held + ([sym for sym in symbol_list if sym not in bought_list and sym not in blocked_symbols and sym not in pending_orders] if scanning else []))
+            due = poller.take(first=held)
+            polled = [sym for sym in due if sym in held]
+            try:
+                # 1. 기존 포지션 위험관리 (손절/익절/트레일링스탑)
+                check_positions_for_risk_management(
+                    stock_dict, bought_list, nasd_symbol_list, nyse_symbol_list, amex_symbol_list,
+                    codes=polled, **risk_params(),
+                )
+
+                # 2. 새로운 매수 기회 탐색 (조회 시각이 된 미보유 종목만, 위험관리 후 남은 틱 시간 안에서만)
+                if not scanning:
+                    return
+                prices = np.full(len(symbol_list), np.nan)
+                with api_guard.deadline(TICK_DEADLINE - (time.monotonic() - tick_started)):
+                    for sym in due:
+                        if sym in bought_list or sym not in sizer.index:
+                            continue
+                        market2 = "NAS"
+                        if sym in nyse_symbol_list:
+                            market2 = "NYS"
+                        if sym in amex_symbol_list:
+                            market2 = "AMS"
+                        try:
+                            # 동적 목표가 계산 적용
+                            sizer.set_target(sym, get_target_price(market2, sym), volatilities.get(sym))
+                            prices[sizer.index[sym]] = get_current_price(market2, sym)
+                            polled.append(sym)
+                        except DeadlineExceeded:
+                            # 남은 종목은 다음 틱에 조회
+                            if sampled('scan_deadline', DEBUG_LOG_SAMPLE):
+                                logger.warning(f"⏱️ 틱 마감으로 매수 탐색 중단 ({sym} 이후 종목 생략)", extra={'symbol': sym, 'event': 'scan_deadline'})
+                            break
+                        except CircuitOpenError:
+                            polled.append(sym)  # 차단 상태는 서킷 브레이커가 기록, 이번 틱에는 이 종목 제외
+                        except Exception as e:
+                            polled.append(sym)
+                            send_message(f"[시세 조회 오류] {sym}: {str(e)}", level=logging.ERROR, symbol=sym)
+            finally:
+                reschedule(polled, [sym for sym in due if sym not in polled])
+                for sym in polled:
+                    if sym in last_quotes:
+                        portfolio_risk.on_price(sym, last_quotes[sym][0])
+                if shadow:
+                    feed_shadow(polled)
+
+            # 3. 관심 종목 전체의 매수 신호 점수를 한 번에 계산
+            snapshot = MarketSnapshot(symbol_list, prices, sizer.targets, sizer.volatility(), daily_close)
+            if combiner.intraday_lookback:
+                snapshot.intraday_close = stack_series(
+                    [minute_bars.bars(sym, combiner.intraday_lookback)['close'] for sym in symbol_list],
+                    combiner.intraday_lookback,
+                )
+            scores = combiner.combine(snapshot)
+
+            # 4. 동시에 신호가 난 종목은 점수 순으로, 변동성 균등 배분으로 매수 수량 계산
+            held = np.array([sym in bought_list for sym in symbol_list])
+            if not len(sizer.breakouts(prices, held, scores)):
+                return
+            cash = account_cache.buying_power_usd()
+            invested = sum(int(qty) * buy_prices.get(sym, 0) for sym, qty in stock_dict.items() if sym in bought_list)
+            # 남은 매수 종목 수는 관심 종목 밖의 보유 종목(계좌에서 복원한 잔여 종목 등)과 미확정 매수 주문까지 포함해 계산
+            occupied = len(set(bought_list) | {sym for sym, order in pending_orders.items() if order['side'] == 'buy'})
+            orders = sizer.allocate(prices, held, capital=cash + invested, cash=cash, scores=scores, held_count=occupied)
+            for sym, buy_qty, current_price in orders:
+                market1 = "NASD"
+                if sym in nyse_symbol_list:
+                    market1 = "NYSE"
+                if sym in amex_symbol_list:
+                    market1 = "AMEX"
+                target_price = sizer.targets[sizer.index[sym]]
+                # 총 노출/종목 집중도 한도 안에서만 매수
+                buy_qty = min(buy_qty, int(portfolio_risk.entry_limit() // current_price))
+                if buy_qty <= 0:
+                    continue
+                try:
+                    send_message(f"{sym} 매수 신호(점수 {scores[sizer.index[sym]]:.2f}, 목표가 {target_price:.2f}, 현재가 {current_price:.2f}) 매수를 시도합니다.")
+                    # 시장가 매수를 위해 price 에는 체결 기준용 현재가를 넘겨줌
+                    result = buy(market=market1, code=sym, qty=buy_qty, price=current_price, reason='entry', trigger_price=target_price)
+                    time.sleep(1)
+                    if result:
+                        soldout = False
+                        state.set('flags', 'soldout', soldout)
+                        bought_list.append(sym)
+                        poller.schedule(sym)  # 다음 조회 주기는 손절/익절/계좌 손실 한도 기준으로 다시 계산
+                except Exception as e:
+                    send_message(f"[매수 시도 오류] {sym}: {str(e)}", level=logging.ERROR, symbol=sym)
+                    time.sleep(5)  # 오류 시 더 긴 대기시간
+            stock_dict = get_stock_balance()
+
+        def sell_all():
+            """PM 03:45 ~ PM 03:50 : 일괄 매도"""
+            nonlocal soldout, stock_dict
+            if shadow:
+                shadow.close_all()
+            if soldout:
+                return
+            resolve_orders()  # 미확정 주문이 남은 종목은 sell() 에서 건너뜀
+            stock_dict = get_stock_balance()
+            for sym, qty in stock_dict.items():
+                market1 = "NASD"
+                market2 = "NAS"
+                if sym in nyse_symbol_list:
+                    market1 = "NYSE"
+                    market2 = "NYS"
+                if sym in amex_symbol_list:
+                    market1 = "AMEX"
+                    market2 = "AMS"
+                # 시장가 매도를 위해 price 에는 참고용 현재가를 넘겨줌
+                sell(market=market1, code=sym, qty=qty, price=get_current_price(market=market2, code=sym), reason='close', holdings=stock_dict)
+            soldout = True
+            state.set('flags', 'soldout', soldout)
+            bought_list.clear()
+
+        def finish():
+            """PM 03:50 ~ :프로그램 종료"""
             # 장 종료 전 최종 잔고 정보 전송
             send_message("📊 ===== 장 마감 결과 =====", force_discord=True)
-            send_balance_info()
-            send_message("🔔 미국 장시간이 종료되었습니다. 프로그램을 종료합니다.", force_discord=True)
-            break
-            
-        time.sleep(5)  # 5초 대기
+            send_balance_info(cash_balance=account_cache.cash.get(), exchange_rate=account_cache.exchange_rate.get())
+            execution = execution_log.summary()
+            if execution['orders']:
+                slippage = execution['avg_slippage_bps']
+                send_message(f"📐 주문 집행: {execution['orders']}건, 체결률 {execution['fill_rate']:.0%}, 평균 슬리피지 {slippage if slippage is not None else 0:+.1f}bp, 평균 소요 {execution['avg_elapsed']:.1f}초", force_discord=True)
+            if shadow:
+                shadow.close_all()
+                shadow.save(session_date=state.session)
+                rows = shadow.report()
+                lines = [f"👥 그림자 전략 결과 ({len(rows)}개 변형 중 손익 상위)"]
+                for row in rows[:5] + [row for row in rows[5:] if row['variant'] == 'live']:
+                    params = row['params']
+                    lines.append(
+                        f"[{row['variant']}] {row['pnl_pct']:+.2f}% ({row['trades']}회) "
+                        f"손절 {params['STOP_LOSS_PCT']:.1%} 익절 {params['TAKE_PROFIT_PCT']:.1%} "
+                        f"트레일링 {params['TRAILING_STOP_PCT']:.1%}/{params['TRAILING_ACTIVATION_PCT']:.1%} 승수 x{params['MULTIPLIER_SCALE']:g}"
+                    )
+                send_message("\n".join(lines), force_discord=True)
+            # 당일 집행 기록(재시작 전 주문 포함)과 장중 분봉으로 거래별 손익/슬리피지/지연 분석
+            try:
+                report = build_report(
+                    load_executions(execution_log.path, state.session),
+                    {sym: minute_bars.bars(sym) for sym in minute_bars.symbols()},
+                    state.session,
+                )
+                path = save_report(report)
+                send_message(format_summary(report), force_discord=True, event='session_report', path=path)
+            except Exception as e:
+                send_message(f"[매매 분석 오류] {str(e)}", level=logging.ERROR, exc_info=True)
+            if replication:
+                replication.end()  # 대기 프로세스는 승격하지 않고 종료
+            send_message("🔔 미국 장시간이 종료되었습니다. 프로그램을 종료합니다.", force_discord=True, event='shutdown')
+            scheduler.stop()
+
+        # 일정 등록 (이미 지난 구간의 일정은 등록하지 않음)
+        if t_now < t_start:
+            scheduler.at(t_9, sell_leftovers)
+        if pre_open:
+            scheduler.every(KEEPALIVE_INTERVAL, keep_alive, start=t_now + datetime.timedelta(seconds=KEEPALIVE_INTERVAL), until=t_9)
+            # 장 시작 직후에는 당일 일봉이 아직 없을 수 있어 1분 뒤 (매수 시작 전) 목표가 계산
+            scheduler.at(min(t_9 + datetime.timedelta(minutes=1), t_start), prefetch_targets)
+        scheduler.every(TICK_INTERVAL, trade_tick, start=t_start, until=t_sell)
+        scheduler.every(60 * 60, get_stock_balance, start=t_start, until=t_sell, align=True, offset=30 * 60) # 매시 30분 잔고 확인
+        if t_now < t_exit:
+            scheduler.at(t_sell, sell_all)
+        scheduler.at(t_exit, finish)
+        scheduler.run()
         
-except Exception as e:
-    send_message(f"[오류 발생]{e}")
-    time.sleep(1)
+    except Exception as e:
+        send_message(f"[오류 발생]{e}", level=logging.ERROR, exc_info=True)
+        time.sleep(1)
+    finally:
+        account_cache.stop()
+        if leader_lease:
+            leader_lease.release()
+        flush_minute_bars(nyse_symbol_list, amex_symbol_list)
+        flush_messages()
+
+if __name__ == "__main__":
+    main()
+    flush_logs()
@@ -0,0 +1,103 @@
+"""
+환율/주문가능금액 캐시
+
+- 값은 TTL 주기로 백그라운드 스레드에서 갱신하고, 조회는 항상 캐시된 값을 즉시 반환
+- 최초 조회 시에만 동기 조회
+- 주문 체결 시 invalidate() 로 즉시(또는 지연 후) 재조회
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CachedValue:
+    """TTL 기반 백그라운드 갱신 값"""
+
+    def __init__(self, name, fetch, ttl):
+        self.name = name
+        self.fetch = fetch
+        self.ttl = ttl
+        self.value = None
+        self.updated_at = 0.0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._trigger = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        """즉시 재조회 (실패 시 이전 값 유지)"""
+        try:
+            value = self.fetch()
+        except Exception as e:
+            self.last_error = e
+            logger.warning(f"⚠️ {self.name} 갱신 실패: {e}")
+            return self.value
+        with self._lock:
+            self.value = value
+            self.updated_at = time.time()
+            self.last_error = None
+        return value
+
+    def get(self):
+        """캐시된 값 반환 (값이 없을 때만 동기 조회)"""
+        if self.value is None:
+            return self.refresh()
+        return self.value
+
+    def age(self):
+        """마지막 갱신 후 경과 시간 (초)"""
+        return time.time() - self.updated_at if self.updated_at else None
+
+    def invalidate(self, delay=0):
+        """백그라운드 재조회 요청 (delay 초 후)"""
+        if delay > 0:
+            timer = threading.Timer(delay, self._trigger.set)
+            timer.daemon = True
+            timer.start()
+        else:
+            self._trigger.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._trigger.wait(self.ttl)
+            self._trigger.clear()
+            if not self._stopped.is_set():
+                self.refresh()
+
+    def start(self):
+        """백그라운드 갱신 시작"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"cache-{self.name}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._trigger.set()
+
+
+class AccountCache:
+    """주문가능 현금(원화)과 환율 캐시"""
+
+    def __init__(self, fetch_cash, fetch_exchange_rate, cash_ttl=60, exchange_rate_ttl=600):
+        self.cash = CachedValue('주문가능금액', fetch_cash, cash_ttl)
+        self.exchange_rate = CachedValue('환율', fetch_exchange_rate, exchange_rate_ttl)
+
+    def start(self):
+        self.cash.start()
+        self.exchange_rate.start()
+
+    def stop(self):
+        self.cash.stop()
+        self.exchange_rate.stop()
+
+    def buying_power_usd(self):
+        """주문가능 금액 (달러 환산)"""
+        return self.cash.get() / self.exchange_rate.get()
+
+    def on_order_filled(self):
+        """주문 체결 후 주문가능 금액 재조회 (잔고 반영 지연을 고려해 한 번 더 조회)"""
+        self.cash.invalidate()
+        self.cash.invalidate(delay=3)
@@ -0,0 +1,163 @@
+"""
+API 호출 시간 예산과 서킷 브레이커
+
+- 엔드포인트별 시간 예산(초)을 요청 timeout 으로 사용하고, 틱 마감 시각(deadline)을 넘지 않도록 줄임
+- 엔드포인트가 연속으로 실패하면 일정 시간 호출하지 않고 즉시 실패 (CircuitOpenError)
+  대기 시간이 지나면 한 번만 시험 호출해서 성공하면 정상 복귀, 실패하면 다시 차단
+- 실패하거나 차단된 호출은 fallback(캐시된 값)이 있으면 그 값을 사용
+- 틱 마감 시각은 스레드별로 적용되어, 시작 시 병렬 조회 등 다른 스레드의 호출에는 영향 없음
+- 틱 마감 때문에 줄어든 timeout 안에 끝나지 못한 호출은 API 장애가 아니므로 연속 실패로 세지 않음
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """서킷 브레이커가 열려 호출을 건너뜀"""
+
+
+class DeadlineExceeded(Exception):
+    """틱 마감 시각이 지나 호출을 시작하지 않음"""
+
+
+def parse_budgets(spec):
+    """'price=2,dailyprice=4' 형식 문자열을 {엔드포인트: 초} 로 변환"""
+    budgets = {}
+    for item in (spec or '').split(','):
+        if '=' in item:
+            name, seconds = item.split('=', 1)
+            budgets[name.strip()] = float(seconds)
+    return budgets
+
+
+class CircuitBreaker:
+    """엔드포인트 하나의 서킷 브레이커 (closed → open → half_open → closed)"""
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold  # 연속 실패 횟수 기준
+        self.reset_timeout = reset_timeout  # 차단 유지 시간 (초)
+        self.clock = clock
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """호출 가능 여부 (차단 시간이 지나면 시험 호출 한 번만 허용)"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                logger.info(f"✅ {self.name} API 정상 복귀", extra={'endpoint': self.name, 'event': 'circuit_closed'})
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+
+    def release(self):
+        """성공/실패로 판단하지 않은 호출 (시험 호출이었다면 다음 호출이 다시 시험)"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    logger.warning(f"⛔ {self.name} API 연속 실패 {self.failures}회, {self.reset_timeout:.0f}초간 호출 차단",
+                                   extra={'endpoint': self.name, 'event': 'circuit_opened'})
+                self.state = 'open'
+                self.opened_at = self.clock()
+
+
+class ApiGuard:
+    """엔드포인트별 시간 예산 + 서킷 브레이커"""
+
+    def __init__(self, budgets, default_budget=5.0, failure_threshold=3, reset_timeout=30.0, clock=time.monotonic):
+        self.budgets = dict(budgets)
+        self.default_budget = default_budget
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def breaker(self, endpoint):
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = self._breakers[endpoint] = CircuitBreaker(
+                    endpoint, self.failure_threshold, self.reset_timeout, self.clock)
+            return breaker
+
+    @contextmanager
+    def deadline(self, seconds):
+        """블록 안에서 이 스레드의 호출이 seconds 안에 끝나도록 timeout 제한 (중첩 시 더 이른 시각 적용)"""
+        previous = getattr(self._local, 'deadline', None)
+        expires = self.clock() + seconds
+        self._local.deadline = expires if previous is None else min(previous, expires)
+        try:
+            yield
+        finally:
+            self._local.deadline = previous
+
+    def remaining(self):
+        """현재 스레드의 마감까지 남은 시간 (마감 없으면 None)"""
+        deadline = getattr(self._local, 'deadline', None)
+        return None if deadline is None else deadline - self.clock()
+
+    def timeout(self, endpoint):
+        """엔드포인트 시간 예산과 남은 시간 중 작은 값 (마감이 지났으면 DeadlineExceeded)"""
+        budget = self.budgets.get(endpoint, self.default_budget)
+        remaining = self.remaining()
+        if remaining is None:
+            return budget
+        if remaining <= 0:
+            raise DeadlineExceeded(f"{endpoint}: 틱 마감 시각 초과")
+        return min(budget, remaining)
+
+    def call(self, endpoint, request, fallback=None):
+        """request(timeout) 호출, 실패/차단 시 fallback() 값 사용 (fallback 이 없거나 None 을 반환하면 예외 전달)"""
+        timeout = self.timeout(endpoint)
+        clipped = timeout < self.budgets.get(endpoint, self.default_budget)  # 틱 마감 때문에 줄어든 timeout
+        breaker = self.breaker(endpoint)
+        if not breaker.allow():
+            cached = fallback() if fallback else None
+            if cached is None:
+                raise CircuitOpenError(f"{endpoint}: API 호출 차단 중")
+            return cached
+        started = self.clock()
+        try:
+            result = request(timeout)
+        except Exception as e:
+            if isinstance(e, DeadlineExceeded) or (clipped and self.clock() - started >= timeout):
+                breaker.release()
+            else:
+                breaker.record_failure()
+            cached = fallback() if fallback else None
+            if cached is None:
+                raise
+            return cached
+        breaker.record_success()
+        return result
+
+    def status(self):
+        """엔드포인트별 서킷 상태 {엔드포인트: 'closed'|'open'|'half_open'}"""
+        with self._lock:
+            return {name: breaker.state for name, breaker in self._breakers.items()}
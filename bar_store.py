@@ -0,0 +1,265 @@
+"""
+일봉 데이터 저장소
+
+- 종목별 일봉을 .npy 파일(구조화 배열)로 저장하고 메모리 맵으로 읽음
+- 마지막 저장일 이후의 일봉만 받아서 병합 (하루 한 번, 종목당 요청 1회)
+- 받은 뒤에도 당일 일봉이 아직 없으면(장 시작 전, 거래 없는 종목) BAR_SYNC_INTERVAL 동안은 다시 받지 않음
+- 전략/스크리닝/백테스트 코드는 load() 로 디스크에서 바로 조회
+- 일봉은 받은 날 기준 수정주가로 저장하고, 이후 분할/병합 등으로 수정주가가 바뀌면
+  다시 받은 일봉과 겹치는 일봉을 비교해 조정 배율만 색인(adjustments.json)에 기록,
+  조회 시 이전 일봉에 배율을 곱해 최신 수정주가 기준으로 맞춤 (전체 기간을 다시 받지 않음)
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+BAR_STORE_DIR = os.getenv('BAR_STORE_DIR', os.path.join('data', 'bars'))
+# 겹치는 일봉의 가격 비율이 이 이상 차이 나면 수정주가 조정으로 판단 (가격 반올림 오차보다 크게)
+ADJUSTMENT_TOLERANCE = float(os.getenv('ADJUSTMENT_TOLERANCE', 0.001))
+# 받은 뒤에도 요청한 일자의 일봉이 없을 때 다시 받기까지의 최소 간격 (초)
+BAR_SYNC_INTERVAL = float(os.getenv('BAR_SYNC_INTERVAL', 600))
+
+logger = logging.getLogger(__name__)
+
+# 일자(YYYYMMDD), 시가, 고가, 저가, 종가, 거래량
+BAR_DTYPE = np.dtype([
+    ('date', '<i4'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+
+
+def make_bars(rows):
+    """(일자, 시가, 고가, 저가, 종가, 거래량) 목록을 일자 오름차순 배열로 변환"""
+    bars = np.array([tuple(row) for row in rows], dtype=BAR_DTYPE)
+    return np.sort(bars, order='date')
+
+
+class AdjustmentIndex:
+    """종목별 수정주가 조정 이력 {"거래소/종목코드": [[기준일, 배율], ...]}
+
+    기준일 이전 일봉의 가격에 배율을 곱하면 기준일 이후 일봉과 같은 수정주가 기준이 됨
+    (종목이 색인에 있으면 저장된 일봉이 수정주가 기준이라는 뜻, 조정 이력은 없을 수 있음)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._events = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._events is None:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    self._events = json.load(f)
+            except FileNotFoundError:
+                self._events = {}
+        return self._events
+
+    def known(self, market, symbol):
+        with self._lock:
+            return f"{market}/{symbol}" in self._load()
+
+    def events(self, market, symbol):
+        """조정 이력 [(기준일, 배율)] (기준일 오름차순)"""
+        with self._lock:
+            return [tuple(event) for event in self._load().get(f"{market}/{symbol}", [])]
+
+    def add(self, market, symbol, date=None, factor=None):
+        """조정 이력 추가 (date 없이 호출하면 수정주가 기준으로 저장된 종목으로만 등록, 이미 있는 기준일이면 무시)"""
+        with self._lock:
+            events = self._load().setdefault(f"{market}/{symbol}", [])
+            if date is not None:
+                if any(event[0] == int(date) for event in events):
+                    return False
+                events.append([int(date), float(factor)])
+                events.sort()
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._events, f)
+            os.replace(tmp_path, self.path)
+            return True
+
+
+class BarStore:
+    """종목별 일봉 저장소"""
+
+    def __init__(self, root=None):
+        self.root = root or BAR_STORE_DIR
+        self._cache = {}  # {경로: (수정시각, 배열)}
+        self._lock = threading.Lock()
+        self._synced = {}  # {(거래소, 종목): (through_date, 마지막으로 받은 시각)}
+        self._reconciled = {}  # {(거래소, 종목): 조정 여부를 비교한 마지막 겹침 일자}
+        self.adjustments = AdjustmentIndex(os.path.join(self.root, 'adjustments.json'))
+
+    def _path(self, market, symbol):
+        return os.path.join(self.root, market, f"{symbol}.npy")
+
+    def load(self, market, symbol, start=None, end=None, adjusted=True):
+        """일봉 조회 (일자 오름차순, 읽기 전용). start/end 는 YYYYMMDD 정수
+
+        adjusted=True 면 조정 이력을 반영한 최신 수정주가 기준, False 면 저장된 그대로
+        """
+        path = self._path(market, symbol)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return np.empty(0, dtype=BAR_DTYPE)
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, np.load(path, mmap_mode='r'))
+                self._cache[path] = cached
+        bars = cached[1]
+        if start is not None or end is not None:
+            dates = bars['date']
+            lo = 0 if start is None else np.searchsorted(dates, start, side='left')
+            hi = len(bars) if end is None else np.searchsorted(dates, end, side='right')
+            bars = bars[lo:hi]
+        return self._adjust(market, symbol, bars) if adjusted else bars
+
+    def _adjust(self, market, symbol, bars):
+        """기준일 이전 일봉의 가격에 이후 조정 배율의 곱을 곱하고 거래량은 나눔"""
+        events = self.adjustments.events(market, symbol)
+        if not events or len(bars) == 0 or bars['date'][0] >= events[-1][0]:
+            return bars
+        dates = np.array([date for date, _ in events])
+        factors = np.array([factor for _, factor in events])
+        # scale[i] = i 번째 이후 조정 배율의 곱 (마지막 기준일 이후 일봉은 1)
+        scale = np.append(np.cumprod(factors[::-1])[::-1], 1.0)[np.searchsorted(dates, bars['date'], side='right')]
+        adjusted = np.array(bars)
+        for name in ('open', 'high', 'low', 'close'):
+            adjusted[name] *= scale
+        adjusted['volume'] /= scale
+        adjusted.flags.writeable = False
+        return adjusted
+
+    def last_date(self, market, symbol):
+        """마지막 저장 일자 (없으면 None)"""
+        bars = self.load(market, symbol, adjusted=False)
+        return int(bars['date'][-1]) if len(bars) else None
+
+    def _write(self, market, symbol, bars):
+        path = self._path(market, symbol)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.npy"
+        np.save(tmp_path, bars)
+        os.replace(tmp_path, path)
+
+    def upsert(self, market, symbol, bars):
+        """일봉 병합 저장 (같은 일자는 새 데이터로 교체), 추가/변경된 일봉 수 반환"""
+        if len(bars) == 0:
+            return 0
+        bars = np.sort(np.asarray(bars, dtype=BAR_DTYPE), order='date')
+        existing = self.load(market, symbol, adjusted=False)
+        keep = existing[~np.isin(existing['date'], bars['date'])]
+        merged = np.sort(np.concatenate([keep, bars]), order='date')
+        self._write(market, symbol, merged)
+        return len(merged) - len(keep)
+
+    def _reconcile(self, market, symbol, page, date):
+        """저장된 date 일봉과 다시 받은 일봉의 종가를 비교해 그 사이 수정주가 조정이 있었으면 색인에 기록
+
+        같은 겹침 일자는 한 번만 비교 (당일 일봉이 생기기 전에 다시 받아도 조정 배율을 중복 기록하지 않음)
+        """
+        if self._reconciled.get((market, symbol)) == date:
+            return
+        stored = self.load(market, symbol, start=date, end=date, adjusted=False)
+        fetched = page[page['date'] == date]
+        if len(stored) == 0 or len(fetched) == 0 or stored['close'][0] <= 0 or fetched['close'][0] <= 0:
+            return
+        self._reconciled[(market, symbol)] = date
+        factor = float(fetched['close'][0] / stored['close'][0])
+        if abs(factor - 1) > ADJUSTMENT_TOLERANCE and self.adjustments.add(market, symbol, date, factor):
+            logger.info(f"📐 {symbol} 수정주가 조정 반영: {date} 이전 일봉 x{factor:.6g}",
+                        extra={'event': 'price_adjustment', 'symbol': symbol, 'date': date, 'factor': factor})
+
+    def _minute_path(self, market, symbol, session_date):
+        return os.path.join(self.root, 'minute', market, symbol, f"{session_date}.npy")
+
+    def save_minute_bars(self, market, symbol, session_date, bars):
+        """장중 분봉을 거래일 단위 파일로 저장 (같은 거래일은 병합)"""
+        if len(bars) == 0:
+            return 0
+        path = self._minute_path(market, symbol, session_date)
+        existing = self.load_minute_bars(market, symbol, session_date)
+        if len(existing):
+            existing = existing[~np.isin(existing['minute'], bars['minute'])]
+            bars = np.sort(np.concatenate([existing, bars]), order='minute')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.npy"
+        np.save(tmp_path, bars)
+        os.replace(tmp_path, path)
+        return len(bars)
+
+    def load_minute_bars(self, market, symbol, session_date):
+        """저장된 장중 분봉 조회 (없으면 빈 배열)"""
+        path = self._minute_path(market, symbol, session_date)
+        try:
+            return np.load(path, mmap_mode='r')
+        except FileNotFoundError:
+            return np.empty(0)
+
+    def _recently_synced(self, market, symbol, through_date, refresh_after):
+        """같은 through_date 로 BAR_SYNC_INTERVAL 이내에 받았고, 그 뒤 refresh_after(장 시작 등)가 지나지 않았으면 True"""
+        with self._lock:
+            synced = self._synced.get((market, symbol))
+        if synced is None or synced[0] != through_date:
+            return False
+        now = time.time()
+        if refresh_after is not None and synced[1] < refresh_after <= now:
+            return False
+        return now - synced[1] < BAR_SYNC_INTERVAL
+
+    def _mark_synced(self, market, symbol, through_date):
+        with self._lock:
+            self._synced[(market, symbol)] = (through_date, time.time())
+
+    def sync(self, market, symbol, fetch, through_date, max_pages=5, refresh_after=None):
+        """through_date(YYYYMMDD)까지의 일봉이 없으면 새 일봉만 받아서 병합
+
+        fetch(bymd) 는 bymd 일자('' 이면 최근) 이전의 수정주가 일봉 배열을 반환
+        이미 저장된 구간과 겹칠 때까지만 과거로 페이지를 넘겨 조회
+        refresh_after(epoch 초)는 새 일봉이 생기는 시각(장 시작)으로, 그 전에 받은 결과는 이후 재사용하지 않음
+        """
+        stored = self.load(market, symbol, adjusted=False)
+        last = int(stored['date'][-1]) if len(stored) else None
+        if last is None or not self.adjustments.known(market, symbol):
+            # 처음 받는 종목과 수정주가 색인 이전에 저장된 종목은 최근 한 페이지를 새로 받아 교체
+            page = fetch('')
+            self._mark_synced(market, symbol, through_date)
+            if len(page) == 0:
+                return 0
+            self._write(market, symbol, np.sort(np.asarray(page, dtype=BAR_DTYPE), order='date'))
+            self.adjustments.add(market, symbol)
+            return len(page)
+        if last >= through_date or self._recently_synced(market, symbol, through_date, refresh_after):
+            return 0
+        self._mark_synced(market, symbol, through_date)
+
+        # 마지막 저장일 당일은 장중 값일 수 있으므로 다시 받은 값으로 교체하고,
+        # 완성된 일봉인 그 전 거래일(저장된 일봉이 하나면 마지막 저장일)부터 겹쳐 받아 조정 여부 비교
+        overlap = int(stored['date'][-2]) if len(stored) > 1 else last
+        added = 0
+        bymd = ''
+        for _ in range(max_pages):
+            page = fetch(bymd)
+            if len(page) == 0:
+                break
+            page = page[page['date'] >= overlap]
+            self._reconcile(market, symbol, page, overlap)
+            added += self.upsert(market, symbol, page)
+            oldest = str(page['date'].min()) if len(page) else None
+            # 저장 구간과 겹치면 종료
+            if oldest is None or int(oldest) <= overlap or oldest == bymd:
+                break
+            bymd = oldest
+        return added
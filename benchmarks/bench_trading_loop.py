@@ -0,0 +1,313 @@
+"""
+미국 주식 매매 루프 벤치마크
+
+모의 KIS 서버(mock_kis.py)를 띄운 뒤 UsaStockAutoTrade 를 그대로 불러와 측정
+- pass: 실제 main() 일정으로 매수/위험관리 1회(trade_tick)당 소요 시간과 API 호출 수
+- quote_fanout: 종목 수(15/100/1000)별 현재가 조회 소요 시간
+- risk_check: 보유 종목 1개당 위험관리 검사 비용
+- order: 매수/매도 주문 1건의 집행 소요 시간과 API 호출 수
+- memory: 하루(390분) 분량 조회를 흉내 냈을 때 메모리 증가량
+
+사용법:
+    python benchmarks/bench_trading_loop.py --output bench.json
+    python benchmarks/bench_trading_loop.py --compare old.json new.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_kis import MockKisServer  # noqa: E402
+
+
+def _stats(samples):
+    """소요 시간 목록(초) 요약 (밀리초)"""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    return {
+        'count': len(samples),
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'p50_ms': ordered[len(ordered) // 2] * 1000,
+        'p95_ms': ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000,
+        'max_ms': ordered[-1] * 1000,
+    }
+
+
+def _call_delta(before, after):
+    return {path: after.get(path, 0) - before.get(path, 0)
+            for path in after if after.get(path, 0) != before.get(path, 0)}
+
+
+def _version():
+    if os.getenv('APP_VERSION'):
+        return os.getenv('APP_VERSION')
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def load_trader(server, workdir):
+    """모의 서버를 바라보도록 환경변수를 설정하고 매매 모듈 로드"""
+    os.environ.update({
+        'APP_KEY': 'M' * 36,
+        'APP_SECRET': 'S' * 180,
+        'CANO': '12345678',
+        'ACNT_PRDT_CD': '01',
+        'URL_BASE': server.url,
+        'TOKEN_CACHE_PATH': os.path.join(workdir, 'token.json'),
+        'STATE_DB_PATH': os.path.join(workdir, 'state.db'),
+        'BAR_STORE_DIR': os.path.join(workdir, 'bars'),
+        'EXECUTION_LOG_PATH': os.path.join(workdir, 'executions.jsonl'),
+        'STARTUP_METRICS_PATH': os.path.join(workdir, 'startup_metrics.json'),
+        'ORDER_TIMEOUT': '0',
+    })
+    os.environ.pop('DISCORD_WEBHOOK_URL', None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import UsaStockAutoTrade as trader
+        trader.ACCESS_TOKEN = trader.get_access_token(use_cache=False)
+    return trader
+
+
+def bench_quote_fanout(trader, server, sizes):
+    results = {}
+    for size in sizes:
+        symbols = [f"S{i:04d}" for i in range(size)]
+        trader.get_current_price('NAS', symbols[0])  # 연결 준비
+        server.state.reset()
+        started = time.perf_counter()
+        for sym in symbols:
+            trader.get_current_price('NAS', sym)
+        elapsed = time.perf_counter() - started
+        results[str(size)] = {
+            'total_ms': elapsed * 1000,
+            'per_symbol_ms': elapsed / size * 1000,
+            'calls': sum(server.state.calls().values()),
+        }
+    return results
+
+
+def bench_risk_check(trader, server, positions, rounds):
+    results = {}
+    server.state.volatility = 0.0  # 손절/익절이 발생하지 않도록 가격 고정
+    for count in positions:
+        symbols = [f"R{i:04d}" for i in range(count)]
+        stock_dict = {}
+        for sym in symbols:
+            price = trader.get_current_price('NAS', sym)
+            trader.buy_prices[sym] = price
+            trader.trailing_stops[sym] = price
+            stock_dict[sym] = '1'
+        samples = []
+        server.state.reset()
+        for _ in range(rounds):
+            started = time.perf_counter()
+            trader.check_positions_for_risk_management(stock_dict, list(symbols), symbols, [], [])
+            samples.append(time.perf_counter() - started)
+        summary = _stats(samples)
+        summary['per_position_ms'] = summary['mean_ms'] / count
+        summary['calls_per_position'] = sum(server.state.calls().values()) / rounds / count
+        results[str(count)] = summary
+        for sym in symbols:
+            trader.buy_prices.pop(sym, None)
+            trader.trailing_stops.pop(sym, None)
+    server.state.volatility = 0.002
+    return results
+
+
+def bench_orders(trader, server, count):
+    results = {}
+    for side in ('buy', 'sell'):
+        samples, calls = [], []
+        for i in range(count):
+            sym = f"O{i:04d}"
+            price = trader.get_current_price('NAS', sym)
+            before = server.state.calls()
+            started = time.perf_counter()
+            if side == 'buy':
+                trader.buy(market='NASD', code=sym, qty=1, price=price)
+            else:
+                trader.sell(market='NASD', code=sym, qty=1, price=price)
+            samples.append(time.perf_counter() - started)
+            calls.append(sum(_call_delta(before, server.state.calls()).values()))
+        results[side] = _stats(samples)
+        results[side]['calls_per_order'] = statistics.fmean(calls)
+    return results
+
+
+def bench_passes(trader, server, duration, tick_interval):
+    """실제 main() 을 짧은 가상 거래일로 실행하면서 trade_tick 1회씩 측정"""
+    from market_calendar import US_TZ, TradingSession
+
+    now = trader.datetime.datetime.now(US_TZ)
+    delta = trader.datetime.timedelta
+    session = TradingSession(now.date(), now - delta(minutes=10), now, now + delta(seconds=duration),
+                             now + delta(seconds=duration + 1), now + delta(seconds=duration + 2))
+    trader.us_calendar.today_session = lambda *args: session
+    trader.us_calendar.is_open = lambda *args: True
+    trader.TICK_INTERVAL = tick_interval
+
+    samples, calls = [], []
+    base = trader.EventScheduler
+
+    class TimedScheduler(base):
+        def every(self, interval, callback, *args, **kwargs):
+            if getattr(callback, '__name__', '') == 'trade_tick':
+                inner = callback
+
+                def callback():
+                    before = server.state.calls()
+                    started = time.perf_counter()
+                    inner()
+                    samples.append(time.perf_counter() - started)
+                    calls.append(_call_delta(before, server.state.calls()))
+                callback.__name__ = 'trade_tick'
+            return super().every(interval, callback, *args, **kwargs)
+
+    trader.EventScheduler = TimedScheduler
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            trader.main()
+    finally:
+        trader.EventScheduler = base
+        trader.account_cache.stop()
+
+    per_endpoint = {}
+    for delta_calls in calls:
+        for path, n in delta_calls.items():
+            per_endpoint[path] = per_endpoint.get(path, 0) + n
+    result = _stats(samples)
+    result['calls_per_pass'] = statistics.fmean(sum(c.values()) for c in calls) if calls else 0
+    result['calls_per_pass_by_endpoint'] = {path: n / len(calls) for path, n in sorted(per_endpoint.items())}
+    return result
+
+
+def bench_memory(trader, symbols, passes, tick_interval):
+    """하루 분량 조회 동안의 파이썬 힙 증가량 (분봉 집계 시각은 가상 시계 사용)"""
+    import intraday_bars
+
+    clock = [time.time()]
+    real_time = intraday_bars.time
+    intraday_bars.time = types.SimpleNamespace(time=lambda: clock[0])
+    try:
+        for sym in symbols:
+            trader.get_current_price('NAS', sym)
+        tracemalloc.start()
+        start_current, _ = tracemalloc.get_traced_memory()
+        checkpoints = []
+        for i in range(passes):
+            for sym in symbols:
+                trader.get_current_price('NAS', sym)
+            clock[0] += tick_interval
+            if (i + 1) % max(passes // 10, 1) == 0:
+                checkpoints.append(tracemalloc.get_traced_memory()[0] - start_current)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        intraday_bars.time = real_time
+    return {
+        'passes': passes,
+        'symbols': len(symbols),
+        'growth_bytes': current - start_current,
+        'peak_bytes': peak - start_current,
+        'checkpoints_bytes': checkpoints,
+    }
+
+
+def run(args):
+    server = MockKisServer(latency=args.latency_ms / 1000).start()
+    with tempfile.TemporaryDirectory() as workdir:
+        trader = load_trader(server, workdir)
+        watchlist = [f"W{i:04d}" for i in range(15)]
+        results = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            results['quote_fanout'] = bench_quote_fanout(trader, server, args.fanout)
+            results['risk_check'] = bench_risk_check(trader, server, args.positions, args.rounds)
+            results['order'] = bench_orders(trader, server, args.orders)
+            results['memory'] = bench_memory(trader, watchlist, args.day_passes, args.tick_interval)
+        results['pass'] = bench_passes(trader, server, args.duration, args.pass_interval)
+    server.stop()
+    return {
+        'version': _version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'latency_ms': args.latency_ms,
+            'fanout': args.fanout,
+            'positions': args.positions,
+            'rounds': args.rounds,
+            'orders': args.orders,
+            'day_passes': args.day_passes,
+            'duration': args.duration,
+        },
+        'results': results,
+    }
+
+
+def _flatten(data, prefix=''):
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old_path, new_path):
+    """두 결과 파일의 지표 비교 (변화율 출력)"""
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    old_flat, new_flat = _flatten(old['results']), _flatten(new['results'])
+    print(f"{old['version']} -> {new['version']}")
+    for name in sorted(set(old_flat) & set(new_flat)):
+        before, after = old_flat[name], new_flat[name]
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"{name:60s} {before:14.3f} {after:14.3f} {change:+8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="미국 주식 매매 루프 벤치마크")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="모의 서버 응답 지연")
+    parser.add_argument('--fanout', type=int, nargs='+', default=[15, 100, 1000])
+    parser.add_argument('--positions', type=int, nargs='+', default=[1, 4, 20])
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--orders', type=int, default=5)
+    parser.add_argument('--day-passes', type=int, default=2340, help="하루 분량 조회 횟수 (390분, 10초 주기)")
+    parser.add_argument('--tick-interval', type=float, default=10.0)
+    parser.add_argument('--duration', type=float, default=15.0, help="main() 가상 거래 시간 (초)")
+    parser.add_argument('--pass-interval', type=float, default=0.5, help="main() 실행 시 trade_tick 주기 (초)")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    report = run(args)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps(report['results'], indent=2, ensure_ascii=False))
+    print(f"결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
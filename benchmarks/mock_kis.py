@@ -0,0 +1,186 @@
+"""
+벤치마크용 한국투자증권 OpenAPI 모의 서버
+
+- 토큰/해시키/해외 현재가/일봉/주문/정정취소/체결조회/잔고/주문가능금액/환율 API 응답을 흉내냄
+- 시세는 종목별로 고정 시드 랜덤워크라 실행할 때마다 같은 순서로 움직임
+- 주문은 지정가에 즉시 전량 체결되고, 보유 잔고에 반영됨
+- 경로별 호출 수를 기록 (calls(), reset())
+"""
+import datetime
+import json
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from pytz import timezone
+
+
+class MockKisState:
+    """모의 서버 상태 (시세, 주문, 잔고, 호출 수)"""
+
+    def __init__(self, seed=0, latency=0.0, start_price=100.0, volatility=0.002):
+        self.seed = seed
+        self.latency = latency  # 응답 지연 (초)
+        self.start_price = start_price
+        self.volatility = volatility  # 조회 1회당 가격 변동 표준편차
+        self.prices = {}
+        self.rngs = {}
+        self.orders = {}  # {주문번호: {'code', 'side', 'qty', 'price', 'filled'}}
+        self.holdings = Counter()
+        self.counts = Counter()
+        self._order_no = 0
+        self._lock = threading.Lock()
+
+    def price(self, code):
+        """종목별 랜덤워크 다음 가격"""
+        with self._lock:
+            if code not in self.rngs:
+                self.rngs[code] = random.Random(zlib.crc32(f"{self.seed}:{code}".encode()))
+                self.prices[code] = self.start_price
+            self.prices[code] *= 1 + self.rngs[code].gauss(0.0005, self.volatility)
+            return round(self.prices[code], 2)
+
+    def place(self, code, side, qty, price):
+        with self._lock:
+            self._order_no += 1
+            order_no = f"{self._order_no:010d}"
+            self.orders[order_no] = {'code': code, 'side': side, 'qty': qty, 'price': price, 'filled': qty}
+            self.holdings[code] += qty if side == 'buy' else -qty
+            return order_no
+
+    def calls(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+
+
+def _daily_bars(code, days=120):
+    """오늘(뉴욕)부터 과거 평일 일봉 (최근일 순)"""
+    rng = random.Random(zlib.crc32(code.encode()))
+    today = datetime.datetime.now(timezone('America/New_York')).date()
+    bars, day, price = [], today, 100.0
+    while len(bars) < days:
+        if day.weekday() < 5:
+            high, low = price * (1 + rng.uniform(0, 0.02)), price * (1 - rng.uniform(0, 0.02))
+            bars.append({'xymd': day.strftime('%Y%m%d'), 'open': f"{price:.2f}", 'high': f"{high:.2f}",
+                         'low': f"{low:.2f}", 'clos': f"{price:.2f}", 'tvol': str(rng.randint(10 ** 5, 10 ** 7))})
+            price /= 1 + rng.gauss(0, 0.015)
+        day -= datetime.timedelta(days=1)
+    return bars
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True  # 헤더/본문을 나눠 보낼 때 지연 ACK 대기 방지
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, method):
+        state = self.server.state
+        url = urlparse(self.path)
+        path = url.path.rstrip('/')
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        body = {}
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        with state._lock:
+            state.counts[path] += 1
+        if state.latency:
+            time.sleep(state.latency)
+        self._reply(self._route(state, path, params, body))
+
+    def _route(self, state, path, params, body):
+        if path.endswith('/oauth2/tokenP'):
+            return {'access_token': 'mock-token', 'expires_in': 86400}
+        if path.endswith('/uapi/hashkey'):
+            return {'HASH': 'mock-hash'}
+        if path.endswith('/quotations/price'):
+            return {'rt_cd': '0', 'output': {'last': f"{state.price(params['SYMB']):.2f}", 'tvol': '1000000'}}
+        if path.endswith('/quotations/dailyprice'):
+            return {'rt_cd': '0', 'output2': [] if params.get('BYMD') else _daily_bars(params['SYMB'])}
+        if path.endswith('/trading/order'):
+            side = 'buy' if self.headers.get('tr_id') == 'TTTT1002U' else 'sell'
+            order_no = state.place(body['PDNO'], side, int(body['ORD_QTY']), float(body['OVRS_ORD_UNPR']))
+            return {'rt_cd': '0', 'msg1': '주문 전송 완료', 'output': {'ODNO': order_no}}
+        if path.endswith('/trading/order-rvsecncl'):
+            return {'rt_cd': '0', 'msg1': '정정/취소 완료', 'output': {'ODNO': body['ORGN_ODNO']}}
+        if path.endswith('/trading/inquire-ccnl'):
+            with state._lock:
+                orders = [{'odno': no, 'ft_ccld_qty': str(o['filled']), 'ft_ccld_unpr3': f"{o['price']:.2f}"}
+                          for no, o in state.orders.items() if o['code'] == params.get('PDNO')]
+            return {'rt_cd': '0', 'output': orders}
+        if path.endswith('/trading/inquire-balance'):
+            with state._lock:
+                holdings = [(code, qty) for code, qty in state.holdings.items() if qty > 0]
+            return {'rt_cd': '0', 'output1': [{'ovrs_pdno': code, 'ovrs_item_name': code, 'ovrs_cblc_qty': str(qty)}
+                                              for code, qty in holdings],
+                    'output2': {'tot_evlu_pfls_amt': '0', 'ovrs_tot_pfls': '0'}}
+        if path.endswith('/trading/inquire-psbl-order'):
+            return {'rt_cd': '0', 'output': {'ord_psbl_cash': '100000000'}}
+        if path.endswith('/trading/inquire-present-balance'):
+            return {'rt_cd': '0', 'output2': [{'frst_bltn_exrt': '1350.0'}]}
+        return {'rt_cd': '1', 'msg1': f'unknown path {path}'}
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+
+class MockKisServer:
+    """백그라운드 스레드에서 동작하는 모의 서버"""
+
+    def __init__(self, host='127.0.0.1', port=0, **state_kwargs):
+        self.state = MockKisState(**state_kwargs)
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='mock-kis', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="한국투자증권 OpenAPI 모의 서버")
+    parser.add_argument('--port', type=int, default=9443)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    args = parser.parse_args()
+    server = MockKisServer(port=args.port, latency=args.latency_ms / 1000).start()
+    print(f"모의 서버 실행 중: {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
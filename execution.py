@@ -0,0 +1,267 @@
+"""
+주문 집행
+
+- 시장성 지정가(marketable limit): 기준가에 offset 을 더한(매도는 뺀) 지정가로 즉시 체결 유도
+- 지정가(limit): 기준가로 주문 후 timeout 동안 체결 대기, 미체결 잔량은 정정 없이 취소
+- 정정(cancel/replace): 미체결 잔량을 최신 시세 + 점점 넓어지는 offset 으로 정정 주문 (시장성 지정가만)
+- 한 주문의 집행 시간은 max_time 으로 제한 (매매 틱이 주문 하나에 오래 묶이지 않도록)
+- 체결 조회/정정 중 오류가 나면 잔량 취소 후 다시 조회, 그래도 확인하지 못한 주문은
+  report.open_orders 에 남기고 resolve() 로 다시 확인
+- 매매 판단 시점 가격 대비 평균 체결가의 슬리피지를 기록해 집행 품질을 확인
+- 집행 기록은 거래일별 파일(executions_YYYYMMDD.jsonl)에 추가 (장 마감 분석이 전체 이력을 읽지 않도록)
+
+실제 주문/정정/취소/체결조회 API 호출은 생성 시 넘겨받은 함수로 수행하므로 시장과 무관하게 사용
+"""
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+
+EXECUTION_LOG_PATH = os.getenv('EXECUTION_LOG_PATH', 'executions.jsonl')
+
+ORDER_MODES = ('marketable', 'limit')
+
+
+def session_log_path(path, session_date):
+    """거래일별 집행 기록 파일 경로 (executions.jsonl -> executions_20260102.jsonl)"""
+    root, ext = os.path.splitext(path)
+    return f"{root}_{session_date}{ext}"
+
+
+@dataclass
+class ExecutionReport:
+    """주문 집행 결과"""
+    code: str
+    side: str  # 'buy' 또는 'sell'
+    qty: int  # 주문 수량
+    decision_price: float  # 매매 판단 시점 가격
+    mode: str
+    filled_qty: int = 0
+    avg_price: float = 0.0
+    orders: int = 0  # 신규 + 정정 주문 횟수
+    elapsed: float = 0.0  # 주문 ~ 종료 (초)
+    order_no: str = ''
+    reason: str = ''  # 매매 사유 (entry, stop_loss, trailing_stop, take_profit, close 등)
+    trigger_price: float = 0.0  # 매매 기준가 (매수 목표가, 손절가 등, 없으면 0)
+    open_orders: list = field(default_factory=list)  # 체결 수량을 확정하지 못한 주문 [{'order_no', 'qty', 'replaced'}]
+    error: str = ''  # 집행 중 마지막 오류
+    timestamp: float = field(default_factory=time.time)
+
+    @property
+    def filled(self):
+        return self.filled_qty > 0
+
+    @property
+    def resolved(self):
+        """모든 주문의 체결 수량 확정 여부 (False 면 미체결 주문이 남았을 수 있음)"""
+        return not self.open_orders
+
+    def add_fill(self, qty, avg_price):
+        value = self.filled_qty * self.avg_price + qty * avg_price
+        self.filled_qty += qty
+        self.avg_price = value / self.filled_qty if self.filled_qty else 0.0
+
+    @property
+    def slippage_bps(self):
+        """판단 가격 대비 불리하게 체결된 정도 (bp, 양수면 손해)"""
+        if not self.filled or self.decision_price <= 0:
+            return None
+        diff = self.avg_price - self.decision_price
+        if self.side == 'sell':
+            diff = -diff
+        return diff / self.decision_price * 10000
+
+    def to_dict(self):
+        data = asdict(self)
+        data['slippage_bps'] = self.slippage_bps
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{key: value for key, value in data.items() if key != 'slippage_bps'})
+
+
+def tick_size(price):
+    """미국 주식 호가 단위 ($1 미만은 0.0001, 이상은 0.01)"""
+    return 0.0001 if price < 1 else 0.01
+
+
+def limit_price(side, reference, offset_bps=0.0):
+    """기준가에 offset 을 적용한 지정가 (매수는 호가 단위 올림, 매도는 내림)"""
+    tick = tick_size(reference)
+    if side == 'buy':
+        return round(math.ceil(reference * (1 + offset_bps / 10000) / tick - 1e-9) * tick, 4)
+    return round(math.floor(reference * (1 - offset_bps / 10000) / tick + 1e-9) * tick, 4)
+
+
+class OrderExecutor:
+    """지정가/시장성 지정가 주문 집행기
+
+    place(side, code, qty, price) -> 주문번호 (실패 시 None)
+    replace(order_no, code, qty, price) -> 정정 주문번호 (실패 시 None)
+    cancel(order_no, code, qty) -> 성공 여부
+    query_fill(order_no, code) -> (누적 체결 수량, 평균 체결가)
+    quote(code) -> 최신 시세 (정정 시 기준가, 없으면 판단 가격 사용)
+    """
+
+    def __init__(self, place, replace, cancel, query_fill, quote=None, mode='marketable',
+                 offset_bps=20.0, timeout=2.0, max_reprices=2, poll_interval=0.5, max_time=6.0,
+                 sleep=time.sleep, clock=time.monotonic):
+        if mode not in ORDER_MODES:
+            raise ValueError(f"지원하지 않는 주문 방식입니다: {mode}")
+        self.place = place
+        self.replace = replace
+        self.cancel = cancel
+        self.query_fill = query_fill
+        self.quote = quote
+        self.mode = mode
+        self.offset_bps = offset_bps
+        self.timeout = timeout
+        self.max_reprices = max_reprices
+        self.poll_interval = poll_interval
+        self.max_time = max_time  # 주문 하나의 전체 집행 시간 상한 (초, None 이면 제한 없음)
+        self.sleep = sleep
+        self.clock = clock
+
+    def _offset(self, attempt):
+        """정정할수록 offset 을 넓혀 체결 가능성을 높임 (지정가 모드의 첫 주문은 offset 없음)"""
+        if self.mode == 'limit':
+            return self.offset_bps * attempt
+        return self.offset_bps * (attempt + 1)
+
+    def _wait_fill(self, order_no, code, qty, deadline):
+        """timeout 동안(전체 집행 시간 상한 이내) 체결 조회, (누적 체결 수량, 평균 체결가) 반환"""
+        deadline = min(self.clock() + self.timeout, deadline)
+        while True:
+            self.sleep(self.poll_interval)
+            filled, avg_price = self.query_fill(order_no, code)
+            if filled >= qty or self.clock() >= deadline:
+                return filled, avg_price
+
+    def execute(self, side, code, qty, decision_price, reason='', trigger_price=0.0):
+        """주문 집행 후 ExecutionReport 반환 (미체결 잔량은 취소, 확정하지 못한 주문은 report.open_orders)"""
+        qty = int(qty)
+        report = ExecutionReport(code=code, side=side, qty=qty, decision_price=float(decision_price), mode=self.mode,
+                                 reason=reason, trigger_price=float(trigger_price or 0.0))
+        started = self.clock()
+        deadline = started + self.max_time if self.max_time else float('inf')
+        reference = float(decision_price)
+        order_no = self.place(side, code, qty, limit_price(side, reference, self._offset(0)))
+        if not order_no:
+            report.elapsed = self.clock() - started
+            return report
+        report.orders = 1
+        report.order_no = str(order_no)
+        order = {'order_no': order_no, 'qty': qty, 'replaced': False}
+        report.open_orders.append(order)
+
+        try:
+            for attempt in range(self.max_reprices + 1):
+                filled, avg_price = self._wait_fill(order['order_no'], code, order['qty'], deadline)
+                if filled >= order['qty']:
+                    report.add_fill(filled, avg_price)
+                    report.open_orders.remove(order)
+                    break
+                # 지정가 모드는 정정하지 않고, 정정 횟수/집행 시간을 다 쓰면 잔량 취소
+                if self.mode == 'limit' or attempt == self.max_reprices or self.clock() >= deadline:
+                    break
+                if self.quote is not None:
+                    try:
+                        reference = float(self.quote(code) or reference)
+                    except Exception:
+                        pass  # 시세 조회 실패 시 직전 기준가로 정정 (미체결 주문을 남기지 않도록)
+                # 마지막 조회 이후 체결분이 정정 수량에 중복되지 않도록 정정 직전에 다시 조회
+                filled, avg_price = self.query_fill(order['order_no'], code)
+                if filled >= order['qty']:
+                    report.add_fill(filled, avg_price)
+                    report.open_orders.remove(order)
+                    break
+                remaining = order['qty'] - filled
+                new_order_no = self.replace(order['order_no'], code, remaining, limit_price(side, reference, self._offset(attempt + 1)))
+                if not new_order_no:
+                    break
+                # 정정 주문은 새 주문번호로 체결되므로 정정 전 주문의 체결분은 따로 합산
+                order['replaced'] = True
+                replaced, order = order, {'order_no': new_order_no, 'qty': remaining, 'replaced': False}
+                report.open_orders.append(order)
+                report.order_no = str(new_order_no)
+                report.orders += 1
+                filled, avg_price = self.query_fill(replaced['order_no'], code)  # 정정 직전에 체결된 수량 반영
+                report.add_fill(filled, avg_price)
+                report.open_orders.remove(replaced)
+                # 조회와 정정 사이에 체결된 수량만큼 정정 주문이 많으면 초과분 취소 (주문 수량 초과 체결 방지)
+                excess = filled + order['qty'] - replaced['qty']
+                if excess > 0:
+                    if not self.cancel(order['order_no'], code, excess):
+                        raise RuntimeError(f"정정 주문 초과 수량 취소 실패 (주문번호 {order['order_no']}, {excess}주)")
+                    order['qty'] -= excess
+                    if order['qty'] <= 0:
+                        report.open_orders.remove(order)
+                        break
+        except Exception as e:
+            report.error = str(e)
+
+        # 미체결 잔량 취소 후 체결 수량 확정 (조회/정정 중 오류가 난 주문 포함)
+        self.resolve(report)
+        report.elapsed = self.clock() - started
+        return report
+
+    def resolve(self, report):
+        """확정하지 못한 주문의 잔량을 취소하고 체결 수량을 조회해 report 에 반영, 모두 확정되면 True"""
+        for order in list(report.open_orders):
+            try:
+                filled, avg_price = self.query_fill(order['order_no'], report.code)
+                if filled < order['qty'] and not order['replaced']:
+                    cancelled = self.cancel(order['order_no'], report.code, order['qty'] - filled)
+                    # 취소 직전에 체결된 수량 반영
+                    filled, avg_price = self.query_fill(order['order_no'], report.code)
+                    if not cancelled and filled < order['qty']:
+                        report.error = f"미체결 잔량 취소 실패 (주문번호 {order['order_no']})"
+                        continue
+            except Exception as e:
+                report.error = str(e)
+                continue
+            report.add_fill(filled, avg_price)
+            report.open_orders.remove(order)
+        return report.resolved
+
+
+class ExecutionLog:
+    """집행 결과 기록 (JSON Lines 파일 + 당일 요약)"""
+
+    def __init__(self, path=None, session=None):
+        self.path = path or EXECUTION_LOG_PATH  # 기준 경로 (거래일을 지정하면 거래일별 파일에 기록)
+        self.session = session  # 거래일 (YYYYMMDD)
+        self.reports = []
+        self._lock = threading.Lock()
+
+    def file(self):
+        """현재 기록 중인 파일 경로"""
+        return session_log_path(self.path, self.session) if self.session else self.path
+
+    def record(self, report):
+        with self._lock:
+            self.reports.append(report)
+            try:
+                with open(self.file(), 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(report.to_dict(), ensure_ascii=False) + '\n')
+            except OSError:
+                pass
+
+    def summary(self):
+        """주문 수, 체결률, 체결 금액 가중 평균 슬리피지(bp)"""
+        with self._lock:
+            reports = list(self.reports)
+        filled = [r for r in reports if r.filled]
+        value = sum(r.filled_qty * r.avg_price for r in filled)
+        slippage = None
+        if value > 0:
+            slippage = sum(r.slippage_bps * r.filled_qty * r.avg_price for r in filled) / value
+        return {
+            'orders': len(reports),
+            'fill_rate': sum(r.filled_qty for r in reports) / max(sum(r.qty for r in reports), 1),
+            'avg_slippage_bps': slippage,
+            'avg_elapsed': sum(r.elapsed for r in reports) / len(reports) if reports else None,
+        }
@@ -0,0 +1,118 @@
+"""
+장중 1분봉 집계
+
+- 시세 조회 때마다 받은 가격을 종목별 1분봉(OHLCV)으로 집계
+- 종목별 고정 크기 링 버퍼를 사용하므로 종목당 메모리 사용량이 일정
+- 추가 API 호출 없이 최근 고가/저가/VWAP 조회 가능
+"""
+import threading
+import time
+
+import numpy as np
+
+# 분(epoch 기준 분), 시가, 고가, 저가, 종가, 거래량, 가격x거래량 합, 가격 합, 체결(조회) 횟수
+MINUTE_BAR_DTYPE = np.dtype([
+    ('minute', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+    ('pv', '<f8'),
+    ('price_sum', '<f8'),
+    ('ticks', '<i4'),
+])
+
+
+class _SymbolBars:
+    """종목 하나의 1분봉 링 버퍼"""
+
+    def __init__(self, capacity):
+        self.buffer = np.zeros(capacity, dtype=MINUTE_BAR_DTYPE)
+        self.head = -1  # 가장 최근 분봉 위치
+        self.count = 0
+        self.last_cum_volume = None
+
+    def update(self, minute, price, volume):
+        capacity = len(self.buffer)
+        if self.count and minute < self.buffer[self.head]['minute']:
+            return  # 이미 지난 분의 늦게 도착한 시세는 무시
+        if not self.count or minute > self.buffer[self.head]['minute']:
+            self.head = (self.head + 1) % capacity
+            self.count = min(self.count + 1, capacity)
+            self.buffer[self.head] = (minute, price, price, price, price, 0.0, 0.0, 0.0, 0)
+        bar = self.buffer[self.head]
+        bar['high'] = max(bar['high'], price)
+        bar['low'] = min(bar['low'], price)
+        bar['close'] = price
+        bar['volume'] += volume
+        bar['pv'] += price * volume
+        bar['price_sum'] += price
+        bar['ticks'] += 1
+
+    def ordered(self, minutes=None):
+        """시간 순으로 정렬된 분봉 복사본 (minutes 지정 시 최근 분봉 기준 N분 이내)"""
+        if self.count == 0:
+            return np.empty(0, dtype=MINUTE_BAR_DTYPE)
+        idx = np.arange(self.head - self.count + 1, self.head + 1) % len(self.buffer)
+        bars = self.buffer[idx]
+        if minutes is not None:
+            bars = bars[bars['minute'] > bars['minute'][-1] - minutes]
+        return bars.copy()
+
+
+class MinuteBarAggregator:
+    """종목별 장중 1분봉 집계기"""
+
+    def __init__(self, capacity=390):
+        self.capacity = capacity  # 정규장 390분
+        self._symbols = {}
+        self._lock = threading.Lock()
+
+    def update(self, symbol, price, ts=None, cum_volume=None):
+        """시세 반영 (cum_volume 은 당일 누적 거래량, 직전 값과의 차이를 분봉 거래량으로 사용)"""
+        if price is None or price <= 0:
+            return
+        minute = int((time.time() if ts is None else ts) // 60)
+        with self._lock:
+            bars = self._symbols.get(symbol)
+            if bars is None:
+                bars = self._symbols[symbol] = _SymbolBars(self.capacity)
+            volume = 0.0
+            if cum_volume is not None:
+                if bars.last_cum_volume is not None and cum_volume > bars.last_cum_volume:
+                    volume = float(cum_volume - bars.last_cum_volume)
+                bars.last_cum_volume = cum_volume
+            bars.update(minute, float(price), volume)
+
+    def symbols(self):
+        with self._lock:
+            return list(self._symbols)
+
+    def bars(self, symbol, minutes=None):
+        """최근 N분(기본 전체)의 분봉 조회"""
+        with self._lock:
+            bars = self._symbols.get(symbol)
+            if bars is None:
+                return np.empty(0, dtype=MINUTE_BAR_DTYPE)
+            return bars.ordered(minutes)
+
+    def recent_high(self, symbol, minutes=None):
+        """최근 N분 고가 (데이터가 없으면 None)"""
+        bars = self.bars(symbol, minutes)
+        return float(bars['high'].max()) if len(bars) else None
+
+    def recent_low(self, symbol, minutes=None):
+        """최근 N분 저가 (데이터가 없으면 None)"""
+        bars = self.bars(symbol, minutes)
+        return float(bars['low'].min()) if len(bars) else None
+
+    def vwap(self, symbol, minutes=None):
+        """최근 N분 VWAP (거래량 정보가 없으면 조회 가격 평균)"""
+        bars = self.bars(symbol, minutes)
+        if not len(bars):
+            return None
+        volume = bars['volume'].sum()
+        if volume > 0:
+            return float(bars['pv'].sum() / volume)
+        return float(bars['price_sum'].sum() / bars['ticks'].sum())
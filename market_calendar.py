@@ -0,0 +1,254 @@
+"""
+거래소 휴장일/조기폐장 캘린더
+
+- 미국(NYSE/NASDAQ): 공휴일 규칙으로 계산 + 임시 휴장일 표
+- 한국(KRX): 고정 공휴일 계산 + 음력 공휴일/대체공휴일/선거일 등은 연도별 표
+  (표에 없는 연도는 US_MARKET_HOLIDAYS / KR_MARKET_HOLIDAYS 환경변수로 보완)
+- 거래일별 장 시작/매수 시작/일괄 매도/프로그램 종료 시각을 미리 계산
+"""
+import datetime
+import os
+from dataclasses import dataclass
+
+from pytz import timezone
+
+US_TZ = timezone('America/New_York')
+KR_TZ = timezone('Asia/Seoul')
+
+# 규칙으로 계산되지 않는 미국 임시 휴장일
+US_SPECIAL_HOLIDAYS = {
+    datetime.date(2025, 1, 9),  # 카터 전 대통령 국장
+}
+
+# KRX 음력 공휴일, 대체공휴일, 선거일 등
+KR_TABLE_HOLIDAYS = {
+    # 2025
+    datetime.date(2025, 1, 27), datetime.date(2025, 1, 28), datetime.date(2025, 1, 29),
+    datetime.date(2025, 1, 30), datetime.date(2025, 3, 3), datetime.date(2025, 5, 6),
+    datetime.date(2025, 6, 3), datetime.date(2025, 10, 6), datetime.date(2025, 10, 7),
+    datetime.date(2025, 10, 8),
+    # 2026
+    datetime.date(2026, 2, 16), datetime.date(2026, 2, 17), datetime.date(2026, 2, 18),
+    datetime.date(2026, 3, 2), datetime.date(2026, 5, 25), datetime.date(2026, 6, 3),
+    datetime.date(2026, 8, 17), datetime.date(2026, 9, 24), datetime.date(2026, 9, 25),
+    datetime.date(2026, 10, 5),
+}
+
+# KRX 수능일 (10:00 개장, 16:30 폐장)
+KR_EXAM_DAYS = {
+    datetime.date(2025, 11, 13),
+    datetime.date(2026, 11, 19),
+}
+
+
+@dataclass(frozen=True)
+class TradingSession:
+    """하루 거래 일정 (모두 거래소 현지 시각)"""
+    date: datetime.date
+    open: datetime.datetime  # 장 시작
+    start: datetime.datetime  # 매수 시작
+    sell: datetime.datetime  # 일괄 매도 시작
+    exit: datetime.datetime  # 프로그램 종료
+    close: datetime.datetime  # 장 마감
+    early_close: bool = False
+
+    def events(self):
+        """시간 순 (이름, 시각) 목록"""
+        return [('open', self.open), ('start', self.start), ('sell', self.sell),
+                ('exit', self.exit), ('close', self.close)]
+
+
+def _nth_weekday(year, month, weekday, n):
+    """해당 월의 n번째 요일 (n=-1 이면 마지막)"""
+    if n > 0:
+        day = datetime.date(year, month, 1)
+        day += datetime.timedelta(days=(weekday - day.weekday()) % 7)
+        return day + datetime.timedelta(weeks=n - 1)
+    next_month = datetime.date(year + month // 12, month % 12 + 1, 1)
+    day = next_month - datetime.timedelta(days=1)
+    return day - datetime.timedelta(days=(day.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    """부활절 (그레고리력, Anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    r = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * r) // 451
+    month, day = divmod(h + r - 7 * m + 114, 31)
+    return datetime.date(year, month, day + 1)
+
+
+def _observed(day):
+    """토요일은 금요일, 일요일은 월요일로 대체"""
+    if day.weekday() == 5:
+        return day - datetime.timedelta(days=1)
+    if day.weekday() == 6:
+        return day + datetime.timedelta(days=1)
+    return day
+
+
+def us_holidays(year):
+    """NYSE/NASDAQ 휴장일"""
+    days = {
+        _nth_weekday(year, 1, 0, 3),  # 마틴 루터 킹 데이
+        _nth_weekday(year, 2, 0, 3),  # 대통령의 날
+        _easter(year) - datetime.timedelta(days=2),  # 성금요일
+        _nth_weekday(year, 5, 0, -1),  # 메모리얼 데이
+        _observed(datetime.date(year, 7, 4)),  # 독립기념일
+        _nth_weekday(year, 9, 0, 1),  # 노동절
+        _nth_weekday(year, 11, 3, 4),  # 추수감사절
+        _observed(datetime.date(year, 12, 25)),  # 크리스마스
+    }
+    # 신정이 토요일이면 전년도 12/31 은 휴장하지 않음
+    new_year = datetime.date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days.add(_observed(new_year))
+    if year >= 2022:
+        days.add(_observed(datetime.date(year, 6, 19)))  # 준틴스
+    days.update(day for day in US_SPECIAL_HOLIDAYS if day.year == year)
+    return days
+
+
+def us_early_closes(year):
+    """NYSE/NASDAQ 13:00 조기폐장일"""
+    days = {_nth_weekday(year, 11, 3, 4) + datetime.timedelta(days=1)}  # 추수감사절 다음날
+    for day in (datetime.date(year, 7, 3), datetime.date(year, 12, 24)):
+        # 다음날이 평일 공휴일인 경우에만 전날 조기폐장 (월~목)
+        if day.weekday() <= 3:
+            days.add(day)
+    return days
+
+
+def kr_holidays(year):
+    """KRX 휴장일"""
+    days = {
+        datetime.date(year, 1, 1),  # 신정
+        datetime.date(year, 3, 1),  # 삼일절
+        datetime.date(year, 5, 1),  # 근로자의 날
+        datetime.date(year, 5, 5),  # 어린이날
+        datetime.date(year, 6, 6),  # 현충일
+        datetime.date(year, 8, 15),  # 광복절
+        datetime.date(year, 10, 3),  # 개천절
+        datetime.date(year, 10, 9),  # 한글날
+        datetime.date(year, 12, 25),  # 성탄절
+    }
+    days.update(day for day in KR_TABLE_HOLIDAYS if day.year == year)
+    # 연말 휴장일 (마지막 평일)
+    last_day = datetime.date(year, 12, 31)
+    while last_day.weekday() >= 5 or last_day in days:
+        last_day -= datetime.timedelta(days=1)
+    days.add(last_day)
+    return days
+
+
+def _parse_dates(value):
+    """'YYYY-MM-DD,YYYY-MM-DD' 형식 문자열을 날짜 집합으로 변환"""
+    days = set()
+    for item in (value or '').split(','):
+        item = item.strip()
+        if item:
+            days.add(datetime.date.fromisoformat(item))
+    return days
+
+
+class MarketCalendar:
+    """거래소 캘린더"""
+
+    def __init__(self, market, extra_holidays=()):
+        if market not in ('US', 'KR'):
+            raise ValueError(f"지원하지 않는 시장입니다: {market}")
+        self.market = market
+        self.tz = US_TZ if market == 'US' else KR_TZ
+        self.extra_holidays = set(extra_holidays) | _parse_dates(os.getenv(f"{market}_MARKET_HOLIDAYS"))
+        self._holidays = {}  # {연도: 휴장일 집합}
+        self._sessions = {}  # {날짜: TradingSession 또는 None}
+
+    def holidays(self, year):
+        if year not in self._holidays:
+            days = us_holidays(year) if self.market == 'US' else kr_holidays(year)
+            self._holidays[year] = days | {day for day in self.extra_holidays if day.year == year}
+        return self._holidays[year]
+
+    def is_trading_day(self, day):
+        return day.weekday() < 5 and day not in self.holidays(day.year)
+
+    def _at(self, day, hour, minute):
+        return self.tz.localize(datetime.datetime(day.year, day.month, day.day, hour, minute))
+
+    def session(self, day):
+        """해당 날짜의 거래 일정 (휴장일이면 None)"""
+        if day in self._sessions:
+            return self._sessions[day]
+        session = None
+        if self.is_trading_day(day):
+            early_close = False
+            if self.market == 'US':
+                open_time = self._at(day, 9, 30)
+                early_close = day in us_early_closes(day.year)
+                close_time = self._at(day, 13, 0) if early_close else self._at(day, 16, 0)
+            else:
+                open_time = self._at(day, 9, 0)
+                close_time = self._at(day, 15, 30)
+                first_day = min(d for d in (datetime.date(day.year, 1, n) for n in range(2, 10))
+                                if self.is_trading_day(d))
+                if day == first_day:
+                    open_time = self._at(day, 10, 0)  # 연초 개장일 1시간 지연
+                if day in KR_EXAM_DAYS:
+                    open_time = self._at(day, 10, 0)
+                    close_time = self._at(day, 16, 30)
+            session = TradingSession(
+                date=day,
+                open=open_time,
+                start=open_time + datetime.timedelta(minutes=5),
+                sell=close_time - datetime.timedelta(minutes=15),
+                exit=close_time - datetime.timedelta(minutes=10),
+                close=close_time,
+                early_close=early_close,
+            )
+        self._sessions[day] = session
+        return session
+
+    def now(self):
+        return datetime.datetime.now(self.tz)
+
+    def today_session(self, now=None):
+        now = now or self.now()
+        return self.session(now.astimezone(self.tz).date())
+
+    def is_open(self, now=None):
+        """정규장 시간 여부"""
+        now = now or self.now()
+        session = self.today_session(now)
+        return session is not None and session.open <= now <= session.close
+
+    def next_session(self, now=None):
+        """아직 마감되지 않은 가장 가까운 거래 일정"""
+        now = now or self.now()
+        day = now.astimezone(self.tz).date()
+        for _ in range(30):
+            session = self.session(day)
+            if session is not None and now < session.close:
+                return session
+            day += datetime.timedelta(days=1)
+        return None
+
+    def next_event(self, now=None):
+        """다음 일정 이벤트 (이름, 시각)"""
+        now = now or self.now()
+        session = self.next_session(now)
+        if session is None:
+            return None
+        for name, when in session.events():
+            if when > now:
+                return name, when
+        return None
+
+
+us_calendar = MarketCalendar('US')
+kr_calendar = MarketCalendar('KR')
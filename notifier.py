@@ -0,0 +1,56 @@
+"""
+Discord 알림 전송
+
+- 웹훅 전송은 별도 스레드에서 순서대로 처리 (매매 루프가 웹훅 응답을 기다리지 않음)
+- 첫 메시지를 보낼 때 전송 스레드 시작, 프로그램 종료 전 flush() 로 대기 중인 메시지 전송
+- 미국/국내 주식 프로그램이 같은 방식으로 사용
+"""
+import datetime
+import logging
+import queue
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class DiscordNotifier:
+    """Discord 웹훅 전송 대기열"""
+
+    def __init__(self, webhook_url, session=None, timeout=10):
+        self.webhook_url = webhook_url
+        self.session = session or requests.Session()  # 연결 재사용 (매매 프로그램의 세션을 넘겨 받음)
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def _run(self):
+        while True:
+            message = self._queue.get()
+            try:
+                self.session.post(self.webhook_url, data=message, timeout=self.timeout)
+            except Exception as e:
+                logger.warning(f"Discord 메시지 전송 실패: {e}")
+            finally:
+                self._queue.task_done()
+
+    def send(self, msg):
+        """메시지를 전송 대기열에 추가 (웹훅이 없으면 무시)"""
+        if not self.webhook_url:
+            return
+        now = datetime.datetime.now()
+        message = {"content": f"[{now.strftime('%Y-%m-%d %H:%M:%S')}] {str(msg)}"}
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='discord', daemon=True)
+                self._thread.start()
+        self._queue.put(message)
+
+    def flush(self, timeout=10):
+        """대기 중인 메시지를 모두 전송할 때까지 대기 (프로그램 종료 전 호출)"""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
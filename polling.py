@@ -0,0 +1,98 @@
+"""
+적응형 시세 조회 스케줄러
+
+- 종목별 다음 조회 시각을 힙으로 관리하고, 조회 시각이 된 종목만 조회
+- 조회 간격은 가장 가까운 기준가(매수 목표가, 손절/익절/트레일링스탑 가격)까지 거리를 변동성으로 나눠 계산
+  (간격 동안 가격이 sigma 표준편차 이상 움직여야 기준가에 닿도록: 간격 = (거리 / (sigma × 초당 변동성))²)
+- 기준가 근처 종목은 min_interval(기본 1초)마다, 먼 종목은 max_interval(기본 60초)마다 조회
+- 초당 조회 수는 budget 이하로 제한 (토큰 버킷), 제한에 걸린 종목은 다음 틱에 먼저 조회
+"""
+import heapq
+import itertools
+import time
+
+import numpy as np
+
+SECONDS_PER_YEAR = 252 * 390 * 60  # 정규장 기준 연간 거래 시간 (초)
+
+
+class AdaptivePoller:
+    """기준가까지 거리에 따라 종목별 조회 주기를 조정하는 스케줄러"""
+
+    def __init__(self, budget, min_interval=1.0, max_interval=60.0, sigma=3.0, clock=time.monotonic):
+        self.budget = budget  # 초당 최대 조회 수
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.sigma = sigma
+        self.clock = clock
+        self._heap = []  # (조회 시각, 순번, 종목코드)
+        self._due = {}  # {종목코드: 조회 시각} (힙에 남은 이전 항목은 꺼낼 때 무시)
+        self._counter = itertools.count()
+        self._tokens = max(budget, 1.0)
+        self._refilled_at = clock()
+
+    def __contains__(self, symbol):
+        return symbol in self._due
+
+    def __len__(self):
+        return len(self._due)
+
+    def schedule(self, symbol, delay=0.0):
+        """delay 초 뒤 조회 예약 (이미 예약된 종목은 시각 변경)"""
+        due = self.clock() + delay
+        self._due[symbol] = due
+        heapq.heappush(self._heap, (due, next(self._counter), symbol))
+
+    def sync(self, symbols):
+        """조회 대상 종목 목록 반영 (새 종목은 바로 조회, 빠진 종목은 제거)"""
+        symbols = set(symbols)
+        for symbol in list(self._due):
+            if symbol not in symbols:
+                del self._due[symbol]
+        for symbol in symbols:
+            if symbol not in self._due:
+                self.schedule(symbol)
+
+    def intervals(self, prices, triggers, volatility):
+        """종목별 다음 조회까지 간격 (초)
+
+        prices (S,), triggers (S, K) 기준가 (없는 칸은 nan), volatility (S,) 연환산 변동성
+        가격이나 기준가를 모르면 min_interval
+        """
+        prices = np.asarray(prices, dtype=float)
+        triggers = np.asarray(triggers, dtype=float).reshape(len(prices), -1)
+        per_second = np.asarray(volatility, dtype=float) / np.sqrt(SECONDS_PER_YEAR)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            distance = np.abs(np.log(triggers / prices[:, None]))
+            nearest = np.nanmin(np.where(np.isnan(distance), np.inf, distance), axis=1)
+            interval = (nearest / (self.sigma * per_second)) ** 2
+        interval = np.where(np.isfinite(interval), interval, self.min_interval)
+        return np.clip(interval, self.min_interval, self.max_interval)
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(max(self.budget, 1.0), self._tokens + (now - self._refilled_at) * self.budget)
+        self._refilled_at = now
+
+    def take(self, first=()):
+        """조회 시각이 된 종목을 조회 한도 안에서 꺼냄 (first 에 속한 종목 우선, 그 다음 예정 시각 순)
+
+        꺼낸 종목은 조회 후 schedule() 로 다시 예약해야 함
+        """
+        self._refill()
+        now = self.clock()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            when, _, symbol = heapq.heappop(self._heap)
+            if self._due.get(symbol) == when:
+                due.append((when, symbol))
+        first = set(first)
+        due.sort(key=lambda item: (item[1] not in first, item[0]))
+        count = min(len(due), int(self._tokens))
+        self._tokens -= count
+        for when, symbol in due[count:]:
+            heapq.heappush(self._heap, (when, next(self._counter), symbol))
+        taken = [symbol for _, symbol in due[:count]]
+        for symbol in taken:
+            del self._due[symbol]
+        return taken
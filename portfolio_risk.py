@@ -0,0 +1,128 @@
+"""
+포트폴리오 위험 한도 (일일 손실 한도, 총 노출, 종목 집중도)
+
+- 실현/평가 손익과 총 노출(보유 평가액 합)을 시세 조회/체결 때마다 변화분만 더해 갱신 (갱신당 O(1), 잔고 조회 없음)
+- 일일 손실이 max_daily_loss 이상이면 당일 신규 매수 중단, flatten_loss 이상이면 전 종목 청산 (당일 유지)
+- 총 노출/종목 집중도가 한도를 넘는 동안은 신규 매수 중단, 신규 매수 금액도 남은 한도 안으로 제한
+  (종목 집중도는 그 종목의 시세/체결이 반영될 때 판단)
+- 손실률/비중은 장 시작 시 자본(현금 + 보유 주식 매수 금액) 대비
+- ledger(PersistentDict 등)에 장 시작 자본/실현손익/중단 상태를 기록해 재시작 후에도 유지
+"""
+HALT = 'halt'  # 신규 매수 중단
+FLATTEN = 'flatten'  # 전 종목 청산
+
+
+class PortfolioRisk:
+    """계좌 전체 손익/노출 추적과 한도 판단"""
+
+    def __init__(self, capital, max_daily_loss=0.03, flatten_loss=0.05, max_gross_exposure=1.0,
+                 max_concentration=0.5, ledger=None):
+        self.ledger = ledger if ledger is not None else {}
+        if 'capital' not in self.ledger:  # 재시작 시 장 시작 자본 유지
+            self.ledger['capital'] = float(capital)
+        self.max_daily_loss = max_daily_loss
+        self.flatten_loss = flatten_loss
+        self.max_gross_exposure = max_gross_exposure
+        self.max_concentration = max_concentration
+        self.positions = {}  # {종목코드: (수량, 평균 매수가, 현재가)}
+        self.unrealized = 0.0
+        self.gross = 0.0
+        self._concentrated = set()  # 집중도 한도를 넘은 종목
+
+    @property
+    def capital(self):
+        return self.ledger['capital']
+
+    @property
+    def realized(self):
+        return self.ledger.get('realized', 0.0)
+
+    def pnl(self):
+        return self.realized + self.unrealized
+
+    def equity(self):
+        return self.capital + self.pnl()
+
+    def _set(self, code, qty, cost, price):
+        """종목 하나의 포지션 교체 (이전 값을 빼고 새 값을 더함)"""
+        old = self.positions.pop(code, None)
+        if old is not None:
+            old_qty, old_cost, old_price = old
+            self.unrealized -= old_qty * (old_price - old_cost)
+            self.gross -= old_qty * old_price
+        self._concentrated.discard(code)
+        if qty <= 0:
+            return
+        self.positions[code] = (qty, cost, price)
+        self.unrealized += qty * (price - cost)
+        self.gross += qty * price
+        equity = self.equity()
+        if equity <= 0 or qty * price > self.max_concentration * equity:
+            self._concentrated.add(code)
+
+    def set_position(self, code, qty, cost, price=None):
+        """보유 포지션 등록 (시작 시 잔고 반영용, 실현손익 변화 없음)"""
+        self._set(code, int(qty), float(cost), float(price or cost))
+
+    def on_price(self, code, price):
+        """보유 종목 시세 반영"""
+        position = self.positions.get(code)
+        if position is not None and price and price > 0:
+            qty, cost, _ = position
+            self._set(code, qty, cost, float(price))
+
+    def on_fill(self, code, side, qty, price):
+        """체결 반영 (매수는 평균 매수가 갱신, 매도는 실현손익 반영)"""
+        qty, price = int(qty), float(price)
+        if qty <= 0:
+            return
+        held, cost, _ = self.positions.get(code, (0, 0.0, price))
+        if side == 'buy':
+            self._set(code, held + qty, (held * cost + qty * price) / (held + qty), price)
+            return
+        sold = min(qty, held)
+        self.ledger['realized'] = self.realized + sold * (price - cost)
+        self._set(code, held - sold, cost, price)
+
+    def check(self):
+        """한도 확인: FLATTEN(전 종목 청산), HALT(신규 매수 중단), 정상이면 None"""
+        loss = -self.pnl() / self.capital if self.capital > 0 else 0.0
+        stopped = self.ledger.get('stopped')
+        if stopped != FLATTEN and loss >= self.flatten_loss:
+            stopped = FLATTEN
+        elif stopped is None and loss >= self.max_daily_loss:
+            stopped = HALT
+        if stopped != self.ledger.get('stopped'):
+            self.ledger['stopped'] = stopped
+        if stopped:
+            return stopped
+        if self.gross > self.max_gross_exposure * self.equity() or self._concentrated:
+            return HALT
+        return None
+
+    def loss_trigger(self, code):
+        """이 종목 가격만 움직인다고 볼 때 일일 손실 한도에 닿는 가격 (시세 조회 주기 계산용, 미보유면 nan)"""
+        position = self.positions.get(code)
+        if position is None:
+            return float('nan')
+        qty, _, price = position
+        return price - (self.max_daily_loss * self.capital + self.pnl()) / qty
+
+    def entry_limit(self):
+        """신규 매수 가능 금액 (달러, 총 노출/종목 집중도 한도 중 작은 값)"""
+        if self.check():
+            return 0.0
+        equity = self.equity()
+        return max(0.0, min(self.max_gross_exposure * equity - self.gross, self.max_concentration * equity))
+
+    def status(self):
+        """현재 손익/노출 (알림/로그용)"""
+        return {
+            'capital': self.capital,
+            'realized': self.realized,
+            'unrealized': self.unrealized,
+            'gross': self.gross,
+            'positions': len(self.positions),
+            'concentrated': sorted(self._concentrated),
+            'stopped': self.ledger.get('stopped'),
+        }
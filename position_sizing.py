@@ -0,0 +1,91 @@
+"""
+변동성 기반 포지션 사이징
+
+- 종목별 변동성(calculate_volatility)으로 변동성 균등(volatility parity) 배분
+  (종목당 위험 = 위험 예산 / 목표 보유 종목 수, 투자 비중 = 종목당 위험 / 변동성)
+- 같은 시점에 여러 종목이 매수 신호를 내면 신호 강도(기본: 변동성 대비 돌파폭) 순으로 선택
+- 관심 종목 전체를 배열 하나로 한 번에 계산하므로 틱마다 추가 지연이 거의 없음
+"""
+import numpy as np
+
+
+class VolatilityParitySizer:
+    """관심 종목 전체에 대한 변동성 균등 배분 계산기"""
+
+    def __init__(self, symbols, max_positions, risk_budget=0.2, max_weight=0.4, default_volatility=0.2):
+        self.symbols = list(symbols)
+        self.index = {sym: i for i, sym in enumerate(self.symbols)}
+        self.max_positions = max_positions  # 목표 보유 종목 수
+        self.risk_budget = risk_budget  # 포트폴리오 연환산 변동성 예산
+        self.max_weight = max_weight  # 종목당 최대 투자 비중
+        self.default_volatility = default_volatility
+        self.targets = np.full(len(self.symbols), np.nan)
+        self.volatilities = np.full(len(self.symbols), np.nan)
+
+    def set_symbols(self, symbols):
+        """관심 종목 변경 (유지되는 종목의 목표가/변동성은 그대로 두고 새 종목만 비워 둠), 추가된 종목 반환"""
+        symbols = list(symbols)
+        rows = np.array([self.index.get(sym, -1) for sym in symbols], dtype=int)
+        kept = rows >= 0
+        targets = np.full(len(symbols), np.nan)
+        volatilities = np.full(len(symbols), np.nan)
+        targets[kept] = self.targets[rows[kept]]
+        volatilities[kept] = self.volatilities[rows[kept]]
+        added = [sym for sym, row in zip(symbols, rows) if row < 0]
+        self.symbols = symbols
+        self.index = {sym: i for i, sym in enumerate(symbols)}
+        self.targets = targets
+        self.volatilities = volatilities
+        return added
+
+    def set_target(self, symbol, target_price, volatility=None):
+        """종목별 목표가/변동성 등록"""
+        i = self.index[symbol]
+        self.targets[i] = target_price
+        if volatility is not None and volatility > 0:
+            self.volatilities[i] = volatility
+
+    def volatility(self):
+        """종목별 변동성 (미등록 종목은 기본값)"""
+        return np.where(np.isnan(self.volatilities), self.default_volatility, self.volatilities)
+
+    def weights(self):
+        """종목별 목표 투자 비중 (자본 대비)"""
+        return np.minimum(self.risk_budget / self.max_positions / self.volatility(), self.max_weight)
+
+    def breakouts(self, prices, held, scores=None):
+        """매수 신호가 난 미보유 종목 인덱스 (신호 강도 내림차순)
+
+        prices 는 종목 순서대로의 현재가 배열(조회 실패 시 nan), held 는 보유 여부 배열
+        scores 는 종목별 신호 점수(양수면 매수, signals.SignalCombiner), 없으면 목표가 돌파 강도 사용
+        """
+        prices = np.asarray(prices, dtype=float)
+        if scores is None:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                scores = (prices / self.targets - 1) / self.volatility()
+        scores = np.asarray(scores, dtype=float)
+        candidates = np.flatnonzero((scores > 0) & (prices > 0) & ~np.asarray(held, dtype=bool))
+        return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+    def allocate(self, prices, held, capital, cash, scores=None, held_count=None):
+        """돌파 종목별 주문 수량 계산, [(종목코드, 수량, 현재가)] 를 우선순위 순으로 반환
+
+        capital 은 보유 주식 평가액을 포함한 총 자본, cash 는 주문가능 금액 (모두 달러)
+        held_count 는 관심 종목 밖의 보유 종목까지 포함한 실제 보유 종목 수 (없으면 held 기준)
+        """
+        held = np.asarray(held, dtype=bool)
+        prices = np.asarray(prices, dtype=float)
+        open_slots = self.max_positions - (int(held.sum()) if held_count is None else held_count)
+        if open_slots <= 0 or cash <= 0:
+            return []
+        selected = self.breakouts(prices, held, scores)[:open_slots]
+        if len(selected) == 0:
+            return []
+
+        notional = self.weights()[selected] * capital
+        # 주문가능 금액을 넘으면 선택된 종목 비중대로 함께 축소
+        total = notional.sum()
+        if total > cash:
+            notional *= cash / total
+        qty = np.floor(notional / prices[selected]).astype(int)
+        return [(self.symbols[i], int(q), float(prices[i])) for i, q in zip(selected, qty) if q > 0]
@@ -0,0 +1,201 @@
+"""
+이중화 (hot standby): 리더 임대(lease) + 상태 복제 로그
+
+- 두 프로세스가 같은 디렉터리(HA_DIR, 공유 볼륨)를 사용하고, 임대를 가진 프로세스(리더)만 주문
+- 리더는 ttl/3 마다 임대의 갱신 횟수를 올림, 대기 프로세스(standby)는 갱신 횟수가 자신의 단조 시계로
+  ttl 동안 바뀌지 않으면 임대를 가져감 (머신 간 시계를 비교하지 않으므로 시계가 어긋나도 안전)
+  (임대를 가져갈 때마다 epoch 증가, 이전 리더는 다음 갱신 때 임대를 잃은 것을 알고 주문 중단)
+- 리더의 상태 저장소 변경(StateStore 리스너)을 거래일별 JSON Lines 로그에 추가하고,
+  대기 프로세스는 로그를 따라 읽어 자신의 상태 저장소에 반영 (승격 시 매수가/최고가/목표가를 다시 계산하지 않음)
+- 파일 잠금(fcntl.flock)과 원자적 교체(os.replace)만 사용하므로 한 대의 머신에서 두 프로세스로 시험 가능
+"""
+import fcntl
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseLost(Exception):
+    """리더 임대를 잃어 주문할 수 없음"""
+
+
+class LeaderLease:
+    """파일 기반 리더 임대"""
+
+    def __init__(self, path, owner=None, ttl=5.0, clock=time.monotonic):
+        self.path = path
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.ttl = ttl
+        self.clock = clock  # 이 프로세스의 단조 시계 (다른 프로세스의 시각과 비교하지 않음)
+        self.epoch = None  # 보유 중인 임대의 epoch (없으면 None)
+        self.renewals = 0
+        self.expires = 0.0  # 보유 중인 임대를 스스로 만료로 보는 시각 (마지막 갱신 + ttl, 단조 시계 기준)
+        self._seen = None  # 다른 프로세스 임대의 마지막 (owner, epoch, renewals)
+        self._seen_at = 0.0  # 그 값이 바뀐 것을 마지막으로 본 시각
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(f"{self.path}.lock", 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, epoch, renewals, released=False):
+        now = self.clock()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'owner': self.owner, 'epoch': epoch, 'renewals': renewals, 'ttl': self.ttl, 'released': released}, f)
+        os.replace(tmp_path, self.path)
+        self.epoch = epoch
+        self.renewals = renewals
+        self.expires = now + self.ttl
+
+    def current(self):
+        """현재 임대 정보 {'owner', 'epoch', 'renewals', 'ttl', 'released'} (없으면 None)"""
+        return self._read()
+
+    def _stale(self, lease):
+        """다른 프로세스의 임대가 반납되었거나, 갱신 횟수가 이 프로세스 시계로 ttl 동안 바뀌지 않았으면 True"""
+        if lease is None or lease.get('released'):
+            return True
+        now = self.clock()
+        seen = (lease['owner'], lease['epoch'], lease.get('renewals'))
+        if seen != self._seen:
+            self._seen, self._seen_at = seen, now
+            return False
+        return now - self._seen_at >= lease.get('ttl', self.ttl)
+
+    def acquire(self):
+        """임대가 비었거나 만료되었으면 가져옴 (이미 보유 중이면 갱신), 성공 여부 반환"""
+        with self._locked():
+            lease = self._read()
+            if lease and lease['owner'] == self.owner and lease['epoch'] == self.epoch:
+                self._write(self.epoch, self.renewals + 1)
+                return True
+            if not self._stale(lease):
+                return False
+            self._write((lease['epoch'] if lease else 0) + 1, 0)
+        logger.info(f"👑 리더 임대 획득 (epoch {self.epoch})", extra={'event': 'lease_acquired', 'epoch': self.epoch})
+        return True
+
+    def renew(self):
+        """임대 갱신, 다른 프로세스가 가져갔으면 False"""
+        if self.epoch is None:
+            return False
+        with self._locked():
+            lease = self._read()
+            if not lease or lease['owner'] != self.owner or lease['epoch'] != self.epoch:
+                self.epoch = None
+                logger.warning("⚠️ 리더 임대를 잃었습니다.", extra={'event': 'lease_lost', 'holder': lease and lease['owner']})
+                return False
+            self._write(self.epoch, self.renewals + 1)
+        return True
+
+    def held(self):
+        """임대 보유 여부 (마지막 갱신 기준 만료 전이어야 함, 주문 직전 확인용)"""
+        return self.epoch is not None and self.clock() < self.expires
+
+    def release(self):
+        """임대 반납 (정상 종료 시 대기 프로세스가 바로 가져갈 수 있도록)"""
+        self.stop()
+        if self.epoch is None:
+            return
+        with self._locked():
+            lease = self._read()
+            if lease and lease['owner'] == self.owner and lease['epoch'] == self.epoch:
+                self._write(self.epoch, self.renewals + 1, released=True)
+        self.epoch = None
+
+    def _run(self, interval):
+        while not self._stopped.wait(interval):
+            try:
+                if not self.renew():
+                    return
+            except OSError as e:
+                logger.warning(f"⚠️ 리더 임대 갱신 실패: {e}", extra={'event': 'lease_renew_failed'})
+
+    def start(self, interval=None):
+        """백그라운드 임대 갱신 시작 (기본 ttl/3 마다)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(interval or self.ttl / 3,), name='lease-renew', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def wait(self, poll, interval=0.5, until=None):
+        """임대를 얻을 때까지 대기하며 interval 마다 poll() 호출 (until(epoch 초) 시각이 지나거나 poll() 이 False 면 포기)"""
+        while not self.acquire():
+            if poll() is False or (until is not None and time.time() >= until):
+                return False
+            time.sleep(interval)
+        return True
+
+
+class ReplicationLog:
+    """거래일별 상태 변경 로그 (리더는 추가, 대기 프로세스는 따라 읽기)"""
+
+    def __init__(self, directory, session, name='state'):
+        self.path = os.path.join(directory, f"{name}_{session}.jsonl")  # name: 매매 프로그램(시장)별 구분
+        self.session = session
+        self.epoch = 0
+        self._offset = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def publish(self, op, namespace, key=None, value=None):
+        """상태 변경 한 건 추가 (StateStore 리스너)"""
+        line = json.dumps({'epoch': self.epoch, 'op': op, 'ns': namespace, 'key': key, 'value': value}, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+    def end(self):
+        """장 종료 표시 (대기 프로세스는 승격하지 않고 종료)"""
+        self.publish('end', None)
+
+    def apply(self, store):
+        """마지막으로 읽은 위치 이후의 변경을 store 에 반영, 장 종료 표시가 있으면 False"""
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                lines = f.readlines()
+        except FileNotFoundError:
+            return True
+        running = True
+        for line in lines:
+            if not line.endswith(b'\n'):
+                break  # 아직 기록 중인 줄은 다음에 읽음
+            self._offset += len(line)
+            entry = json.loads(line)
+            if entry['epoch'] < self.epoch:
+                continue  # 임대를 잃은 이전 리더가 늦게 남긴 변경은 무시
+            self.epoch = entry['epoch']
+            op = entry['op']
+            if op == 'set':
+                store.set(entry['ns'], entry['key'], entry['value'])
+            elif op == 'delete':
+                store.delete(entry['ns'], entry['key'])
+            elif op == 'clear':
+                store.clear(entry['ns'])
+            elif op == 'end':
+                running = False
+        return running
@@ -0,0 +1,145 @@
+"""
+샘플링 프로파일러
+
+- 별도 스레드가 일정 간격으로 모든 스레드(메인 루프, HTTP/캐시 스레드 등)의 호출 스택을 수집
+- 결과는 flame graph 도구(flamegraph.pl, speedscope 등)에서 바로 열 수 있는 folded stack 형식
+- 매매 프로세스는 SIGUSR1 을 받으면 요청 파일에 적힌 시간만큼 프로파일링 후 결과 파일을 기록
+  (start.py 의 /profile 엔드포인트가 요청 파일 작성, 시그널 전송, 결과 반환을 담당)
+"""
+import glob
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_REQUEST_PATH = os.getenv('PROFILE_REQUEST_PATH', 'profile_request.json')
+
+logger = logging.getLogger(__name__)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """스레드 스택 샘플러"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval  # 샘플링 간격 (초)
+        self.stacks = Counter()
+        self.samples = 0
+        self._lock = threading.Lock()
+
+    def sample(self, exclude=()):
+        """모든 스레드의 현재 스택을 한 번 수집"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        with self._lock:
+            for ident, frame in frames.items():
+                if ident in exclude:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def run(self, seconds):
+        """seconds 동안 샘플링 (호출한 스레드는 제외)"""
+        me = {threading.get_ident()}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            self.sample(exclude=me)
+            time.sleep(self.interval)
+        return self
+
+    def folded(self):
+        """folded stack 형식 문자열 ('스레드;함수;...;함수 횟수')"""
+        with self._lock:
+            return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.folded())
+        os.replace(tmp_path, path)
+
+
+_active = threading.Lock()
+
+
+def profile_to_file(seconds, output_path, interval=0.01):
+    """seconds 동안 프로파일링 후 결과 파일 기록 (이미 실행 중이면 False)"""
+    if not _active.acquire(blocking=False):
+        return False
+
+    def worker():
+        try:
+            SamplingProfiler(interval).run(seconds).save(output_path)
+        finally:
+            _active.release()
+
+    threading.Thread(target=worker, name='sampling-profiler', daemon=True).start()
+    return True
+
+
+def _on_signal(signum, frame):
+    try:
+        with open(PROFILE_REQUEST_PATH, encoding='utf-8') as f:
+            request = json.load(f)
+        profile_to_file(float(request['seconds']), request['output'], float(request.get('interval', 0.01)))
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"⚠️ 프로파일링 요청 처리 실패: {e}")
+
+
+def install_signal_handler():
+    """SIGUSR1 수신 시 요청 파일 기준으로 프로파일링 시작 (메인 스레드에서 호출)"""
+    if hasattr(signal, 'SIGUSR1') and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, _on_signal)
+        return True
+    return False
+
+
+_requesting = threading.Lock()
+
+
+def request_profile(pid, seconds, output_path, interval=0.01, timeout=None):
+    """다른 프로세스에 프로파일링 요청 후 결과 파일이 생길 때까지 대기, 결과 문자열 반환
+
+    - 다른 요청이 진행 중이면 기다리지 않고 False, 시간 초과 시 None
+    - 결과는 요청마다 다른 파일(output_path 뒤에 요청 번호)에 기록 후 읽고 삭제
+      (시간 초과된 이전 요청의 결과가 늦게 기록되어도 다음 요청 결과와 섞이지 않고, 다음 요청 때 삭제)
+    """
+    if not _requesting.acquire(blocking=False):
+        return False
+    try:
+        for stale in glob.glob(f"{glob.escape(output_path)}.*"):
+            os.remove(stale)
+        return _request_profile(pid, seconds, f"{output_path}.{time.time_ns()}", interval, timeout)
+    finally:
+        _requesting.release()
+
+
+def _request_profile(pid, seconds, output_path, interval, timeout):
+    tmp_path = f"{PROFILE_REQUEST_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'seconds': seconds, 'output': output_path, 'interval': interval}, f)
+    os.replace(tmp_path, PROFILE_REQUEST_PATH)
+    os.kill(pid, signal.SIGUSR1)
+
+    deadline = time.monotonic() + (timeout if timeout is not None else seconds + 10)
+    while time.monotonic() < deadline:
+        if os.path.exists(output_path):
+            with open(output_path, encoding='utf-8') as f:
+                folded = f.read()
+            os.remove(output_path)
+            return folded
+        time.sleep(0.2)
+    return None
@@ -0,0 +1,122 @@
+"""
+힙 기반 이벤트 스케줄러
+
+- 장 시작/매수 시작/일괄 매도/종료 같은 일정과 주기 작업을 정확한 시각에 실행
+- 다음 작업 시각까지 잠들기 때문에 바쁜 대기(polling) 없이 동작
+- 주기 작업은 예정 시각 기준으로 다음 실행 시각을 계산하여 밀리거나 두 번 실행되지 않음
+- 작업 하나가 예외를 내도 기록만 하고 나머지 일정(일괄 매도/종료 등)은 계속 실행, 주기 작업은 다음 회차 예약
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """예약된 작업"""
+
+    def __init__(self, when, callback, interval=None, until=None, name=None):
+        self.when = when  # 다음 실행 시각 (epoch 초)
+        self.callback = callback
+        self.interval = interval  # 주기 (초), None 이면 1회 실행
+        self.until = until  # 주기 작업 종료 시각 (epoch 초)
+        self.name = name or getattr(callback, '__name__', 'job')
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class EventScheduler:
+    """일정/주기 작업 스케줄러"""
+
+    def __init__(self, clock=time.time, sleep=None, on_idle=None):
+        self.clock = clock
+        self.on_idle = on_idle  # 다음 작업 시각까지 대기한 시간(초)을 전달받는 함수
+        self._heap = []
+        self._counter = itertools.count()  # 같은 시각 작업은 등록 순서대로 실행
+        self._wakeup = threading.Event()
+        self._sleep = sleep or self._wait
+        self._stopped = False
+
+    def _wait(self, seconds):
+        self._wakeup.wait(seconds)
+        self._wakeup.clear()
+
+    def _push(self, job):
+        heapq.heappush(self._heap, (job.when, next(self._counter), job))
+        self._wakeup.set()
+        return job
+
+    def at(self, when, callback, name=None):
+        """지정 시각(epoch 초 또는 datetime)에 1회 실행"""
+        if hasattr(when, 'timestamp'):
+            when = when.timestamp()
+        return self._push(Job(when, callback, name=name))
+
+    def every(self, interval, callback, start=None, until=None, align=False, offset=0, name=None):
+        """주기 실행 (align=True 면 interval 배수 시각 + offset(초)에 실행, 예: interval=3600, offset=1800 이면 매시 30분)"""
+        if hasattr(start, 'timestamp'):
+            start = start.timestamp()
+        if hasattr(until, 'timestamp'):
+            until = until.timestamp()
+        # 이미 지난 시작 시각은 현재 시각부터 실행
+        first = self.clock() if start is None else max(start, self.clock())
+        if align:
+            first = -(-(first - offset) // interval) * interval + offset  # 올림
+        job = Job(first, callback, interval=interval, until=until, name=name)
+        if until is not None and first >= until:
+            return job
+        return self._push(job)
+
+    def next_time(self):
+        """다음 실행 예정 시각 (없으면 None)"""
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def run_pending(self):
+        """실행 시각이 된 작업 실행, 실행한 작업 수 반환"""
+        executed = 0
+        while not self._stopped:
+            next_time = self.next_time()
+            if next_time is None or next_time > self.clock():
+                break
+            _, _, job = heapq.heappop(self._heap)
+            try:
+                job.callback()
+            except Exception as e:
+                logger.error(f"⚠️ 예약 작업 실패 ({job.name}): {e}", exc_info=True, extra={'event': 'job_failed', 'job': job.name})
+            executed += 1
+            if job.interval and not job.cancelled:
+                # 예정 시각 기준으로 다음 실행 시각 계산, 이미 지난 회차는 건너뜀
+                now = self.clock()
+                job.when += job.interval
+                if job.when <= now:
+                    job.when += (now - job.when) // job.interval * job.interval + job.interval
+                if job.until is None or job.when < job.until:
+                    self._push(job)
+        return executed
+
+    def stop(self):
+        """run() 종료"""
+        self._stopped = True
+        self._wakeup.set()
+
+    def run(self):
+        """등록된 작업이 없거나 stop() 이 호출될 때까지 실행"""
+        self._stopped = False
+        while not self._stopped:
+            self.run_pending()
+            next_time = self.next_time()
+            if self._stopped or next_time is None:
+                break
+            wait = next_time - self.clock()
+            if wait > 0:
+                started = self.clock()
+                self._sleep(wait)
+                if self.on_idle:
+                    self.on_idle(self.clock() - started)
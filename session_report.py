@@ -0,0 +1,296 @@
+"""
+장 마감 후 매매 분석
+
+- 당일 주문 집행 기록(executions.jsonl)과 장중 1분봉(매매 중 조회한 시세)만으로 분석 (추가 API 호출 없음)
+- 거래별 손익: 종목별로 포지션이 0에서 다시 0이 될 때까지를 거래 하나로 보고 평균 매수가 대비 매도 손익 계산
+- 슬리피지: 매매 판단 가격 대비 평균 체결가 (bp, 양수면 손해)
+- 돌파 → 주문 시간: 분봉 고가가 처음 목표가를 넘은 분의 시작 시각부터 매수 주문까지 (분봉 기준이라 최대 1분 길게 추정)
+- 손절 초과: 손절/트레일링스탑 가격보다 낮게 체결된 비율과 평균 초과폭 (bp)
+- 지연 비용 (달러): 감지 지연(기준가를 넘은 뒤 판단 시점까지의 가격 변화) + 주문 지연(판단 가격 대비 체결 가격 차이)
+- 주문/분봉을 배열로 바꿔 한 번에 계산하므로 하루치 데이터는 1초 안에 처리
+
+사용법: python session_report.py [YYYYMMDD]  (기본: 뉴욕 기준 오늘)
+"""
+import datetime
+import json
+import math
+import os
+import sys
+
+import numpy as np
+from pytz import timezone
+
+from bar_store import BarStore
+from execution import EXECUTION_LOG_PATH, session_log_path
+
+SESSION_REPORT_DIR = os.getenv('SESSION_REPORT_DIR', os.path.join('data', 'reports'))
+SUMMARY_MAX_LENGTH = 1900  # Discord 메시지 길이 제한(2000자)에서 전송 시각 표시 여유를 뺀 길이
+STOP_REASONS = ('stop_loss', 'trailing_stop')
+US_TZ = timezone('America/New_York')
+
+
+def load_executions(path=None, session_date=None, tz=US_TZ):
+    """집행 기록 중 session_date(YYYYMMDD, tz 기준)의 주문만 읽음 (재시작 전 주문 포함)
+
+    거래일별 파일(executions_YYYYMMDD.jsonl)을 읽고, 없으면 거래일별로 나누기 전의 단일 파일에서 찾음
+    """
+    path = path or EXECUTION_LOG_PATH
+    if session_date and os.path.exists(session_log_path(path, session_date)):
+        path = session_log_path(path, session_date)
+    rows = []
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # 기록 중 종료되어 잘린 줄
+                if datetime.datetime.fromtimestamp(row.get('timestamp', 0), tz).strftime('%Y%m%d') == session_date:
+                    rows.append(row)
+    except FileNotFoundError:
+        pass
+    return rows
+
+
+def _columns(rows):
+    """집행 기록 목록을 열별 배열로 변환 (체결된 주문만, 시각 순)"""
+    rows = sorted((row for row in rows if row.get('filled_qty')), key=lambda row: row.get('timestamp', 0))
+
+    def column(key, default=0.0):
+        return np.array([row.get(key) or default for row in rows], dtype=float)
+
+    return {
+        'code': np.array([row['code'] for row in rows], dtype=object),
+        'buy': np.array([row['side'] == 'buy' for row in rows], dtype=bool),
+        'reason': np.array([row.get('reason') or '' for row in rows], dtype=object),
+        'qty': column('filled_qty'),
+        'price': column('avg_price'),
+        'decision': column('decision_price'),
+        'trigger': column('trigger_price'),
+        'timestamp': column('timestamp'),
+        'elapsed': column('elapsed'),
+    }
+
+
+def round_trips(orders):
+    """종목별 포지션이 0에서 시작해 다시 0이 될 때까지를 거래 하나로 묶어 거래별 손익 계산"""
+    order = np.lexsort((orders['timestamp'], orders['code'].astype(str)))
+    code = orders['code'][order]
+    buy = orders['buy'][order]
+    qty = orders['qty'][order]
+    price = orders['price'][order]
+    timestamp = orders['timestamp'][order]
+    n = len(code)
+    if n == 0:
+        return []
+
+    # 종목별 누적 포지션 (주문 직전)
+    signed = np.where(buy, qty, -qty)
+    before = np.cumsum(signed) - signed
+    first = np.r_[True, code[1:] != code[:-1]]
+    group_start = np.maximum.accumulate(np.where(first, np.arange(n), 0))
+    position = before - before[group_start]
+    trip = np.cumsum(first | (buy & (position <= 0))) - 1
+    count = trip[-1] + 1
+
+    buy_qty = np.bincount(trip, np.where(buy, qty, 0), count)
+    buy_value = np.bincount(trip, np.where(buy, qty * price, 0), count)
+    sell_qty = np.bincount(trip, np.where(buy, 0, qty), count)
+    sell_value = np.bincount(trip, np.where(buy, 0, qty * price), count)
+    entered = np.full(count, np.nan)
+    exited = np.full(count, np.nan)
+    np.fmin.at(entered, trip[buy], timestamp[buy])
+    np.fmax.at(exited, trip[~buy], timestamp[~buy])
+    last_sell = np.full(count, -1)
+    np.maximum.at(last_sell, trip[~buy], np.arange(n)[~buy])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        entry_price = buy_value / buy_qty
+        exit_price = sell_value / sell_qty
+        pnl = np.where(sell_qty > 0, sell_value - entry_price * sell_qty, np.nan)
+        pnl_pct = exit_price / entry_price - 1
+
+    codes = code[np.searchsorted(trip, np.arange(count))]
+    reasons = orders['reason'][order]
+    return [{
+        'code': codes[i],
+        'qty': float(buy_qty[i]),
+        'entry_price': entry_price[i],
+        'exit_price': exit_price[i],
+        'entry_time': entered[i],
+        'exit_time': exited[i],
+        'exit_reason': reasons[last_sell[i]] if last_sell[i] >= 0 else '',
+        'pnl': pnl[i],
+        'pnl_pct': pnl_pct[i],
+        'open': bool(buy_qty[i] > sell_qty[i]),
+    } for i in range(count)]
+
+
+def breakout_delays(orders, minute_bars):
+    """매수 주문별 목표가 돌파 → 주문 시간 (초), 분봉에서 돌파를 찾지 못하면 nan"""
+    delays = np.full(len(orders['code']), np.nan)
+    rows = np.flatnonzero(orders['buy'] & (orders['trigger'] > 0))
+    for row in rows:
+        bars = minute_bars.get(orders['code'][row])
+        if bars is None or not len(bars):
+            continue
+        ts = orders['timestamp'][row]
+        # 같은 종목의 직전 매도 이후 분봉에서만 돌파 탐색 (재진입 시 이전 돌파 제외)
+        earlier = (orders['code'] == orders['code'][row]) & ~orders['buy'] & (orders['timestamp'] < ts)
+        since = orders['timestamp'][earlier].max() if earlier.any() else -np.inf
+        start = bars['minute'] * 60.0
+        crossed = (bars['high'] > orders['trigger'][row]) & (start <= ts) & (start + 60 > since)
+        if crossed.any():
+            delays[row] = ts - max(start[np.argmax(crossed)], since)
+    return delays
+
+
+def _stats(values):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {'count': 0, 'median': None, 'p90': None, 'max': None}
+    return {
+        'count': int(len(values)),
+        'median': float(np.median(values)),
+        'p90': float(np.percentile(values, 90)),
+        'max': float(values.max()),
+    }
+
+
+def _clean(value):
+    """JSON 저장용 변환 (nan → None, NumPy 값 → 파이썬 값)"""
+    if isinstance(value, dict):
+        return {key: _clean(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clean(item) for item in value]
+    if isinstance(value, (np.floating, float)):
+        return None if math.isnan(value) else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def build_report(rows, minute_bars, session_date):
+    """집행 기록(ExecutionReport.to_dict 목록)과 {종목코드: 1분봉 배열}로 분석 결과 생성"""
+    orders = _columns(rows)
+    buy = orders['buy']
+    qty = orders['qty']
+    sign = np.where(buy, 1.0, -1.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slippage_bps = sign * (orders['price'] - orders['decision']) / orders['decision'] * 10000
+    value = qty * orders['price']
+    has_trigger = orders['trigger'] > 0
+
+    # 손절 초과: 손절/트레일링스탑 가격 대비 체결가가 더 낮은 정도
+    stops = ~buy & has_trigger & np.isin(orders['reason'], STOP_REASONS)
+    overshoot_bps = (orders['trigger'] - orders['price']) / np.where(stops, orders['trigger'], 1.0) * 10000
+    overshoot = overshoot_bps[stops]
+
+    # 지연 비용: 기준가 → 판단 가격 (감지 지연), 판단 가격 → 체결가 (주문 지연)
+    detection = np.where(has_trigger & (buy | stops), sign * (orders['decision'] - orders['trigger']) * qty, 0.0)
+    execution = sign * (orders['price'] - orders['decision']) * qty
+
+    trips = round_trips(orders)
+    closed = [trip for trip in trips if not trip['open'] and not math.isnan(trip['pnl'])]
+    realized = float(sum(trip['pnl'] for trip in closed))
+    delays = breakout_delays(orders, minute_bars)
+
+    summary = {
+        'orders': int(len(qty)),
+        'trades': len(closed),
+        'wins': sum(trip['pnl'] > 0 for trip in closed),
+        'realized_pnl': realized,
+        'traded_value': float(value.sum()),
+        'avg_slippage_bps': float((slippage_bps * value).sum() / value.sum()) if value.sum() > 0 else None,
+        'order_elapsed': _stats(orders['elapsed']),
+        'breakout_to_order': _stats(delays),
+        'stops': int(stops.sum()),
+        'stops_overshot': int((overshoot > 0).sum()),
+        'avg_overshoot_bps': float(overshoot.mean()) if len(overshoot) else None,
+        'latency_cost': {
+            'detection': float(detection.sum()),
+            'execution': float(execution.sum()),
+            'total': float(detection.sum() + execution.sum()),
+        },
+    }
+    order_rows = [{
+        'code': orders['code'][i],
+        'side': 'buy' if buy[i] else 'sell',
+        'reason': orders['reason'][i],
+        'qty': qty[i],
+        'price': orders['price'][i],
+        'decision_price': orders['decision'][i],
+        'trigger_price': orders['trigger'][i] if has_trigger[i] else None,
+        'slippage_bps': slippage_bps[i],
+        'overshoot_bps': overshoot_bps[i] if stops[i] else None,
+        'breakout_to_order': delays[i],
+        'elapsed': orders['elapsed'][i],
+        'timestamp': orders['timestamp'][i],
+    } for i in range(len(qty))]
+    return _clean({'date': session_date, 'summary': summary, 'trades': trips, 'orders': order_rows})
+
+
+def format_summary(report, max_length=SUMMARY_MAX_LENGTH):
+    """Discord 전송용 요약 (max_length 를 넘으면 거래별 손익을 줄이고 생략한 건수 표시)"""
+    s = report['summary']
+    if not s['orders']:
+        return f"🧾 {report['date']} 매매 분석: 체결된 주문 없음"
+    lines = [
+        f"🧾 {report['date']} 매매 분석",
+        f"거래 {s['trades']}건 (수익 {s['wins']}건), 실현손익 ${s['realized_pnl']:+,.2f}, 평균 슬리피지 {s['avg_slippage_bps'] or 0:+.1f}bp",
+    ]
+    delay = s['breakout_to_order']
+    if delay['count']:
+        lines.append(f"돌파 → 주문: 중앙값 {delay['median']:.0f}초, 90% {delay['p90']:.0f}초")
+    if s['stops']:
+        lines.append(f"손절 초과: {s['stops_overshot']}/{s['stops']}건, 평균 {s['avg_overshoot_bps']:+.1f}bp")
+    cost = s['latency_cost']
+    lines.append(f"지연 비용: ${cost['total']:,.2f} (감지 ${cost['detection']:,.2f}, 주문 ${cost['execution']:,.2f})")
+    trips = [
+        f"- {trip['code']} {trip['exit_reason'] or ('보유 중' if trip['open'] else '-')}: ${trip['pnl']:+,.2f} ({(trip['pnl_pct'] or 0):+.2%})"
+        for trip in report['trades'] if trip['pnl'] is not None
+    ]
+    length = sum(len(line) + 1 for line in lines)
+    for i, line in enumerate(trips):
+        omitted = f"... 외 {len(trips) - i}건 (전체는 분석 파일 참고)"
+        # 남은 거래를 모두 넣을 수 없으면 생략 표시가 들어갈 자리를 남기고 중단
+        if length + len(line) + 1 + (len(omitted) + 1 if i < len(trips) - 1 else 0) > max_length:
+            lines.append(omitted)
+            break
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)[:max_length]
+
+
+def save_report(report, directory=None):
+    """분석 결과를 거래일별 JSON 파일로 저장하고 경로 반환"""
+    directory = directory or SESSION_REPORT_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"session_{report['date']}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def main(argv=None):
+    """저장된 집행 기록과 분봉으로 다시 분석 (예: 장 마감 후 수동 실행)"""
+    argv = sys.argv[1:] if argv is None else argv
+    session_date = argv[0] if argv else datetime.datetime.now(US_TZ).strftime('%Y%m%d')
+    rows = load_executions(session_date=session_date)
+    store = BarStore()
+    minute_bars = {}
+    for code in {row['code'] for row in rows}:
+        for market in ('NAS', 'NYS', 'AMS'):
+            bars = store.load_minute_bars(market, code, session_date)
+            if len(bars):
+                minute_bars[code] = bars
+                break
+    report = build_report(rows, minute_bars, session_date)
+    print(format_summary(report))
+    print(f"📄 {save_report(report)}")
+
+
+if __name__ == '__main__':
+    main()
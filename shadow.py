@@ -0,0 +1,161 @@
+"""
+그림자(shadow) 전략 실행기
+
+- 위험관리/변동성 돌파 파라미터를 바꾼 변형 N개를 실제 전략과 같은 시세로 동시에 모의 실행
+  (추가 API 호출 없음, 체결은 조회한 시세에 slippage_bps 를 반영해 즉시 체결로 가정)
+- 변형별 상태는 (변형 수 V, 종목 수 S) 배열 몇 개뿐이고, 매 틱 NumPy 연산 한 번으로 전체 변형을 갱신
+- 변형마다 자본을 1로 보고 종목당 1/max_positions 씩 매수, 손익은 자본 대비 비율
+- 장 마감 시 보유 포지션은 마지막 시세로 청산하고 변형별 손익/거래 수/승률을 보고
+"""
+import itertools
+import json
+import os
+
+import numpy as np
+
+SHADOW_REPORT_PATH = os.getenv('SHADOW_REPORT_PATH', 'shadow_report.json')
+
+# 변형 파라미터 (이름: 실제 전략 설정 키)
+PARAMS = ('STOP_LOSS_PCT', 'TAKE_PROFIT_PCT', 'TRAILING_STOP_PCT', 'TRAILING_ACTIVATION_PCT', 'MULTIPLIER_SCALE')
+
+
+def parse_grid(spec, base):
+    """'STOP_LOSS_PCT=0.01,0.02;MULTIPLIER_SCALE=0.8,1.2' 형식을 파라미터 조합 목록으로 변환
+
+    지정하지 않은 파라미터는 base(실제 전략 설정) 값 사용, 첫 번째 변형은 항상 실제 전략 설정
+    """
+    base = {name: float(base.get(name, 1.0)) for name in PARAMS}
+    axes = {}
+    for item in (spec or '').split(';'):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, values = item.partition('=')
+        name = name.strip().upper()
+        if name not in PARAMS:
+            raise ValueError(f"지원하지 않는 그림자 전략 파라미터입니다: {name}")
+        axes[name] = [float(value) for value in values.split(',') if value.strip()]
+    variants = [base]
+    for values in itertools.product(*axes.values()):
+        variant = dict(base, **dict(zip(axes, values)))
+        if variant not in variants:
+            variants.append(variant)
+    return variants
+
+
+class ShadowRunner:
+    """파라미터 변형 V개의 포지션을 (V, S) 배열로 관리하는 모의 실행기"""
+
+    def __init__(self, variants, max_positions, slippage_bps=5.0):
+        self.variants = list(variants)
+        self.max_positions = max_positions
+        self.slippage = slippage_bps / 10000
+        for name in PARAMS:
+            setattr(self, name.lower(), np.array([variant[name] for variant in self.variants], dtype=float)[:, None])
+        self.symbols = []
+        self.index = {}
+        n = len(self.variants)
+        self.entry = np.empty((n, 0))  # 매수 가격 (미보유 nan)
+        self.highest = np.empty((n, 0))  # 보유 중 최고가
+        self.target = np.empty((n, 0))  # 변형별 목표가
+        self.volatility = np.empty(0)
+        self.last = np.empty(0)  # 종목별 마지막 시세
+        self.realized = np.zeros(n)  # 실현 손익 (자본 대비)
+        self.trades = np.zeros(n, dtype=int)
+        self.wins = np.zeros(n, dtype=int)
+
+    def _ensure(self, symbol):
+        """종목 열 추가 (종목은 늘어나기만 함)"""
+        j = self.index.get(symbol)
+        if j is None:
+            j = self.index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            column = np.full((len(self.variants), 1), np.nan)
+            self.entry = np.hstack([self.entry, column])
+            self.highest = np.hstack([self.highest, column])
+            self.target = np.hstack([self.target, column])
+            self.volatility = np.append(self.volatility, np.nan)
+            self.last = np.append(self.last, np.nan)
+        return j
+
+    def has_target(self, symbol):
+        j = self.index.get(symbol)
+        return j is not None and not np.isnan(self.target[0, j])
+
+    def set_target(self, symbol, open_price, price_range, multiplier, volatility):
+        """변동성 돌파 목표가 입력 (시가 + 전일 변동폭 × 승수), 변형별 승수 배율 적용"""
+        j = self._ensure(symbol)
+        self.target[:, j] = open_price + price_range * multiplier * self.multiplier_scale[:, 0]
+        self.volatility[j] = volatility
+
+    def update(self, symbols, prices):
+        """이번 틱에 조회한 종목의 시세로 전체 변형의 청산/진입 판단"""
+        columns = [self._ensure(symbol) for symbol in symbols]
+        quote = np.full(len(self.symbols), np.nan)
+        quote[columns] = prices
+        quoted = ~np.isnan(quote)
+        self.last = np.where(quoted, quote, self.last)
+        price = quote[None, :]
+
+        # 1. 청산 (손절 → 트레일링스탑 → 익절, 실제 전략과 같은 조건)
+        held = ~np.isnan(self.entry) & quoted
+        with np.errstate(invalid='ignore'):
+            self.highest = np.where(held, np.fmax(self.highest, price), self.highest)
+            stop = price <= self.entry * (1 - self.stop_loss_pct)
+            trailing = (self.highest > self.entry * (1 + self.trailing_activation_pct)) & \
+                       (price <= self.highest * (1 - self.trailing_stop_pct))
+            take = price >= self.entry * (1 + self.take_profit_pct)
+        self._close(held & (stop | trailing | take), price)
+
+        # 2. 진입 (남은 종목 수 안에서 돌파 강도 순)
+        held = ~np.isnan(self.entry)
+        slots = self.max_positions - held.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            candidate = quoted & ~held & (price > self.target)
+            score = np.where(candidate, (price / self.target - 1) / self.volatility, -np.inf)
+        if not candidate.any():
+            return
+        order = np.argsort(-score, axis=1, kind='stable')
+        rank = np.empty_like(order)
+        np.put_along_axis(rank, order, np.arange(order.shape[1])[None, :].repeat(len(order), axis=0), axis=1)
+        enter = candidate & (rank < slots[:, None])
+        fill = np.broadcast_to(price * (1 + self.slippage), enter.shape)
+        self.entry = np.where(enter, fill, self.entry)
+        self.highest = np.where(enter, price, self.highest)
+
+    def _close(self, mask, price):
+        if not mask.any():
+            return
+        with np.errstate(invalid='ignore'):
+            pnl = (price * (1 - self.slippage) / self.entry - 1) / self.max_positions
+        pnl = np.where(mask, pnl, 0.0)
+        self.realized += pnl.sum(axis=1)
+        self.trades += mask.sum(axis=1)
+        self.wins += (mask & (pnl > 0)).sum(axis=1)
+        self.entry = np.where(mask, np.nan, self.entry)
+        self.highest = np.where(mask, np.nan, self.highest)
+
+    def close_all(self):
+        """보유 포지션을 종목별 마지막 시세로 청산 (장 마감 일괄 매도)"""
+        held = ~np.isnan(self.entry) & ~np.isnan(self.last)[None, :]
+        self._close(held, self.last[None, :])
+
+    def report(self):
+        """변형별 결과 (손익 내림차순), 첫 번째 변형(live)은 실제 전략 설정"""
+        rows = []
+        for i, variant in enumerate(self.variants):
+            rows.append({
+                'variant': 'live' if i == 0 else i,
+                'params': variant,
+                'pnl_pct': float(self.realized[i] * 100),
+                'trades': int(self.trades[i]),
+                'win_rate': float(self.wins[i] / self.trades[i]) if self.trades[i] else None,
+            })
+        return sorted(rows, key=lambda row: row['pnl_pct'], reverse=True)
+
+    def save(self, path=None, session_date=None):
+        path = path or SHADOW_REPORT_PATH
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'date': session_date, 'symbols': self.symbols, 'variants': self.report()}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
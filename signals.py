@@ -0,0 +1,175 @@
+"""
+매수 신호 플러그인
+
+- 신호는 관심 종목 전체의 시세를 배열로 묶은 MarketSnapshot 을 받아 종목별 점수 배열을 반환
+  (점수 > 0 이면 매수 신호, 클수록 강함, 판단 불가는 nan)
+- 기본 제공: 변동성 돌파(breakout), 모멘텀(momentum), 평균 회귀(mean_reversion), 장중 모멘텀(intraday_momentum)
+- 여러 신호는 SignalCombiner 의 정책(all/any/weighted)으로 합쳐서 종목별 최종 점수를 계산
+- 새 신호는 Signal 을 상속해 score() 에 NumPy 식 하나를 작성하고 SIGNALS 에 등록
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class MarketSnapshot:
+    """관심 종목 전체의 시세 스냅샷 (모든 배열의 첫 번째 축은 symbols 순서)"""
+    symbols: list
+    price: np.ndarray  # 현재가 (S,), 조회 실패는 nan
+    target: np.ndarray  # 변동성 돌파 목표가 (S,)
+    volatility: np.ndarray  # 연환산 변동성 (S,)
+    daily_close: np.ndarray  # 완료된 일봉 종가 (S, D), 오른쪽이 전일, 부족한 앞부분은 nan
+    intraday_close: np.ndarray = None  # 1분봉 종가 (S, M), 필요한 신호가 있을 때만 채움
+
+
+def stack_series(series_list, length):
+    """종목별 1차원 배열들을 오른쪽 정렬한 (S, length) 행렬로 변환 (부족한 앞부분은 nan)"""
+    matrix = np.full((len(series_list), length), np.nan)
+    if length == 0:
+        return matrix
+    for i, series in enumerate(series_list):
+        values = np.asarray(series, dtype=float)[-length:]
+        if len(values):
+            matrix[i, length - len(values):] = values
+    return matrix
+
+
+class Signal:
+    """신호 기본 클래스"""
+    name = 'signal'
+    daily_lookback = 0  # 필요한 일봉 수
+    intraday_lookback = 0  # 필요한 1분봉 수 (0 이면 장중 분봉 사용 안 함)
+
+    def score(self, snapshot):
+        raise NotImplementedError
+
+
+class BreakoutSignal(Signal):
+    """변동성 돌파: 목표가 대비 돌파폭을 변동성으로 나눈 값"""
+    name = 'breakout'
+
+    def score(self, snapshot):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (snapshot.price / snapshot.target - 1) / snapshot.volatility
+
+
+class MomentumSignal(Signal):
+    """모멘텀: N일 전 종가 대비 수익률을 기간 변동성으로 나눈 값"""
+    name = 'momentum'
+
+    def __init__(self, days=20):
+        self.days = int(days)
+        self.daily_lookback = self.days
+
+    def score(self, snapshot):
+        past = snapshot.daily_close[:, -self.days]
+        horizon_vol = snapshot.volatility * np.sqrt(self.days / 252)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (snapshot.price / past - 1) / horizon_vol
+
+
+class MeanReversionSignal(Signal):
+    """평균 회귀: 현재가가 N일 평균보다 낮을수록 큰 점수 (-z 점수)"""
+    name = 'mean_reversion'
+
+    def __init__(self, days=5):
+        self.days = int(days)
+        self.daily_lookback = self.days
+
+    def score(self, snapshot):
+        closes = snapshot.daily_close[:, -self.days:]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.nanmean(closes, axis=1)
+            std = np.nanstd(closes, axis=1, ddof=1)
+            return (mean - snapshot.price) / std
+
+
+class IntradayMomentumSignal(Signal):
+    """장중 모멘텀: 최근 N분 전 1분봉 종가 대비 수익률을 분 단위 변동성으로 나눈 값"""
+    name = 'intraday_momentum'
+
+    def __init__(self, minutes=30):
+        self.minutes = int(minutes)
+        self.intraday_lookback = self.minutes
+
+    def score(self, snapshot):
+        past = snapshot.intraday_close[:, -self.minutes]
+        horizon_vol = snapshot.volatility * np.sqrt(self.minutes / (252 * 390))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (snapshot.price / past - 1) / horizon_vol
+
+
+SIGNALS = {
+    'breakout': BreakoutSignal,
+    'momentum': MomentumSignal,
+    'mean_reversion': MeanReversionSignal,
+    'intraday_momentum': IntradayMomentumSignal,
+}
+
+POLICIES = ('all', 'any', 'weighted')
+
+
+def parse_signals(spec):
+    """'breakout,momentum:20=0.5' 형식 문자열을 [(신호, 가중치)] 로 변환 (':' 뒤는 기간, '=' 뒤는 가중치)"""
+    signals = []
+    for item in (spec or 'breakout').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        weight = 1.0
+        if '=' in item:
+            item, weight = item.split('=', 1)
+            weight = float(weight)
+        name, _, period = item.partition(':')
+        if name not in SIGNALS:
+            raise ValueError(f"지원하지 않는 신호입니다: {name}")
+        signal = SIGNALS[name](period) if period else SIGNALS[name]()
+        signals.append((signal, weight))
+    return signals
+
+
+class SignalCombiner:
+    """신호 조합 정책
+
+    - all: 모든 신호가 양수일 때만 매수, 점수는 가중 평균
+    - any: 하나라도 양수면 매수, 점수는 양수 신호의 가중 합
+    - weighted: 가중 합이 threshold 보다 크면 매수
+    """
+
+    def __init__(self, signals, policy='all', threshold=0.0):
+        if policy not in POLICIES:
+            raise ValueError(f"지원하지 않는 신호 조합 정책입니다: {policy}")
+        self.signals = [signal for signal, _ in signals]
+        self.weights = np.array([weight for _, weight in signals], dtype=float)
+        self.policy = policy
+        self.threshold = threshold
+
+    @property
+    def daily_lookback(self):
+        return max((signal.daily_lookback for signal in self.signals), default=0)
+
+    @property
+    def intraday_lookback(self):
+        return max((signal.intraday_lookback for signal in self.signals), default=0)
+
+    def scores(self, snapshot):
+        """신호별 점수 행렬 (K, S)"""
+        return np.vstack([signal.score(snapshot) for signal in self.signals])
+
+    def combine(self, snapshot):
+        """종목별 최종 점수 (S,), 매수 신호가 아니면 nan"""
+        scores = self.scores(snapshot)
+        weights = self.weights[:, None]
+        valid = ~np.isnan(scores).any(axis=0)
+        if self.policy == 'all':
+            entry = valid & (scores > 0).all(axis=0)
+            combined = (scores * weights).sum(axis=0) / self.weights.sum()
+        elif self.policy == 'any':
+            positive = np.where(scores > 0, scores, 0.0)
+            entry = (scores > 0).any(axis=0)
+            combined = (positive * weights).sum(axis=0)
+        else:
+            combined = (scores * weights).sum(axis=0)
+            entry = valid & (combined > self.threshold)
+        return np.where(entry, combined, np.nan)
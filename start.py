@@ -4,15 +4,43 @@ Google Cloud Run용 시작 스크립트
 HTTP 헬스체크 서버와 자동매매 프로그램을 동시에 실행
 """
 import os
+import logging
 import threading
 import time
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
 import subprocess
 import json
+import sys
+
+from sampling_profiler import request_profile
+from structured_log import forward_line, setup_logging
+
+setup_logging()
+logger = logging.getLogger('start')
+
+# 컨테이너 시작 시각 (자동매매 프로그램의 시작 소요 시간 측정 기준)
+start_time = time.time()
 
 # 환경 변수에서 포트 가져오기 (Cloud Run 기본값: 8080)
 PORT = int(os.environ.get('PORT', 8080))
 
+# 자동매매 프로그램이 기록하는 시작 구간 측정 결과
+STARTUP_METRICS_PATH = os.environ.get('STARTUP_METRICS_PATH', 'startup_metrics.json')
+
+def load_startup_metrics():
+    """시작 구간 측정 결과 조회 (없으면 None)"""
+    try:
+        with open(STARTUP_METRICS_PATH, encoding='UTF-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# 프로파일링 결과 파일 및 최대 시간 (PROFILE_TOKEN 설정 시 /profile 호출에 token 파라미터 필요)
+PROFILE_OUTPUT_PATH = os.environ.get('PROFILE_OUTPUT_PATH', 'profile.folded')
+PROFILE_MAX_SECONDS = int(os.environ.get('PROFILE_MAX_SECONDS', 300))
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+
 # 자동매매 프로그램 상태 추적
 autotrade_process = None
 autotrade_status = {"status": "starting", "last_update": time.time()}
@@ -48,11 +76,46 @@ class HealthCheckHandler(BaseHTTPRequestHandler):
                 "process_id": autotrade_process.pid if is_running else None,
                 "status": autotrade_status["status"],
                 "last_update": autotrade_status["last_update"],
-                "uptime": time.time() - start_time
+                "uptime": time.time() - start_time,
+                "startup": load_startup_metrics()
             }
             
             self.wfile.write(json.dumps(status).encode())
             
+        elif self.path.startswith('/profile'):
+            # 자동매매 프로그램 샘플링 프로파일 (folded stack, 재시작 불필요)
+            params = parse_qs(urlparse(self.path).query)
+            if PROFILE_TOKEN and params.get('token', [''])[0] != PROFILE_TOKEN:
+                self.send_response(403)
+                self.end_headers()
+                return
+            if not (autotrade_process and autotrade_process.poll() is None):
+                self.send_response(503)
+                self.end_headers()
+                return
+            try:
+                seconds = min(max(float(params.get('seconds', ['30'])[0]), 1), PROFILE_MAX_SECONDS)
+                interval = float(params.get('interval', ['0.01'])[0])
+            except ValueError:
+                self.send_response(400)
+                self.end_headers()
+                return
+            folded = request_profile(autotrade_process.pid, seconds, PROFILE_OUTPUT_PATH, interval)
+            if folded is False:
+                # 다른 프로파일링 요청 진행 중
+                self.send_response(409)
+                self.end_headers()
+                return
+            if folded is None:
+                self.send_response(504)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-type', 'text/plain; charset=utf-8')
+            self.send_header('Content-Disposition', f'attachment; filename="profile-{int(time.time())}.folded"')
+            self.end_headers()
+            self.wfile.write(folded.encode())
+
         elif self.path == '/':
             # 기본 페이지
             self.send_response(200)
@@ -78,6 +141,7 @@ class HealthCheckHandler(BaseHTTPRequestHandler):
                 <ul>
                     <li><a href="/health">/health</a> - 헬스체크</li>
                     <li><a href="/status">/status</a> - 상세 상태</li>
+                    <li>/profile?seconds=30 - 샘플링 프로파일 (flame graph용 folded stack)</li>
                 </ul>
                 
                 <p><em>이 페이지는 30초마다 자동 새로고침됩니다.</em></p>
@@ -99,65 +163,77 @@ def run_autotrade():
     global autotrade_process, autotrade_status
     
     try:
-        print("🚀 자동매매 프로그램 시작...")
+        logger.info("🚀 자동매매 프로그램 시작...")
         autotrade_status["status"] = "running"
         autotrade_status["last_update"] = time.time()
         
-        # 자동매매 프로그램 실행
+        # 자동매매 프로그램 실행 (컨테이너 시작 시각을 넘겨 시작 소요 시간 측정)
+        env = dict(os.environ)
+        env['CONTAINER_START_TS'] = str(start_time)
+        env['PYTHONUNBUFFERED'] = '1'
         autotrade_process = subprocess.Popen(
-            ['python', 'UsaStockAutoTrade.py'],
+            [sys.executable, 'UsaStockAutoTrade.py'],
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
             universal_newlines=True,
-            bufsize=1
+            bufsize=1,
+            env=env
         )
         
-        # 출력 스트림 읽기
+        # 출력 스트림 읽기 (JSON 로그는 그대로 전달하고 event/severity 필드로 상태 업데이트)
         for line in iter(autotrade_process.stdout.readline, ''):
-            if line:
-                print(f"[AutoTrade] {line.strip()}")
-                autotrade_status["last_update"] = time.time()
-                
-                # 특정 키워드로 상태 업데이트
-                if "매수 성공" in line:
-                    autotrade_status["status"] = "trading_active"
-                elif "오류" in line:
-                    autotrade_status["status"] = "error"
-                elif "프로그램을 종료" in line:
-                    autotrade_status["status"] = "shutting_down"
+            line = line.strip()
+            if not line:
+                continue
+            autotrade_status["last_update"] = time.time()
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                entry = None
+            if not isinstance(entry, dict):
+                # JSON 이 아닌 출력 (예: 처리되지 않은 예외 traceback)
+                logger.warning(line, extra={'source': 'autotrade'})
+                continue
+            forward_line(line)
+
+            if entry.get("event") == "order_filled" and entry.get("side") == "buy":
+                autotrade_status["status"] = "trading_active"
+            elif entry.get("severity") in ("ERROR", "CRITICAL"):
+                autotrade_status["status"] = "error"
+            elif entry.get("event") == "shutdown":
+                autotrade_status["status"] = "shutting_down"
+            elif entry.get("event") == "standby":
+                autotrade_status["status"] = "standby"
+            elif entry.get("event") == "leader_takeover":
+                autotrade_status["status"] = "running"
         
         # 프로세스 종료 처리
         autotrade_process.wait()
-        print("❌ 자동매매 프로그램이 종료되었습니다.")
+        logger.warning("❌ 자동매매 프로그램이 종료되었습니다.", extra={'returncode': autotrade_process.returncode})
         autotrade_status["status"] = "stopped"
         autotrade_status["last_update"] = time.time()
         
     except Exception as e:
-        print(f"❌ 자동매매 프로그램 실행 오류: {e}")
+        logger.error(f"❌ 자동매매 프로그램 실행 오류: {e}")
         autotrade_status["status"] = "error"
         autotrade_status["last_update"] = time.time()
 
 def run_http_server():
     """HTTP 헬스체크 서버 실행"""
-    server = HTTPServer(('0.0.0.0', PORT), HealthCheckHandler)
-    print(f"🌐 HTTP 서버 시작 - 포트: {PORT}")
+    # 프로파일링 요청 처리 중에도 헬스체크에 응답하도록 요청별 스레드 사용
+    server = ThreadingHTTPServer(('0.0.0.0', PORT), HealthCheckHandler)
+    logger.info(f"🌐 HTTP 서버 시작 - 포트: {PORT}")
     server.serve_forever()
 
 if __name__ == "__main__":
-    start_time = time.time()
-    
-    print(f"🚀 Google Cloud Run 자동매매 컨테이너 시작")
-    print(f"📡 HTTP 서버 포트: {PORT}")
+    logger.info(f"🚀 Google Cloud Run 자동매매 컨테이너 시작 (HTTP 서버 포트: {PORT})")
     
     # HTTP 서버를 별도 스레드에서 실행
     http_thread = threading.Thread(target=run_http_server, daemon=True)
     http_thread.start()
     
-    # 잠시 대기 후 자동매매 프로그램 시작
-    time.sleep(2)
-    
-    # 자동매매 프로그램 실행 (메인 스레드에서)
+    # 자동매매 프로그램 실행 (메인 스레드에서, 헬스체크 서버는 이미 별도 스레드에서 동작)
     run_autotrade()
     
     # 프로그램이 종료되면 컨테이너도 종료
-    print("🔄 컨테이너 종료 중...")
\ No newline at end of file
+    logger.info("🔄 컨테이너 종료 중...")
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+시작(콜드 스타트) 구간별 소요 시간 측정
+
+- 컨테이너 시작 시각은 start.py 가 CONTAINER_START_TS 환경변수로 넘겨줌
+- STARTUP_PROFILE=1 이면 구간별 시간을 로그로 기록
+- 측정 결과는 STARTUP_METRICS_PATH(JSON)에 저장되어 start.py /status 에서 확인 가능
+- 장 시작 전에 실행된 경우 첫 시세 조회까지 일정을 기다린 시간은 빼고 따로 기록 (scheduled_wait)
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+STARTUP_PROFILE = os.getenv('STARTUP_PROFILE', '0') == '1'
+STARTUP_METRICS_PATH = os.getenv('STARTUP_METRICS_PATH', 'startup_metrics.json')
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfiler:
+    """시작 단계별 타이머"""
+
+    def __init__(self, origin=None):
+        # 컨테이너 시작 시각이 없으면 프로세스 시작 시각 기준
+        if origin is None:
+            origin = float(os.getenv('CONTAINER_START_TS', time.time()))
+        self.origin = origin
+        self.phases = []  # [(이름, 시작 오프셋, 소요 시간)]
+        self.marks = {}  # {이름: 컨테이너 시작 후 경과 시간}
+        self.scheduled_wait = 0.0  # 첫 시세 조회 전까지 스케줄러가 다음 일정을 기다린 시간
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """구간 소요 시간 측정"""
+        started = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - started
+            with self._lock:
+                self.phases.append((name, started - self.origin, elapsed))
+            if STARTUP_PROFILE:
+                logger.info(f"⏱️ [startup] {name}: {elapsed * 1000:.0f}ms", extra={'phase': name, 'latency_ms': elapsed * 1000})
+
+    def mark(self, name):
+        """특정 시점 기록 (최초 1회만)"""
+        with self._lock:
+            if name in self.marks:
+                return False
+            self.marks[name] = time.time() - self.origin
+        if STARTUP_PROFILE:
+            logger.info(f"⏱️ [startup] {name}: 컨테이너 시작 후 {self.marks[name]:.3f}s", extra={'phase': name})
+        return True
+
+    def add_idle(self, seconds):
+        """스케줄러 대기 시간 누적 (첫 시세 조회 이후 대기는 시작 시간과 무관하므로 제외)"""
+        with self._lock:
+            if 'first_price_check' not in self.marks:
+                self.scheduled_wait += seconds
+
+    def summary(self):
+        """측정 결과 요약"""
+        with self._lock:
+            result = {
+                "phases": [
+                    {"name": name, "offset": round(offset, 4), "elapsed": round(elapsed, 4)}
+                    for name, offset, elapsed in self.phases
+                ],
+                "marks": {name: round(value, 4) for name, value in self.marks.items()},
+            }
+            wait = self.scheduled_wait
+        # 인증 완료 ~ 첫 시세 조회 구간 (목표: 1초 이내, 일정 대기 시간 제외)
+        if 'auth_done' in self.marks and 'first_price_check' in self.marks:
+            result["auth_to_first_price_check"] = round(
+                self.marks['first_price_check'] - self.marks['auth_done'] - wait, 4)
+        if 'first_price_check' in self.marks:
+            result["time_to_first_price_check"] = round(self.marks['first_price_check'] - wait, 4)
+            result["scheduled_wait"] = round(wait, 4)
+        return result
+
+    def save(self, path=None):
+        """측정 결과를 JSON 파일로 저장"""
+        path = path or STARTUP_METRICS_PATH
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='UTF-8') as f:
+                json.dump(self.summary(), f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"⚠️ 시작 측정 결과 저장 실패: {e}")
+
+
+profiler = StartupProfiler()
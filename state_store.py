@@ -0,0 +1,186 @@
+"""
+매매 상태 저장소 (SQLite)
+
+- 매수가, 트레일링 스탑 최고가, 보유 종목, 목표가 등을 변경 즉시 기록
+- 트랜잭션 단위로 기록되어 프로세스가 비정상 종료되어도 마지막 변경까지 보존
+- 거래일(session) 단위로 구분하여 이전 거래일 상태는 시작 시 정리
+- listeners 에 등록한 함수로 변경 내용(op, namespace, key, value)을 전달 (대기 프로세스로 복제 등)
+- 파일 경로는 매매 프로그램이 지정 (같은 머신에서 시장별 프로그램이 같은 파일을 쓰지 않도록)
+- 한 파일은 한 프로세스만 사용 (이중화 대기 프로세스가 리더의 저장소를 열면 StoreInUse)
+"""
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+
+
+class StoreInUse(Exception):
+    """다른 프로세스가 사용 중인 상태 저장소"""
+
+
+class StateStore:
+    """거래일 단위 키-값 상태 저장소"""
+
+    def __init__(self, session, path):
+        self.session = session
+        self.path = path
+        self._lock = threading.Lock()
+        self.listeners = []  # 변경 시 호출 listener(op, namespace, key, value)
+        # 프로세스가 살아 있는 동안 잠금 유지 (비정상 종료 시 운영체제가 해제)
+        self._owner = open(f"{path}.lock", 'a')
+        try:
+            fcntl.flock(self._owner, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._owner.close()
+            raise StoreInUse(f"다른 프로세스가 사용 중인 상태 저장소입니다: {path} (STATE_DB_PATH 또는 INSTANCE_ID 를 다르게 지정)")
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            " session TEXT NOT NULL,"
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " PRIMARY KEY (session, namespace, key))"
+        )
+
+    def set(self, namespace, key, value):
+        """값 저장"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state (session, namespace, key, value) VALUES (?, ?, ?, ?)",
+                (self.session, namespace, str(key), json.dumps(value)),
+            )
+        self._notify('set', namespace, str(key), value)
+
+    def delete(self, namespace, key):
+        """값 삭제"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM state WHERE session = ? AND namespace = ? AND key = ?",
+                (self.session, namespace, str(key)),
+            )
+        self._notify('delete', namespace, str(key))
+
+    def clear(self, namespace):
+        """네임스페이스 전체 삭제"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM state WHERE session = ? AND namespace = ?",
+                (self.session, namespace),
+            )
+        self._notify('clear', namespace)
+
+    def _notify(self, op, namespace, key=None, value=None):
+        for listener in self.listeners:
+            listener(op, namespace, key, value)
+
+    def get(self, namespace, key, default=None):
+        """단일 값 조회"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM state WHERE session = ? AND namespace = ? AND key = ?",
+                (self.session, namespace, str(key)),
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def load(self, namespace):
+        """네임스페이스 전체 조회 {키: 값}"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM state WHERE session = ? AND namespace = ?",
+                (self.session, namespace),
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def purge_other_sessions(self):
+        """현재 거래일 이외의 상태 삭제"""
+        with self._lock:
+            self._conn.execute("DELETE FROM state WHERE session != ?", (self.session,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+        self._owner.close()
+
+
+class PersistentDict(dict):
+    """변경 시 저장소에 즉시 기록되는 dict"""
+
+    def __init__(self, store, namespace):
+        super().__init__(store.load(namespace))
+        self._store = store
+        self._namespace = namespace
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._store.set(self._namespace, key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._store.delete(self._namespace, key)
+
+    def pop(self, key, *default):
+        existed = key in self
+        value = super().pop(key, *default)
+        if existed:
+            self._store.delete(self._namespace, key)
+        return value
+
+    def clear(self):
+        super().clear()
+        self._store.clear(self._namespace)
+
+
+class PersistentSet(set):
+    """변경 시 저장소에 즉시 기록되는 set"""
+
+    def __init__(self, store, namespace):
+        super().__init__(store.load(namespace).keys())
+        self._store = store
+        self._namespace = namespace
+
+    def add(self, item):
+        if item not in self:
+            super().add(item)
+            self._store.set(self._namespace, item, True)
+
+    def discard(self, item):
+        if item in self:
+            super().discard(item)
+            self._store.delete(self._namespace, item)
+
+    def remove(self, item):
+        super().remove(item)
+        self._store.delete(self._namespace, item)
+
+    def clear(self):
+        super().clear()
+        self._store.clear(self._namespace)
+
+
+class PersistentList(list):
+    """변경 시 저장소에 즉시 기록되는 list (순서 보존, 중복 없는 종목 목록용)"""
+
+    def __init__(self, store, namespace):
+        saved = store.load(namespace)
+        super().__init__(item for item, _ in sorted(saved.items(), key=lambda kv: kv[1]))
+        self._store = store
+        self._namespace = namespace
+        self._seq = max(saved.values(), default=0)
+
+    def append(self, item):
+        super().append(item)
+        self._seq += 1
+        self._store.set(self._namespace, item, self._seq)
+
+    def remove(self, item):
+        super().remove(item)
+        if item not in self:
+            self._store.delete(self._namespace, item)
+
+    def clear(self):
+        super().clear()
+        self._store.clear(self._namespace)
@@ -0,0 +1,155 @@
+"""
+구조화(JSON) 로그
+
+- 한 줄에 하나의 JSON 객체로 기록 (Cloud Logging 이 severity/message 와 추가 필드를 그대로 인식)
+- 종목(symbol), API(endpoint), 소요 시간(latency_ms), 주문번호(order_id), 이벤트(event) 등은 extra 필드로 기록
+- 로그 호출은 큐에 넣기만 하고, 백그라운드 스레드가 모아서 한 번에 출력 (WARNING 이상은 즉시 출력)
+- 틱마다 남기는 DEBUG 로그는 레벨 확인이나 sampled() 로 대부분 건너뛰어 비용이 거의 없음
+"""
+import atexit
+import datetime
+import itertools
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', 50))  # 한 번에 출력할 최대 줄 수
+LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', 0.5))  # 최대 출력 지연 (초)
+
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """LogRecord 를 JSON 한 줄로 변환"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            'severity': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class AsyncBatchHandler(logging.Handler):
+    """큐 + 백그라운드 스레드로 모아서 출력하는 핸들러"""
+
+    def __init__(self, stream=None, batch_size=None, flush_interval=None, max_queue=10000):
+        super().__init__()
+        self.stream = stream or sys.stdout
+        self.batch_size = batch_size or LOG_BATCH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else LOG_FLUSH_INTERVAL
+        self.dropped = 0  # 큐가 가득 차서 버린 로그 수
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def emit(self, record):
+        # 메시지 문자열 생성은 출력 스레드에서 하지만, 인자는 호출 시점 값으로 고정
+        record.msg = record.getMessage()
+        record.args = None
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit_raw(self, line):
+        """이미 JSON 으로 만들어진 한 줄을 그대로 출력 (자식 프로세스 로그 전달용)"""
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write(self, lines):
+        if lines:
+            try:
+                self.stream.write('\n'.join(lines) + '\n')
+                self.stream.flush()
+            except (OSError, ValueError):
+                pass
+
+    def _run(self):
+        lines = []
+        while True:
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._write(lines)
+                lines = []
+                continue
+            if record is None:
+                self._write(lines)
+                return
+            if isinstance(record, str):
+                lines.append(record)
+                urgent = False
+            else:
+                try:
+                    lines.append(self.format(record))
+                except Exception:
+                    self.handleError(record)
+                urgent = record.levelno >= logging.WARNING
+            if len(lines) >= self.batch_size or urgent:
+                self._write(lines)
+                lines = []
+
+    def close(self):
+        """남은 로그를 모두 출력하고 종료"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+        super().close()
+
+
+_handler = None
+
+
+def setup_logging(level=None, stream=None):
+    """루트 로거에 JSON 비동기 핸들러 설치 (여러 번 호출해도 한 번만 설치)"""
+    global _handler
+    if _handler is None:
+        _handler = AsyncBatchHandler(stream)
+        _handler.setFormatter(JsonFormatter())
+        root = logging.getLogger()
+        root.handlers = [_handler]
+        atexit.register(_handler.close)
+    logging.getLogger().setLevel(level or LOG_LEVEL)
+    logging.getLogger('urllib3').setLevel(logging.WARNING)
+    return _handler
+
+
+def forward_line(line):
+    """JSON 로그 한 줄을 변환 없이 출력 큐에 추가"""
+    if _handler is None:
+        setup_logging()
+    _handler.emit_raw(line)
+
+
+def flush_logs():
+    """대기 중인 로그를 모두 출력하고 핸들러 종료 (프로그램 종료 직전 호출)"""
+    global _handler
+    if _handler is not None:
+        _handler.close()
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+
+
+_counters = {}
+
+
+def sampled(key, every):
+    """key 별로 every 번에 한 번만 True (틱마다 반복되는 로그 샘플링용)"""
+    counter = _counters.get(key)
+    if counter is None:
+        counter = _counters[key] = itertools.count()
+    return next(counter) % every == 0
@@ -0,0 +1,112 @@
+"""
+매매 설정 (관심 종목, 위험관리 기준, 포지션 사이징)
+
+- 기본값 → 환경변수 → 설정 파일(config.yaml) 순으로 덮어씀
+  (환경변수는 배포 시점에 고정되므로, 장중에 바꿀 값은 설정 파일에 작성)
+- 매매 틱 사이에 reload() 로 설정 파일 수정 시각만 확인하고, 바뀐 경우에만 다시 읽어 바뀐 항목을 반환
+- 목록 값은 YAML 리스트 또는 쉼표로 구분한 문자열 (예: NASD_SYMBOLS="TSLA,AAPL")
+- 잘못된 값으로 수정되면 경고 로그를 남기고 기존 설정을 유지
+"""
+import logging
+import os
+
+import yaml
+
+TRADING_CONFIG_PATH = os.getenv('TRADING_CONFIG_PATH', 'config.yaml')
+
+logger = logging.getLogger(__name__)
+
+# 해외 주식 (UsaStockAutoTrade.py)
+US_DEFAULTS = {
+    'NASD_SYMBOLS': ['TSLA', 'QCOM', 'SBUX', 'MSFT', 'INTC', 'LRCX', 'TXN', 'AVGO', 'AAPL', 'LYFT', 'MU', 'CSCO', 'MRVL', 'NVDA', 'AMZN'],
+    'NYSE_SYMBOLS': [],
+    'AMEX_SYMBOLS': [],
+    'TARGET_BUY_COUNT': 4,  # 매수할 종목 수
+    'STOP_LOSS_PCT': 0.02,  # 손절매 기준 (매수가 대비 하락률)
+    'TAKE_PROFIT_PCT': 0.03,  # 고정 익절 기준 (트레일링스탑 활성화 전)
+    'TRAILING_STOP_PCT': 0.02,  # 트레일링스탑 기준 (최고가 대비 하락률)
+    'TRAILING_ACTIVATION_PCT': 0.02,  # 트레일링스탑 활성화 기준 (최고가의 매수가 대비 상승률)
+    'POSITION_RISK_BUDGET': 0.2,  # 포트폴리오 연환산 변동성 예산
+    'MAX_POSITION_WEIGHT': 0.4,  # 종목당 최대 투자 비중
+    'MAX_DAILY_LOSS_PCT': 0.03,  # 일일 손실 한도 (넘으면 당일 신규 매수 중단)
+    'FLATTEN_LOSS_PCT': 0.05,  # 일일 손실 청산 기준 (넘으면 전 종목 청산)
+    'MAX_GROSS_EXPOSURE': 1.0,  # 총 노출 한도 (보유 평가액 / 자본)
+    'MAX_CONCENTRATION': 0.5,  # 종목 집중도 한도 (종목 평가액 / 자본)
+}
+
+# 국내 주식 (KoreaStockAutoTrade.py)
+KR_DEFAULTS = {
+    'KR_SYMBOLS': ['005930', '035720', '000660', '069500'],
+    'KR_TARGET_BUY_COUNT': 3,
+    'KR_BUY_PERCENT': 0.33,  # 종목당 매수 금액 비율
+}
+
+
+def _convert(key, value, default):
+    """기본값과 같은 형식으로 변환 (목록은 공백 제거, 숫자는 0 이하 불가)"""
+    if isinstance(default, list):
+        if isinstance(value, str):
+            value = value.split(',')
+        if not isinstance(value, (list, tuple)):
+            raise ValueError(f"{key} 는 목록이어야 합니다: {value!r}")
+        symbols = []
+        for item in value:
+            item = str(item).strip()
+            if item and item not in symbols:
+                symbols.append(item)
+        return symbols
+    value = type(default)(value)
+    if value <= 0:
+        raise ValueError(f"{key} 는 0보다 커야 합니다: {value}")
+    return value
+
+
+class TradingConfig:
+    """매매 설정 값 (config['키'] 로 조회)"""
+
+    def __init__(self, defaults, path=None):
+        self.defaults = dict(defaults)
+        self.path = path or TRADING_CONFIG_PATH
+        self._mtime = self._stat()
+        self.values = self._load()
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        values = dict(self.defaults)
+        for key, default in self.defaults.items():
+            env_value = os.getenv(key)
+            if env_value is not None:
+                values[key] = _convert(key, env_value, default)
+        if os.path.exists(self.path):
+            with open(self.path, encoding='UTF-8') as f:
+                data = yaml.safe_load(f) or {}
+            if not isinstance(data, dict):
+                raise ValueError(f"{self.path} 형식이 올바르지 않습니다.")
+            for key, default in self.defaults.items():
+                if data.get(key) is not None:
+                    values[key] = _convert(key, data[key], default)
+        return values
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def reload(self):
+        """설정 파일이 바뀌었으면 다시 읽고, 바뀐 항목 {키: (이전 값, 새 값)} 반환"""
+        mtime = self._stat()
+        if mtime == self._mtime:
+            return {}
+        self._mtime = mtime
+        try:
+            values = self._load()
+        except (OSError, yaml.YAMLError, ValueError, TypeError) as e:
+            logger.warning(f"⚠️ 설정 파일 다시 읽기 실패, 기존 설정 유지: {e}", extra={'path': self.path})
+            return {}
+        changed = {key: (self.values[key], value) for key, value in values.items() if value != self.values[key]}
+        self.values = values
+        return changed
+